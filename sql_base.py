@@ -0,0 +1,563 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+import logging
+from sql_bulk import bulk_load
+from sql_cache import ResultCache
+from sql_export import export
+from sql_extract import extract
+from sql_fanout import fan_out
+from sql_fastread import fetch_columns, fetch_tuples
+from sql_profiling import QueryProfiler
+from sql_paginate import paginate
+from sql_pool_metrics import InstrumentedQueuePool, PoolMetrics, default_pool_class
+from sql_registry import registry
+from sql_routing import ReplicaRouter, replica_url
+from sql_statements import QUERY_CACHE_SIZE, CompiledCacheStats, statements
+from sql_stream import as_statement, stream
+from sql_sync import DeltaSync
+from sql_upsert import upsert
+from sql_warmup import warm_pool
+from sql_writer import BufferedWriter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SQLConnectionBase:
+    """
+    Wspólna część klas połączeń (silnik z rejestru, sesje, zamykanie)
+    """
+    engine = None
+    Session = None
+    pool_options = None
+    pool_metrics = None
+    query_cache_size = QUERY_CACHE_SIZE
+    result_cache = None
+    result_cache_options = None
+    profiler = None
+    profiling_options = None
+    router = None
+    replica_options = None
+    _registry_entry = None
+    _replica_entries = ()
+    _engine_config = None
+    _writers = ()
+
+    def configure_pool(self, pool_size=None, max_overflow=None, pool_timeout=None,
+                       pool_recycle=None):
+        """
+        Ustawia parametry puli używane przy następnym connect()
+
+        Args:
+            pool_size (int, optional): Liczba stale utrzymywanych połączeń
+            max_overflow (int, optional): Dodatkowe połączenia ponad pool_size
+            pool_timeout (float, optional): Maksymalny czas oczekiwania na połączenie
+            pool_recycle (int, optional): Wiek (s), po którym połączenie jest odnawiane
+        """
+        options = {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+        }
+        self.pool_options = {k: v for k, v in options.items() if v is not None}
+        return self
+
+    def acquire_engine(self, url, identity=None, **engine_options):
+        """
+        Pobiera współdzielony silnik i fabrykę sesji z rejestru procesu
+
+        Args:
+            url (str | URL): URL połączenia
+            identity (str, optional): Tożsamość spoza URL (np. principal Kerberos)
+            **engine_options: Opcje przekazywane do create_engine()
+        """
+        # Ponowne connect() nie może zostawiać wiszących referencji
+        self.release_engine()
+        engine_options.update(self.pool_options or {})
+        engine_options.setdefault("query_cache_size", self.query_cache_size)
+        if "poolclass" not in engine_options and default_pool_class(make_url(url)) is QueuePool:
+            # Ta sama pula, ale z pomiarem czasu oczekiwania na połączenie
+            engine_options["poolclass"] = InstrumentedQueuePool
+        entry = registry.acquire(url, identity=identity, **engine_options)
+        self._engine_config = (url, identity, engine_options)
+        self._registry_entry = entry
+        self.engine = entry.engine
+        self.Session = entry.Session
+        self.pool_metrics = PoolMetrics.attach(self.engine)
+        CompiledCacheStats.attach(self.engine)
+        if self.result_cache_options is not None:
+            self.result_cache = ResultCache.for_engine(self.engine, **self.result_cache_options)
+        if self.profiling_options is not None:
+            self.profiler = QueryProfiler.for_engine(self.engine, **self.profiling_options)
+        if self.replica_options is not None:
+            self._acquire_replicas()
+        return self.engine
+
+    def enable_read_replicas(self, urls=None, hosts=None, read_intent=True, cooldown=30.0):
+        """
+        Włącza kierowanie odczytów na repliki (także przed connect())
+
+        Bez `urls` i `hosts` repliką jest ten sam serwer otwierany
+        z ApplicationIntent=ReadOnly (Azure SQL: replika do odczytu).
+
+        Args:
+            urls (list, optional): Pełne URL replik
+            hosts (list, optional): Hosty replik (reszta konfiguracji jak
+                dla serwera głównego)
+            read_intent (bool): Dodaj ApplicationIntent=ReadOnly
+            cooldown (float): Czas pomijania repliki po błędzie połączenia
+        """
+        self.replica_options = {
+            "urls": list(urls or []),
+            "hosts": list(hosts or []),
+            "read_intent": read_intent,
+            "cooldown": cooldown,
+        }
+        if self.engine is not None:
+            self._acquire_replicas()
+        return self
+
+    def _acquire_replicas(self):
+        self._release_replicas()
+        url, identity, engine_options = self._engine_config
+        options = self.replica_options
+        urls = list(options["urls"])
+        urls += [replica_url(url, host, options["read_intent"]) for host in options["hosts"]]
+        if not urls:
+            urls = [replica_url(url, read_intent=options["read_intent"])]
+        # Repliki z tymi samymi opcjami silnika (pula, tożsamość) co serwer główny
+        self._replica_entries = [
+            registry.acquire(replica, identity=identity, **engine_options) for replica in urls
+        ]
+        self.router = ReplicaRouter(
+            self.engine, [entry.engine for entry in self._replica_entries],
+            cooldown=options["cooldown"],
+        )
+        logger.info(f"Kierowanie odczytów na {len(urls)} replik(i)")
+
+    def _release_replicas(self):
+        for entry in self._replica_entries:
+            registry.release(entry)
+        self._replica_entries = ()
+        self.router = None
+
+    def enable_profiling(self, slow_threshold=1.0, sample_rate=1.0, count_fetched=True):
+        """
+        Włącza profilowanie zapytań i dziennik wolnych zapytań (także przed connect())
+
+        Args:
+            slow_threshold (float): Próg (s), od którego zapytanie trafia do dziennika
+            sample_rate (float): Odsetek wolnych zapytań zapisywanych w dzienniku
+            count_fetched (bool): Zliczaj wiersze i bajty pobierane z kursora
+        """
+        self.profiling_options = {
+            "slow_threshold": slow_threshold,
+            "sample_rate": sample_rate,
+            "count_fetched": count_fetched,
+        }
+        if self.engine is not None:
+            self.profiler = QueryProfiler.for_engine(self.engine, **self.profiling_options)
+        return self
+
+    def query_profile(self, n=10, by="total_time"):
+        """
+        Zwraca n najbardziej kosztownych zapytań (wymaga enable_profiling())
+
+        Args:
+            n (int): Liczba zapytań
+            by (str): Kryterium: total_time, count, mean, p99, max, rows, bytes, errors
+        """
+        self.require_engine()
+        if self.profiler is None:
+            raise Exception("Profilowanie nie zostało włączone (enable_profiling())")
+        return self.profiler.top(n, by)
+
+    def enable_result_cache(self, max_entries=1024, max_bytes=64 * 1024 * 1024,
+                            default_ttl=60):
+        """
+        Włącza bufor wyników dla cached_query() (także przed connect())
+
+        Args:
+            max_entries (int): Maksymalna liczba zapamiętanych wyników
+            max_bytes (int): Przybliżony limit pamięci bufora
+            default_ttl (float): Domyślny czas życia wyniku w sekundach
+        """
+        self.result_cache_options = {
+            "max_entries": max_entries,
+            "max_bytes": max_bytes,
+            "default_ttl": default_ttl,
+        }
+        if self.engine is not None:
+            self.result_cache = ResultCache.for_engine(self.engine, **self.result_cache_options)
+        return self
+
+    def cached_query(self, query, params=None, ttl=None, tables=None, session=None):
+        """
+        Wykonuje zapytanie tylko do odczytu, korzystając z bufora wyników
+
+        Bez włączonego bufora zapytanie jest po prostu wykonywane.
+
+        Args:
+            query (str | Select): Zapytanie
+            params (dict, optional): Parametry zapytania
+            ttl (float, optional): Czas życia wyniku w sekundach
+            tables (iterable, optional): Tabele, od których zależy wynik
+            session (Session, optional): Sesja, w której wykonać zapytanie
+        """
+        if self.result_cache is None:
+            if session is not None:
+                return session.execute(as_statement(query), params)
+            with self.require_engine().connect() as connection:
+                return connection.execute(as_statement(query), params).all()
+        if session is not None:
+            return self.result_cache.execute(session, query, params, ttl, tables)
+        with self.require_engine().connect() as connection:
+            return self.result_cache.execute(connection, query, params, ttl, tables)
+
+    def invalidate_cache(self, table=None):
+        """
+        Usuwa z bufora wyniki zależne od tabeli (albo wszystkie)
+        """
+        if self.result_cache is None:
+            return 0
+        return self.result_cache.invalidate(table)
+
+    def release_engine(self):
+        """
+        Zwalnia referencję do współdzielonego silnika
+        """
+        self._close_writers()
+        self._release_replicas()
+        if self._registry_entry is not None:
+            registry.release(self._registry_entry)
+            self._registry_entry = None
+        self.engine = None
+        self.Session = None
+
+    def dispose(self):
+        """
+        Zamyka pulę połączeń silnika (również dla innych instancji)
+        """
+        self._close_writers()
+        for entry in self._replica_entries:
+            registry.dispose(entry)
+        self._replica_entries = ()
+        self.router = None
+        if self._registry_entry is not None:
+            registry.dispose(self._registry_entry)
+            self._registry_entry = None
+        self.engine = None
+        self.Session = None
+
+    def get_session(self, read_only=False):
+        """
+        Zwraca nową sesję SQLAlchemy
+
+        Args:
+            read_only (bool): Sesja tylko do odczytu - zapytania trafiają na
+                replikę (gdy włączono enable_read_replicas())
+        """
+        if not self.Session:
+            raise Exception("Połączenie nie zostało zainicjalizowane!")
+        if self.router is not None:
+            return self.router.session(read_only=read_only)
+        return self.Session()
+
+    def replica_health(self):
+        """
+        Sprawdza repliki i zwraca ich stan (opóźnienie, błędy, dostępność)
+        """
+        self.require_engine()
+        if self.router is None:
+            return {}
+        self.router.check_health()
+        return self.router.snapshot()
+
+    def pool_stats(self):
+        """
+        Zwraca metryki puli (liczniki, nasycenie, histogramy) jako słownik
+        """
+        self.require_engine()
+        return self.pool_metrics.snapshot()
+
+    def pool_stats_prometheus(self):
+        """
+        Zwraca metryki puli w formacie tekstowym Prometheus
+        """
+        self.require_engine()
+        return self.pool_metrics.prometheus()
+
+    def warm_pool(self, connections=None, timeout=10.0):
+        """
+        Otwiera równolegle połączenia puli (np. zaraz po connect() przy starcie)
+
+        Args:
+            connections (int, optional): Liczba połączeń (domyślnie pool_size)
+            timeout (float): Limit czasu rozgrzewania w sekundach
+
+        Returns:
+            WarmupResult: czasy nawiązania poszczególnych połączeń i błędy
+        """
+        return warm_pool(self.require_engine(), connections, timeout)
+
+    def export(self, query, path, format=None, chunk_size=50000, params=None, **options):
+        """
+        Eksportuje wynik zapytania do pliku Parquet, Arrow albo CSV (paczkami)
+
+        Args:
+            query (str | Select | Query): Zapytanie, np. select(User)
+            path (str): Plik docelowy
+            format (str, optional): "parquet", "arrow" albo "csv"
+                (domyślnie z rozszerzenia pliku)
+            chunk_size (int): Liczba wierszy w paczce
+            params (dict, optional): Parametry zapytania
+            **options: compression i schema (Parquet/Arrow), delimiter (CSV)
+
+        Returns:
+            ExportResult: liczba wierszy, rozmiar pliku i przepustowość
+        """
+        return export(self.require_engine(), query, path, format, chunk_size, params, **options)
+
+    def extract(self, model, path=None, partitions=None, workers=None, method="minmax", key=None,
+                format=None, merge=False, chunk_size=50000, initializer=None, initargs=()):
+        """
+        Równoległa ekstrakcja dużej tabeli: zakresy klucza głównego pobierane
+        w osobnych procesach, każdy z własnym silnikiem z tego samego URL
+
+        Args:
+            model: Model deklaratywny (np. User) albo Table
+            path (str, optional): Katalog plików partycji albo plik przy merge=True;
+                None - wiersze w pamięci, w kolejności klucza
+            partitions (int, optional): Liczba zakresów (domyślnie 4 * workers)
+            workers (int, optional): Liczba procesów (domyślnie liczba rdzeni)
+            method (str): "minmax" albo "histogram" (próbka kluczy)
+            key (str, optional): Kolumna podziału (domyślnie klucz główny)
+            format (str, optional): "parquet", "arrow" albo "csv"
+            merge (bool): Scal pliki partycji w jeden plik
+            chunk_size (int): Liczba wierszy w paczce zapisu
+            initializer (callable, optional): Przygotowanie procesu roboczego
+                (np. bilet Kerberos)
+            initargs (tuple): Argumenty funkcji initializer
+
+        Returns:
+            ExtractResult: pliki albo wiersze partycji i statystyki
+        """
+        engine = self.require_engine()
+        url, identity, engine_options = self._engine_config
+        return extract(
+            url, model, path, partitions, workers, method, key, format, merge, chunk_size,
+            engine_options=engine_options, engine=engine, engine_setup=self.worker_engine_setup(),
+            initializer=initializer, initargs=initargs,
+        )
+
+    def worker_engine_setup(self):
+        """
+        Zwraca funkcję (serializowalną - pickle) wywoływaną z silnikiem
+        utworzonym w procesie roboczym extract(), np. podpięcie tokenu
+        dostępu; None - brak dodatkowej konfiguracji
+        """
+        return None
+
+    def fan_out(self, statements, max_workers=None, timeout=None, return_exceptions=False):
+        """
+        Wykonuje niezależne zapytania równolegle na osobnych połączeniach z puli
+
+        Args:
+            statements (list): Zapytania albo krotki (zapytanie, parametry)
+            max_workers (int, optional): Maksymalna liczba zapytań naraz
+                (domyślnie pojemność puli: pool_size + max_overflow)
+            timeout (float, optional): Limit czasu pojedynczego zapytania
+            return_exceptions (bool): Zwracaj błędy na liście wyników
+
+        Returns:
+            list: Wiersze każdego zapytania, w kolejności wejściowej
+        """
+        engine = self.require_engine()
+        if max_workers is None:
+            state = self.pool_metrics.pool_state() if self.pool_metrics else {}
+            max_workers = (state.get("size", 0) + max(state.get("max_overflow", 0), 0)) or 8
+        return fan_out(engine, statements, max_workers, timeout, return_exceptions)
+
+    def execute_named(self, name, params=None, session=None, prepare=True):
+        """
+        Wykonuje zapytanie zadeklarowane w sql_statements.statements
+
+        Args:
+            name (str): Nazwa zapytania (statements.declare(name, sql))
+            params (dict, optional): Parametry
+            session (Session, optional): Sesja, w której wykonać zapytanie
+            prepare (bool): Na SQL Server używaj sp_prepare/sp_execute
+
+        Returns:
+            list: Wiersze wyniku
+        """
+        return statements.execute(session or self.require_engine(), name, params, prepare)
+
+    def compiled_cache_stats(self):
+        """
+        Zwraca liczniki trafień cache skompilowanych zapytań silnika
+        """
+        return self.require_engine().compiled_cache_stats.snapshot()
+
+    def require_engine(self):
+        """
+        Zwraca silnik albo zgłasza błąd, gdy połączenie nie istnieje
+        """
+        if not self.engine:
+            raise Exception("Połączenie nie zostało zainicjalizowane!")
+        return self.engine
+
+    def bulk_load(self, model, rows, batch_size=10000, columns=None):
+        """
+        Szybkie ładowanie wielu wierszy do tabeli modelu
+
+        Args:
+            model: Model deklaratywny (np. User) albo Table
+            rows (iterable): Słowniki albo krotki (także generator)
+            batch_size (int): Liczba wierszy w jednej paczce
+            columns (list, optional): Nazwy kolumn dla wierszy-krotek
+
+        Returns:
+            BulkLoadResult: liczba wierszy, paczek i przepustowość (wiersze/s)
+        """
+        return bulk_load(self.require_engine(), model, rows, batch_size, columns)
+
+    def upsert(self, model, rows, key=None, batch_size=10000, columns=None):
+        """
+        Wstawia nowe i aktualizuje istniejące wiersze (tabela pośrednia + MERGE)
+
+        Args:
+            model: Model deklaratywny (np. User) albo Table
+            rows (iterable): Słowniki albo krotki (także generator)
+            key (list, optional): Kolumny identyfikujące wiersz (domyślnie klucz główny)
+            batch_size (int): Liczba wierszy w jednej paczce ładowania
+            columns (list, optional): Nazwy kolumn dla wierszy-krotek
+
+        Returns:
+            UpsertResult: liczba wierszy wstawionych i zaktualizowanych
+        """
+        return upsert(self.require_engine(), model, rows, key, batch_size, columns)
+
+    def paginate(self, model, order_by=None, page_size=1000, cursor=None, where=None,
+                 descending=False):
+        """
+        Stronicowanie keyset (bez OFFSET) - każda strona kosztuje tyle samo
+
+        Args:
+            model: Model deklaratywny (np. User) albo Table
+            order_by (list, optional): Kolumny unikalnego klucza (domyślnie klucz główny)
+            page_size (int): Liczba wierszy na stronie
+            cursor (str, optional): Token strony (Page.next_cursor), od której zacząć
+            where (optional): Dodatkowy warunek zapytania
+            descending (bool): Kolejność malejąca
+
+        Yields:
+            Page: wiersze strony i token następnej strony
+        """
+        return paginate(self.require_engine(), model, order_by, page_size, cursor, where, descending)
+
+    def buffered_writer(self, model, batch_size=1000, flush_interval=1.0, max_buffer=10000,
+                        put_timeout=None, on_error=None, on_flush=None, columns=None):
+        """
+        Tworzy bufor zapisu: wiersze dodawane przez add() są wstawiane paczkami
+        w tle zamiast osobnej transakcji na każdy wiersz
+
+        Bufory są zamykane (z zapisem pozostałych wierszy) przy
+        release_engine(), dispose() i wyjściu z procesu.
+
+        Args:
+            model: Model deklaratywny (np. User) albo Table
+            batch_size (int): Liczba wierszy w jednej paczce
+            flush_interval (float): Maksymalny czas oczekiwania wiersza w buforze (s)
+            max_buffer (int): Pojemność bufora (pełny bufor wstrzymuje add())
+            put_timeout (float, optional): Limit oczekiwania add() na miejsce w buforze
+            on_error (callable, optional): Wywoływana z (wyjątek, wiersze) po błędzie zapisu
+            on_flush (callable, optional): Wywoływana z liczbą zapisanych wierszy
+            columns (list, optional): Nazwy kolumn dla wierszy-krotek
+
+        Returns:
+            BufferedWriter: bufor (add(), flush(), close(), stats())
+        """
+        writer = BufferedWriter(
+            self.require_engine(), model, batch_size, flush_interval, max_buffer,
+            put_timeout, on_error, on_flush, columns,
+        )
+        self._writers = [w for w in self._writers if not w._closed] + [writer]
+        return writer
+
+    def _close_writers(self):
+        for writer in self._writers:
+            writer.close()
+        self._writers = ()
+
+    def delta_sync(self, model, store, strategy="updated_at", column=None,
+                   detect_deletes=False, name=None):
+        """
+        Tworzy przyrostową synchronizację tabeli (poll() albo batches() / commit(delta))
+
+        Args:
+            model: Model deklaratywny albo Table
+            store (WatermarkStore | str): Magazyn znaczników albo ścieżka pliku
+            strategy (str): updated_at, rowversion albo change_tracking
+            column (str, optional): Kolumna znacznika (updated_at/rowversion)
+            detect_deletes (bool): Wykrywaj usunięcia przez porównanie kluczy głównych
+            name (str, optional): Nazwa synchronizacji (domyślnie nazwa tabeli)
+
+        Returns:
+            DeltaSync: obiekt synchronizacji
+        """
+        return DeltaSync(
+            self.require_engine(), model, store, name=name, strategy=strategy,
+            column=column, detect_deletes=detect_deletes,
+        )
+
+    def fetch_tuples(self, query, params=None, chunk_size=10000):
+        """
+        Szybki odczyt: lekkie krotki z nazwanymi polami zamiast obiektów ORM
+
+        Args:
+            query: Model (np. User), Table, select(...) albo tekst SQL
+            params (dict, optional): Parametry zapytania
+            chunk_size (int): Liczba wierszy pobieranych z kursora naraz
+
+        Returns:
+            list: Krotki z polami o nazwach kolumn (row.username, row[0])
+        """
+        return fetch_tuples(self.require_engine(), query, params, chunk_size)
+
+    def fetch_columns(self, query, params=None, chunk_size=10000, use_numpy=None):
+        """
+        Szybki odczyt kolumnowy: {kolumna: tablica} (NumPy albo array.array)
+
+        Args:
+            query: Model (np. User), Table, select(...) albo tekst SQL
+            params (dict, optional): Parametry zapytania
+            chunk_size (int): Liczba wierszy pobieranych z kursora naraz
+            use_numpy (bool, optional): Wymuś albo wyłącz NumPy (domyślnie gdy dostępny)
+        """
+        return fetch_columns(self.require_engine(), query, params, chunk_size, use_numpy)
+
+    def stream(self, query, chunk_size=1000, params=None, batches=False):
+        """
+        Strumieniuje wyniki zapytania przy stałym zużyciu pamięci
+
+        Args:
+            query (str | Select | Query): Zapytanie, np. select(User)
+            chunk_size (int): Liczba wierszy pobieranych naraz
+            params (dict, optional): Parametry zapytania
+            batches (bool): Zwracaj listy wierszy zamiast pojedynczych wierszy
+        """
+        return stream(self.require_engine(), query, chunk_size, params, batches)
+
+    def __enter__(self):
+        return self
+
+    def close(self):
+        """
+        Kończy pracę instancji: zwalnia silnik (pula zostaje dla innych instancji)
+        """
+        self.release_engine()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
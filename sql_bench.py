@@ -0,0 +1,603 @@
+"""
+Benchmarki ścieżek połączenia, puli, zapytań, ładowania i strumieniowania
+
+Uruchamiane lokalnie na SQLite z wstrzykiwanym opóźnieniem (zamiast serwera
+SQL), wyniki zapisywane są jako JSON, żeby porównywać kolejne wersje:
+
+    python sql_bench.py --output wyniki.json
+    python sql_bench.py --compare poprzednie.json --threshold 0.2
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, select, text
+from sqlalchemy.orm import Session, declarative_base
+import sqlalchemy
+import argparse
+import json
+import logging
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from sql_base import SQLConnectionBase
+from sql_paginate import encode_cursor
+from sql_registry import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Zarejestrowane benchmarki: nazwa -> funkcja(ctx) zwracająca wynik
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Rejestruje funkcję jako benchmark o podanej nazwie
+    """
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+class _LatencyCursor:
+    def __init__(self, cursor, latency):
+        self._cursor = cursor
+        self._latency = latency
+
+    def execute(self, *args, **kwargs):
+        if self._latency:
+            time.sleep(self._latency)
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        if self._latency:
+            time.sleep(self._latency)
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _LatencyConnection:
+    def __init__(self, connection, latency):
+        self._connection = connection
+        self._latency = latency
+
+    def cursor(self, *args, **kwargs):
+        return _LatencyCursor(self._connection.cursor(*args, **kwargs), self._latency)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._connection, name, value)
+
+
+def latency_dbapi(connect_latency=0.0, query_latency=0.0):
+    """
+    Zwraca moduł DBAPI (jak sqlite3) z opóźnieniem nawiązania połączenia
+    i każdego zapytania - lokalny zamiennik pyodbc i serwera SQL
+
+    Args:
+        connect_latency (float): Opóźnienie logowania (handshake) w sekundach
+        query_latency (float): Opóźnienie każdego zapytania (round trip)
+    """
+    module = types.ModuleType("latency_dbapi")
+    module.__dict__.update(
+        {k: v for k, v in vars(sqlite3).items() if not k.startswith('__')}
+    )
+
+    def connect(*args, **kwargs):
+        if connect_latency:
+            time.sleep(connect_latency)
+        return _LatencyConnection(sqlite3.connect(*args, **kwargs), query_latency)
+
+    module.connect = connect
+    module.connect_latency = connect_latency
+    module.query_latency = query_latency
+    return module
+
+
+class BenchConnection(SQLConnectionBase):
+    def __init__(self, url, dbapi):
+        """
+        Połączenie do benchmarków: ten sam rejestr i pula co klasy połączeń
+        """
+        self.url = url
+        self.dbapi = dbapi
+
+    def connect(self, **engine_options):
+        self.acquire_engine(self.url, module=self.dbapi, pool_pre_ping=True, **engine_options)
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return self.engine
+
+
+def summarize(samples, unit="s"):
+    """
+    Liczy statystyki (średnia, percentyle) dla listy pomiarów
+    """
+    ordered = sorted(samples)
+
+    def percentile(q):
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+        return ordered[index]
+
+    return {
+        "unit": unit,
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered) if ordered else 0.0,
+        "min": ordered[0] if ordered else 0.0,
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": ordered[-1] if ordered else 0.0,
+    }
+
+
+def timed(func, iterations):
+    """
+    Wykonuje funkcję `iterations` razy i zwraca czasy poszczególnych wywołań
+    """
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+bench_metadata = MetaData()
+
+bench_rows = Table(
+    "bench_rows", bench_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(100)),
+    Column("email", String(100)),
+    Column("score", Integer),
+)
+
+
+bench_events = Table(
+    "bench_events", bench_metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("name", String(100)),
+    Column("score", Integer),
+)
+
+BenchBase = declarative_base(metadata=bench_metadata)
+
+
+class BenchRow(BenchBase):
+    # Model ORM na tabeli bench_rows (porównanie z szybkim odczytem)
+    __table__ = bench_rows
+
+
+def generate_rows(count, start=0):
+    """
+    Generuje wiersze testowe (leniwie)
+    """
+    for i in range(start, start + count):
+        yield (i + 1, f"user{i}", f"user{i}@firma.com", i % 1000)
+
+
+class BenchContext:
+    def __init__(self, workdir, args):
+        """
+        Wspólny kontekst benchmarków: katalog roboczy, parametry i dane
+        """
+        self.workdir = workdir
+        self.args = args
+        self.dbapi = latency_dbapi(args.connect_latency, args.query_latency)
+        self.url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        self._connection = None
+
+    def database_url(self, name):
+        return f"sqlite:///{os.path.join(self.workdir, name)}"
+
+    def connection(self):
+        """
+        Zwraca rozgrzane połączenie z wypełnioną tabelą bench_rows
+        """
+        if self._connection is None:
+            self._connection = BenchConnection(self.url, self.dbapi)
+            self._connection.connect()
+            bench_metadata.create_all(self._connection.engine)
+            self._connection.bulk_load(bench_rows, generate_rows(self.args.rows))
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.release_engine()
+            self._connection = None
+
+
+@benchmark("cold_connect")
+def bench_cold_connect(ctx):
+    """
+    Zimne połączenie: nowy silnik, handshake i pierwsze zapytanie
+    """
+    def cold():
+        db = BenchConnection(ctx.database_url("cold.db"), ctx.dbapi)
+        db.connect()
+        db.release_engine()
+
+    return summarize(timed(cold, ctx.args.iterations))
+
+
+@benchmark("pooled_checkout")
+def bench_pooled_checkout(ctx):
+    """
+    Pobranie i zwrot połączenia z rozgrzanej puli
+    """
+    engine = ctx.connection().engine
+
+    def checkout():
+        connection = engine.connect()
+        connection.close()
+
+    return summarize(timed(checkout, ctx.args.iterations * 10))
+
+
+@benchmark("small_query")
+def bench_small_query(ctx):
+    """
+    Krótkie zapytanie (round trip) przez sesję
+    """
+    db = ctx.connection()
+
+    def query():
+        with db.get_session() as session:
+            session.execute(text("SELECT name FROM bench_rows WHERE id = :id"), {"id": 42}).all()
+
+    return summarize(timed(query, ctx.args.iterations * 10))
+
+
+@benchmark("bulk_insert")
+def bench_bulk_insert(ctx):
+    """
+    Przepustowość bulk_load (wiersze/s)
+    """
+    db = ctx.connection()
+    rows = ctx.args.rows
+    samples = []
+    for i in range(max(1, ctx.args.iterations // 5)):
+        start = rows * (i + 1)
+        result = db.bulk_load(bench_rows, generate_rows(rows, start), batch_size=10000)
+        samples.append(result.rows_per_second)
+    return summarize(samples, unit="rows/s")
+
+
+@benchmark("stream_fetch")
+def bench_stream_fetch(ctx):
+    """
+    Przepustowość strumieniowego odczytu (wiersze/s)
+    """
+    db = ctx.connection()
+    samples = []
+    for _ in range(max(1, ctx.args.iterations // 5)):
+        started = time.perf_counter()
+        count = 0
+        for batch in db.stream(bench_rows.select(), chunk_size=5000, batches=True):
+            count += len(batch)
+        samples.append(count / (time.perf_counter() - started))
+    return summarize(samples, unit="rows/s")
+
+
+@benchmark("fan_out")
+def bench_fan_out(ctx):
+    """
+    Przyspieszenie równoległego wykonania 20 niezależnych zapytań
+    względem wykonania jedno po drugim
+    """
+    db = ctx.connection()
+    statements = [
+        ("SELECT count(*) FROM bench_rows WHERE score = :score", {"score": i})
+        for i in range(20)
+    ]
+    samples = []
+    for _ in range(max(1, ctx.args.iterations // 5)):
+        started = time.perf_counter()
+        db.fan_out(statements, max_workers=1)
+        sequential = time.perf_counter() - started
+        started = time.perf_counter()
+        db.fan_out(statements)
+        samples.append(sequential / (time.perf_counter() - started))
+    return summarize(samples, unit="speedup")
+
+
+@benchmark("keyset_page")
+def bench_keyset_page(ctx):
+    """
+    Czas pobrania głębokiej strony (90% tabeli) metodą keyset; w wyniku
+    również czas tej samej strony przez OFFSET/LIMIT i przyspieszenie
+    """
+    db = ctx.connection()
+    page_size = 100
+    depth = int(ctx.args.rows * 0.9)
+    with db.engine.connect() as connection:
+        # Token strony na głębokości `depth` (ostatni klucz poprzedniej strony)
+        last_id = connection.execute(
+            select(bench_rows.c.id).order_by(bench_rows.c.id).offset(depth - 1).limit(1)
+        ).scalar()
+    cursor = encode_cursor([last_id])
+
+    def offset_page():
+        with db.engine.connect() as connection:
+            connection.execute(
+                select(bench_rows).order_by(bench_rows.c.id).offset(depth).limit(page_size)
+            ).all()
+
+    def keyset_page():
+        next(db.paginate(bench_rows, page_size=page_size, cursor=cursor))
+
+    iterations = ctx.args.iterations * 5
+    offset = summarize(timed(offset_page, iterations))
+    result = summarize(timed(keyset_page, iterations))
+    result["offset_p50"] = offset["p50"]
+    result["speedup"] = offset["p50"] / result["p50"] if result["p50"] else 0.0
+    return result
+
+
+@benchmark("buffered_write")
+def bench_buffered_write(ctx):
+    """
+    Przepustowość zapisu pojedynczych zdarzeń przez buffered_writer (wiersze/s);
+    w wyniku również osobny commit na zdarzenie i przyspieszenie
+    """
+    db = ctx.connection()
+    events = max(100, ctx.args.rows // 50)
+    samples = []
+    per_commit = []
+    for _ in range(max(1, ctx.args.iterations // 5)):
+        started = time.perf_counter()
+        for i in range(events):
+            with db.get_session() as session:
+                session.execute(bench_events.insert(), {"name": f"event{i}", "score": i % 1000})
+                session.commit()
+        per_commit.append(events / (time.perf_counter() - started))
+
+        started = time.perf_counter()
+        with db.buffered_writer(bench_events, batch_size=500, flush_interval=0.1) as writer:
+            for i in range(events):
+                writer.add({"name": f"event{i}", "score": i % 1000})
+        samples.append(events / (time.perf_counter() - started))
+    result = summarize(samples, unit="rows/s")
+    result["per_commit_p50"] = summarize(per_commit, unit="rows/s")["p50"]
+    result["speedup"] = result["p50"] / result["per_commit_p50"] if result["per_commit_p50"] else 0.0
+    return result
+
+
+@benchmark("parallel_extract")
+def bench_parallel_extract(ctx):
+    """
+    Przyspieszenie ekstrakcji tabeli do plików Parquet przez kilka procesów
+    względem jednego procesu
+    """
+    db = ctx.connection()
+    workers = min(4, os.cpu_count() or 1)
+    samples = []
+    for i in range(max(1, ctx.args.iterations // 10)):
+        single = db.extract(bench_rows, os.path.join(ctx.workdir, f"extract-1-{i}"), workers=1,
+                            partitions=workers)
+        parallel = db.extract(bench_rows, os.path.join(ctx.workdir, f"extract-{workers}-{i}"),
+                              workers=workers, partitions=workers)
+        samples.append(single.seconds / parallel.seconds)
+    result = summarize(samples, unit="speedup")
+    result["workers"] = workers
+    return result
+
+
+def _peak_memory(func):
+    # Szczytowa ilość pamięci zaalokowanej przez wywołanie (bajty)
+    tracemalloc.start()
+    try:
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+@benchmark("tuple_read")
+def bench_tuple_read(ctx):
+    """
+    Czas odczytu jednego wiersza (s) przez fetch_tuples; w wyniku również
+    ścieżka ORM (session.query(...).all()), odczyt kolumnowy, przyspieszenie
+    i pamięć na wiersz
+    """
+    db = ctx.connection()
+    engine = db.engine
+    with engine.connect() as connection:
+        rows = connection.execute(select(func.count()).select_from(bench_rows)).scalar()
+
+    def orm():
+        with Session(engine) as session:
+            return session.query(BenchRow).all()
+
+    def tuples():
+        return db.fetch_tuples(bench_rows)
+
+    def columns():
+        return db.fetch_columns(bench_rows)
+
+    iterations = max(1, ctx.args.iterations // 5)
+    per_row = {
+        name: summarize([s / rows for s in timed(read, iterations)])
+        for name, read in (("orm", orm), ("tuples", tuples), ("columns", columns))
+    }
+    result = per_row["tuples"]
+    result["orm_p50"] = per_row["orm"]["p50"]
+    result["columns_p50"] = per_row["columns"]["p50"]
+    result["speedup"] = result["orm_p50"] / result["p50"] if result["p50"] else 0.0
+    for name, read in (("orm", orm), ("tuples", tuples), ("columns", columns)):
+        result[f"{name}_bytes_per_row"] = _peak_memory(read) / rows
+    return result
+
+
+# Skrypty uruchamiane w nowym interpreterze (zimny start procesu)
+_IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import sql_con, sql_con_2, sql_con_gs, sql_con_gs2
+print(time.perf_counter() - started)
+"""
+
+_FIRST_QUERY_SCRIPT = """
+import time
+started = time.perf_counter()
+from sqlalchemy import text
+from sql_bench import BenchConnection, latency_dbapi
+import sql_con, sql_con_2, sql_con_gs, sql_con_gs2
+db = BenchConnection({url!r}, latency_dbapi({connect_latency!r}, {query_latency!r}))
+db.connect()
+with db.get_session() as session:
+    session.execute(text("SELECT 1")).scalar()
+print(time.perf_counter() - started)
+"""
+
+
+def _run_script(script):
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [here, os.environ.get("PYTHONPATH")])
+    ))
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True,
+        check=True, env=env, cwd=here,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+@benchmark("import_time")
+def bench_import_time(ctx):
+    """
+    Czas importu modułów połączeń w nowym procesie
+    """
+    return summarize([_run_script(_IMPORT_SCRIPT) for _ in range(ctx.args.iterations)])
+
+
+@benchmark("time_to_first_query")
+def bench_time_to_first_query(ctx):
+    """
+    Czas od startu procesu do wyniku pierwszego zapytania
+    """
+    script = _FIRST_QUERY_SCRIPT.format(
+        url=ctx.database_url("first_query.db"),
+        connect_latency=ctx.args.connect_latency,
+        query_latency=ctx.args.query_latency,
+    )
+    return summarize([_run_script(script) for _ in range(ctx.args.iterations)])
+
+
+def run(args):
+    """
+    Uruchamia wybrane benchmarki i zwraca wyniki jako słownik
+    """
+    names = args.only or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Nieznane benchmarki: {', '.join(unknown)}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        ctx = BenchContext(workdir, args)
+        try:
+            for name in names:
+                logger.info(f"Benchmark: {name}")
+                results[name] = BENCHMARKS[name](ctx)
+        finally:
+            ctx.close()
+            registry.dispose()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "iterations": args.iterations,
+            "connect_latency": args.connect_latency,
+            "query_latency": args.query_latency,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.2):
+    """
+    Porównuje wyniki z poprzednim przebiegiem i zwraca listę regresji
+
+    Dla czasów regresją jest wzrost mediany, dla przepustowości (rows/s) spadek
+    o więcej niż `threshold` (ułamek).
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or not previous.get("p50"):
+            continue
+        change = (result["p50"] - previous["p50"]) / previous["p50"]
+        if result.get("unit") in ("rows/s", "speedup"):
+            change = -change
+        if change > threshold:
+            regressions.append(
+                f"{name}: p50 {previous['p50']:.6g} -> {result['p50']:.6g} "
+                f"{result.get('unit', 's')} ({change:+.0%})"
+            )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarki połączeń SQL")
+    parser.add_argument("--rows", type=int, default=50000, help="Liczba wierszy w tabeli testowej")
+    parser.add_argument("--iterations", type=int, default=20, help="Liczba powtórzeń pomiaru")
+    parser.add_argument("--connect-latency", type=float, default=0.02,
+                        help="Opóźnienie nawiązania połączenia (s)")
+    parser.add_argument("--query-latency", type=float, default=0.0005,
+                        help="Opóźnienie każdego zapytania (s)")
+    parser.add_argument("--only", nargs="*", help="Uruchom tylko wybrane benchmarki")
+    parser.add_argument("--output", help="Plik JSON z wynikami")
+    parser.add_argument("--compare", help="Plik JSON z poprzednimi wynikami")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Dopuszczalne pogorszenie względem --compare")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        logger.info(f"Zapisano wyniki do {args.output}")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            logger.error(f"Regresja: {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
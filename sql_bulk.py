@@ -0,0 +1,106 @@
+from itertools import islice
+import logging
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class BulkLoadResult:
+    def __init__(self, rows, batches, seconds):
+        """
+        Podsumowanie ładowania: liczba wierszy, paczek i czas trwania
+        """
+        self.rows = rows
+        self.batches = batches
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def __repr__(self):
+        return (
+            f"BulkLoadResult(rows={self.rows}, batches={self.batches}, "
+            f"seconds={self.seconds:.3f}, rows_per_second={self.rows_per_second:.0f})"
+        )
+
+
+def table_of(model):
+    """
+    Zwraca obiekt Table dla modelu deklaratywnego (albo samą tabelę)
+    """
+    return getattr(model, '__table__', model)
+
+
+def enable_fast_executemany(engine):
+    """
+    Włącza fast_executemany pyodbc na silniku (dla innych sterowników nic nie robi)
+
+    Odpowiada create_engine(..., fast_executemany=True), ale działa też dla
+    silnika już utworzonego i współdzielonego z rejestru.
+    """
+    dialect = engine.dialect
+    if dialect.driver != 'pyodbc':
+        return False
+    if not getattr(dialect, 'fast_executemany', False):
+        dialect.fast_executemany = True
+        # insertmanyvalues zastąpiłby executemany pojedynczym INSERT ... VALUES
+        dialect.use_insertmanyvalues_wo_returning = False
+        logger.info("Włączono fast_executemany dla pyodbc")
+    return True
+
+
+def iter_batches(rows, batch_size, columns=None):
+    """
+    Dzieli dowolny iterowalny zbiór wierszy na paczki słowników
+
+    Wiersze mogą być słownikami albo krotkami (wtedy kolejność kolumn
+    określa `columns`). Kolejne paczki są pobierane leniwie, więc generator
+    nie jest materializowany w pamięci.
+    """
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        if columns is not None and not isinstance(batch[0], dict):
+            batch = [dict(zip(columns, row)) for row in batch]
+        yield batch
+
+
+def bulk_load(engine, model, rows, batch_size=10000, columns=None):
+    """
+    Wstawia wiersze paczkami przez executemany (fast_executemany na pyodbc)
+
+    Args:
+        engine (Engine): Silnik SQLAlchemy
+        model: Model deklaratywny (np. User) albo Table
+        rows (iterable): Słowniki albo krotki z wartościami kolumn
+        batch_size (int): Liczba wierszy w jednej paczce (i transakcji)
+        columns (list, optional): Nazwy kolumn dla wierszy-krotek
+            (domyślnie wszystkie kolumny tabeli w kolejności definicji)
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size musi być dodatni")
+    table = table_of(model)
+    if columns is None:
+        columns = [column.name for column in table.columns]
+    enable_fast_executemany(engine)
+
+    statement = table.insert()
+    total = 0
+    batches = 0
+    started = time.perf_counter()
+    for batch in iter_batches(rows, batch_size, columns):
+        with engine.begin() as connection:
+            connection.execute(statement, batch)
+        total += len(batch)
+        batches += 1
+
+    result = BulkLoadResult(total, batches, time.perf_counter() - started)
+    logger.info(
+        f"Załadowano {result.rows} wierszy do {table.name} w {result.batches} paczkach "
+        f"({result.rows_per_second:.0f} wierszy/s)"
+    )
+    return result
@@ -0,0 +1,273 @@
+from collections import OrderedDict, namedtuple
+from sqlalchemy import event
+from sqlalchemy.sql.util import find_tables
+import logging
+import re
+import sys
+import threading
+import time
+from sql_stream import as_statement
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tabele czytane (FROM/JOIN) i modyfikowane (INSERT/UPDATE/DELETE/MERGE) w tekście SQL
+_READ_TABLES = re.compile(r'\b(?:FROM|JOIN)\s+([\w\.\[\]"`]+)', re.IGNORECASE)
+_WRITE_TABLES = re.compile(
+    r'^\s*(?:INSERT\s+(?:INTO\s+)?|UPDATE\s+|DELETE\s+(?:FROM\s+)?|MERGE\s+(?:INTO\s+)?)'
+    r'([\w\.\[\]"`]+)',
+    re.IGNORECASE,
+)
+
+
+def normalize_table_name(name):
+    """
+    Normalizuje nazwę tabeli: bez schematu, cudzysłowów i wielkości liter
+    """
+    name = name.split('.')[-1]
+    return name.strip('[]"`').lower()
+
+
+def statement_tables(statement):
+    """
+    Zwraca zbiór nazw tabel, z których czyta zapytanie
+    """
+    if isinstance(statement, str) or not hasattr(statement, 'get_children'):
+        return {normalize_table_name(m) for m in _READ_TABLES.findall(str(statement))}
+    if hasattr(statement, 'text'):
+        return {normalize_table_name(m) for m in _READ_TABLES.findall(statement.text)}
+    return {normalize_table_name(t.name) for t in find_tables(statement, include_joins=True)}
+
+
+def written_tables(sql):
+    """
+    Zwraca zbiór tabel modyfikowanych przez instrukcję SQL
+    """
+    return {normalize_table_name(m) for m in _WRITE_TABLES.findall(sql)}
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _estimate_size(rows):
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class CachedResult:
+    def __init__(self, keys, rows):
+        """
+        Wynik zapytania w buforze: nazwy kolumn i wiersze jako krotki
+
+        Args:
+            keys (tuple): Nazwy kolumn
+            rows (list): Wiersze (namedtuple - zwykłe krotki z dostępem po nazwie)
+        """
+        self.keys = keys
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def all(self):
+        return list(self.rows)
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar(self):
+        row = self.first()
+        return row[0] if row is not None else None
+
+
+class _Entry:
+    __slots__ = ('result', 'expires_at', 'size', 'tables')
+
+    def __init__(self, result, expires_at, size, tables):
+        self.result = result
+        self.expires_at = expires_at
+        self.size = size
+        self.tables = tables
+
+
+class ResultCache:
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, default_ttl=60,
+                 clock=time.monotonic):
+        """
+        Bufor wyników zapytań z czasem życia (TTL) i ograniczeniem LRU
+
+        Args:
+            max_entries (int): Maksymalna liczba zapamiętanych wyników
+            max_bytes (int): Przybliżony limit pamięci na wszystkie wyniki
+            default_ttl (float): Domyślny czas życia wyniku w sekundach
+            clock (callable): Źródło czasu (monotoniczne)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = dict.fromkeys(
+            ("hits", "misses", "evictions", "expirations", "invalidations"), 0
+        )
+
+    @staticmethod
+    def make_key(statement, params=None):
+        """
+        Klucz bufora: tekst SQL i parametry (także wartości osadzone w zapytaniu,
+        np. select(User).where(User.id == 5))
+        """
+        compiled = statement.compile()
+        bound = dict(compiled.params)
+        bound.update(params or {})
+        return (str(compiled), _freeze(bound))
+
+    def get(self, key):
+        """
+        Zwraca wynik z bufora albo None (przeterminowane wpisy są usuwane)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry.expires_at <= self._clock():
+                self._remove(key)
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry.result
+
+    def put(self, key, result, ttl=None, tables=()):
+        """
+        Zapisuje wynik w buforze, usuwając najdawniej używane wpisy ponad limit
+        """
+        size = _estimate_size(result.rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            ttl = self.default_ttl if ttl is None else ttl
+            self._entries[key] = _Entry(result, self._clock() + ttl, size, frozenset(tables))
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats["evictions"] += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def invalidate(self, table=None):
+        """
+        Usuwa wyniki zapytań czytających z danej tabeli (albo wszystkie)
+
+        Args:
+            table (str, optional): Nazwa tabeli (bez rozróżniania wielkości liter)
+        """
+        with self._lock:
+            if table is None:
+                removed = list(self._entries)
+            else:
+                name = normalize_table_name(table)
+                removed = [k for k, e in self._entries.items() if name in e.tables]
+            for key in removed:
+                self._remove(key)
+            self.stats["invalidations"] += len(removed)
+            return len(removed)
+
+    def snapshot(self):
+        """
+        Zwraca statystyki bufora (trafienia, chybienia, rozmiar)
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def execute(self, executor, query, params=None, ttl=None, tables=None):
+        """
+        Wykonuje zapytanie przez `executor` (Session lub Connection) albo zwraca
+        wynik z bufora
+
+        Args:
+            executor: Obiekt z metodą execute() (Session, Connection)
+            query (str | Select): Zapytanie
+            params (dict, optional): Parametry
+            ttl (float, optional): Czas życia wyniku (domyślnie default_ttl)
+            tables (iterable, optional): Tabele, od których zależy wynik
+                (domyślnie wyznaczane z zapytania)
+        """
+        statement = as_statement(query)
+        key = self.make_key(statement, params)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        result = executor.execute(statement, params)
+        keys = tuple(result.keys())
+        row_type = namedtuple('CachedRow', keys, rename=True)
+        rows = [row_type(*row) for row in result]
+        cached = CachedResult(keys, rows)
+        if tables is None:
+            tables = statement_tables(statement)
+        self.put(key, cached, ttl, {normalize_table_name(t) for t in tables})
+        return cached
+
+    @classmethod
+    def for_engine(cls, engine, **options):
+        """
+        Zwraca bufor silnika, tworząc go przy pierwszym użyciu (silnik może
+        być współdzielony, więc bufor też)
+        """
+        cache = getattr(engine, 'result_cache', None)
+        if cache is None:
+            cache = cls(**options).attach(engine)
+            engine.result_cache = cache
+        return cache
+
+    def attach(self, engine):
+        """
+        Unieważnia wpisy po zapisach wykonanych przez silnik (INSERT/UPDATE/...)
+
+        Tabele są unieważniane od razu po instrukcji i ponownie przy
+        zatwierdzeniu (albo wycofaniu) transakcji: odczyt z innego połączenia
+        wykonany przed COMMIT mógł w międzyczasie zapisać w buforze stare dane.
+        """
+        def invalidate_written(conn, cursor, statement, parameters, context, executemany):
+            tables = written_tables(statement)
+            if not tables:
+                return
+            for table in tables:
+                self.invalidate(table)
+            conn.info.setdefault("result_cache_written", set()).update(tables)
+
+        def invalidate_on_end(conn):
+            for table in conn.info.pop("result_cache_written", ()):
+                self.invalidate(table)
+
+        event.listen(engine, "after_cursor_execute", invalidate_written)
+        event.listen(engine, "commit", invalidate_on_end)
+        event.listen(engine, "rollback", invalidate_on_end)
+        return self
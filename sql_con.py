@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine, Column, Integer, String, text
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import Column, Integer, String, text
+from sqlalchemy.orm import declarative_base
 from sqlalchemy.engine import URL
 from urllib.parse import quote_plus
 import logging
+from sql_base import SQLConnectionBase
+from sql_drivers import resolve_driver
+from sql_statements import statements
 
 # Konfiguracja logowania
 logging.basicConfig(level=logging.INFO)
@@ -19,7 +22,37 @@ class User(Base):
     username = Column(String(100))
     email = Column(String(100))
 
-class SQLAlchemyADConnection:
+def ad_connection_url(server, database, username, password, ad_domain=None,
+                      drivername="mssql+pyodbc"):
+    """
+    Tworzy URL połączenia SQLAlchemy z uwierzytelnianiem AD (login i hasło)
+
+    Args:
+        server (str): Nazwa serwera SQL
+        database (str): Nazwa bazy danych
+        username (str): Nazwa użytkownika AD
+        password (str): Hasło użytkownika
+        ad_domain (str, optional): Domena AD
+        drivername (str): Dialekt i sterownik, np. mssql+aioodbc
+    """
+    # Dodaj domenę do nazwy użytkownika jeśli została podana
+    auth_username = f"{ad_domain}\\{username}" if ad_domain else username
+
+    # Tworzenie connection URL używając klasy URL z SQLAlchemy
+    return URL.create(
+        drivername,
+        query={
+            "driver": resolve_driver("ODBC Driver 17 for SQL Server"),
+            "TrustServerCertificate": "yes",
+            "Encrypt": "yes",
+        },
+        username=auth_username,
+        password=password,
+        host=server,
+        database=database,
+    )
+
+class SQLAlchemyADConnection(SQLConnectionBase):
     def __init__(self, server, database, username, password, ad_domain=None):
         """
         Inicjalizacja połączenia SQLAlchemy z uwierzytelnianiem AD
@@ -43,45 +76,24 @@ class SQLAlchemyADConnection:
         """
         Tworzy URL połączenia dla SQLAlchemy
         """
-        # Dodaj domenę do nazwy użytkownika jeśli została podana
-        auth_username = (
-            f"{self.ad_domain}\\{self.username}" 
-            if self.ad_domain 
-            else self.username
-        )
-        
-        # Tworzenie connection URL używając klasy URL z SQLAlchemy
-        connection_url = URL.create(
-            "mssql+pyodbc",
-            query={
-                "driver": "ODBC Driver 17 for SQL Server",
-                "TrustServerCertificate": "yes",
-                "Encrypt": "yes",
-            },
-            username=auth_username,
-            password=self.password,
-            host=self.server,
-            database=self.database,
+        return ad_connection_url(
+            self.server, self.database, self.username, self.password, self.ad_domain
         )
-        
-        return connection_url
 
     def connect(self):
         """
         Tworzy połączenie i sesję SQLAlchemy
         """
         try:
-            # Utworzenie silnika SQLAlchemy
-            self.engine = create_engine(
+            # Silnik SQLAlchemy i fabryka sesji ze wspólnego rejestru
+            # (instancje z tym samym URL współdzielą jedną pulę)
+            self.acquire_engine(
                 self.create_connection_url(),
                 echo=False,  # Ustaw na True dla debugowania SQL
                 pool_pre_ping=True,  # Sprawdza połączenie przed użyciem
                 pool_recycle=3600,  # Odśwież połączenia po godzinie
             )
             
-            # Utworzenie fabryki sesji
-            self.Session = sessionmaker(bind=self.engine)
-            
             # Test połączenia
             with self.engine.connect() as connection:
                 result = connection.execute(text("SELECT @@VERSION"))
@@ -118,17 +130,10 @@ class SQLAlchemyADConnection:
                 logger.info(f"Zalogowany użytkownik bazy: {database_user}")
                 
                 # Sprawdź uprawnienia
-                result = session.execute(text("""
-                    SELECT 
-                        dp.name as principal_name,
-                        dp.type_desc as principal_type,
-                        o.name as object_name,
-                        p.permission_name
-                    FROM sys.database_permissions p
-                    JOIN sys.database_principals dp ON p.grantee_principal_id = dp.principal_id
-                    LEFT JOIN sys.objects o ON p.major_id = o.object_id
-                    WHERE dp.name = SYSTEM_USER
-                """))
+                # (wynik buforowany, jeśli włączono enable_result_cache())
+                result = self.cached_query(
+                    statements.get("user_permissions"), ttl=300, session=session
+                )
                 
                 logger.info("Uprawnienia użytkownika:")
                 for row in result:
@@ -138,14 +143,6 @@ class SQLAlchemyADConnection:
             logger.error(f"Błąd podczas testowania połączenia: {str(e)}")
             raise
 
-    def get_session(self):
-        """
-        Zwraca nową sesję SQLAlchemy
-        """
-        if not self.Session:
-            raise Exception("Połączenie nie zostało zainicjalizowane!")
-        return self.Session()
-
 # Przykład użycia
 def example_usage():
     # Konfiguracja połączenia
@@ -1,14 +1,66 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event, text
 from sqlalchemy.engine import URL
 import logging
-import pyodbc
+from sql_base import SQLConnectionBase
+from sql_drivers import resolve_driver
+from sql_token import TokenCache, WorkerTokenSetup, attach_token_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SQLServerADAuth:
-    def __init__(self, server, database, username, password):
+# Metadane serwera pobierane raz, przy pierwszym fizycznym połączeniu puli
+SERVER_METADATA_QUERY = """
+    SELECT
+        @@VERSION,
+        CAST(SERVERPROPERTY('Edition') AS NVARCHAR(128)),
+        CAST(SERVERPROPERTY('ProductVersion') AS NVARCHAR(128)),
+        (SELECT compatibility_level FROM sys.databases WHERE name = DB_NAME())
+"""
+
+def fetch_server_metadata(dbapi_connection):
+    """
+    Odczytuje metadane serwera przez surowe połączenie DBAPI
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(SERVER_METADATA_QUERY)
+        row = cursor.fetchone()
+        return {
+            "version": row[0],
+            "edition": row[1],
+            "product_version": row[2],
+            "compatibility_level": row[3],
+        }
+    finally:
+        cursor.close()
+
+def install_server_metadata_probe(engine):
+    """
+    Podpina pobieranie metadanych serwera pod pierwsze połączenie puli
+
+    Metadane (wersja, edycja, poziom zgodności) trafiają do
+    `engine.server_metadata` i są współdzielone przez wszystkie instancje
+    korzystające z tego silnika - bez osobnego logowania do serwera.
+    """
+    if hasattr(engine, 'server_metadata'):
+        return engine.server_metadata
+
+    metadata = {}
+    engine.server_metadata = metadata
+
+    def on_first_connect(dbapi_connection, connection_record):
+        try:
+            metadata.update(fetch_server_metadata(dbapi_connection))
+            logger.info(f"Połączono z SQL Server. Wersja: {str(metadata['version']).splitlines()[0]}")
+        except Exception as e:
+            # Słownik zostaje pusty - server_info() odczyta metadane sam
+            logger.warning(f"Nie udało się pobrać metadanych serwera: {str(e)}")
+
+    event.listen(engine, "first_connect", on_first_connect)
+    return metadata
+
+class SQLServerADAuth(SQLConnectionBase):
+    def __init__(self, server, database, username, password=None, token_provider=None):
         """
         Inicjalizacja połączenia do SQL Server z uwierzytelnianiem AD
         
@@ -16,12 +68,18 @@ class SQLServerADAuth:
             server (str): Nazwa serwera SQL
             database (str): Nazwa bazy danych
             username (str): Nazwa użytkownika (email lub UPN)
-            password (str): Hasło użytkownika
+            password (str, optional): Hasło użytkownika
+            token_provider (callable, optional): Dostawca tokenów dostępu
+                (np. sql_token.azure_identity_provider()). Gdy podany, zamiast
+                ActiveDirectoryPassword używany jest token przekazywany przez
+                SQL_COPT_SS_ACCESS_TOKEN
         """
         self.server = server
         self.database = database
         self.username = username
         self.password = password
+        self.token_provider = token_provider
+        self.token_cache = None
         self.engine = None
         self.Session = None
 
@@ -30,7 +88,7 @@ class SQLServerADAuth:
         Tworzy string połączenia dla SQL Server
         """
         params = {
-            "DRIVER": "{ODBC Driver 18 for SQL Server}",
+            "DRIVER": "{" + resolve_driver("ODBC Driver 18 for SQL Server") + "}",
             "SERVER": self.server,
             "DATABASE": self.database,
             "UID": self.username,
@@ -39,6 +97,10 @@ class SQLServerADAuth:
             "TrustServerCertificate": "yes",
             "Encrypt": "yes"
         }
+        if self.token_provider is not None:
+            # Przy tokenie dostępu sterownik nie może dostać UID/PWD/Authentication
+            for key in ("UID", "PWD", "Authentication"):
+                del params[key]
         
         # Tworzenie stringa połączenia
         conn_str = ';'.join([f"{k}={v}" for k, v in params.items()])
@@ -46,42 +108,46 @@ class SQLServerADAuth:
         
         return conn_str
 
-    def connect(self):
+    def connect(self, lazy=False, login_timeout=30):
         """
         Nawiązuje połączenie z bazą danych
+
+        Pierwsze połączenie z puli służy jednocześnie jako test połączenia,
+        więc uwierzytelnienie AD odbywa się tylko raz.
+
+        Args:
+            lazy (bool): Jeśli True, nie otwiera połączenia od razu - zrobi to
+                pierwsze zapytanie
+            login_timeout (int): Limit czasu logowania w sekundach
         """
         try:
-            # Wyświetl dostępne sterowniki
-            logger.info("Dostępne sterowniki ODBC:")
-            for driver in pyodbc.drivers():
-                logger.info(f"- {driver}")
-
-            # Utwórz string połączenia
+            # Utwórz string połączenia (sterownik wykrywany raz i zapamiętany)
             conn_str = self.create_connection_url()
             
-            # Próba bezpośredniego połączenia przez ODBC
-            logger.info("Próba połączenia ODBC...")
-            conn = pyodbc.connect(conn_str, timeout=30)
-            
-            # Test połączenia ODBC
-            cursor = conn.cursor()
-            cursor.execute("SELECT @@VERSION")
-            version = cursor.fetchone()[0]
-            logger.info(f"Połączono z SQL Server. Wersja: {version}")
-            cursor.close()
-            conn.close()
-            
-            # Jeśli ODBC działa, utwórz engine SQLAlchemy
+            # Pobierz engine SQLAlchemy ze wspólnego rejestru
             logger.info("Tworzenie engine SQLAlchemy...")
-            self.engine = create_engine(
-                f"mssql+pyodbc:///?odbc_connect={conn_str}",
+            self.acquire_engine(
+                URL.create("mssql+pyodbc", query={"odbc_connect": conn_str}),
+                # Przy tokenie URL nie zawiera użytkownika - rozróżnia go tożsamość
+                # (razem z dostawcą tokenów: inny dostawca to inny cache tokenów)
+                identity=self._token_identity(),
                 echo=False,
                 pool_pre_ping=True,
-                pool_recycle=3600
+                pool_recycle=3600,
+                connect_args={"timeout": login_timeout},
             )
+            if self.token_provider is not None:
+                # Jeden token współdzielony przez wszystkie połączenia puli
+                self.token_cache = attach_token_cache(
+                    self.engine, TokenCache(self.token_provider)
+                )
+            install_server_metadata_probe(self.engine)
             
-            # Utworzenie fabryki sesji
-            self.Session = sessionmaker(bind=self.engine)
+            if not lazy:
+                # Pierwsze połączenie puli jest testem - wraca do puli otwarte
+                logger.info("Próba połączenia ODBC...")
+                with self.engine.connect():
+                    pass
             
             return self.engine
             
@@ -107,7 +173,8 @@ class SQLServerADAuth:
                 row = result.fetchone()
                 
                 logger.info("Informacje o połączeniu:")
-                logger.info(f"Wersja SQL: {row.version.split('\n')[0]}")
+                version = row.version.split('\n')[0]
+                logger.info(f"Wersja SQL: {version}")
                 logger.info(f"Użytkownik: {row.current_user}")
                 logger.info(f"Baza: {row.database_name}")
                 logger.info(f"Protokół: {row.protocol}")
@@ -117,13 +184,45 @@ class SQLServerADAuth:
             logger.error(f"Błąd podczas testu połączenia: {str(e)}")
             raise
 
-    def get_session(self):
+    def _token_identity(self):
+        if self.token_provider is None:
+            return None
+        # id() dostawcy jest unikalne, dopóki silnik istnieje - TokenCache
+        # na silniku trzyma referencję do dostawcy
+        return f"{self.username}|token:{id(self.token_provider)}"
+
+    def worker_engine_setup(self):
+        """
+        W trybie tokenu procesy robocze (extract()) podpinają token pod
+        własny silnik
         """
-        Zwraca nową sesję SQLAlchemy
+        if self.token_cache is None:
+            return None
+        return WorkerTokenSetup(self.token_cache)
+
+    def server_info(self):
+        """
+        Zwraca metadane serwera (wersja, edycja, poziom zgodności)
+
+        Wartości są buforowane na silniku. Gdy pierwsze połączenie puli ich
+        nie pobrało (jeszcze nie powstało albo zapytanie się nie udało),
+        zapytanie jest wykonywane tutaj.
         """
-        if not self.Session:
+        if not self.engine:
             raise Exception("Połączenie nie zostało zainicjalizowane!")
-        return self.Session()
+        metadata = install_server_metadata_probe(self.engine)
+        if not metadata:
+            try:
+                with self.engine.connect() as connection:
+                    # Pierwsze połączenie puli mogło właśnie wypełnić słownik
+                    if not metadata:
+                        metadata.update(
+                            fetch_server_metadata(connection.connection.dbapi_connection)
+                        )
+            except Exception as e:
+                logger.error(f"Błąd podczas pobierania metadanych serwera: {str(e)}")
+                raise
+        return dict(metadata)
 
 # Przykład użycia
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import asyncio
+import logging
+from sql_con import Base, ad_connection_url
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AsyncSQLAlchemyADConnection:
+    def __init__(self, server, database, username, password, ad_domain=None):
+        """
+        Asynchroniczne połączenie SQLAlchemy z uwierzytelnianiem AD (aioodbc)
+
+        Args:
+            server (str): Nazwa serwera SQL
+            database (str): Nazwa bazy danych
+            username (str): Nazwa użytkownika AD
+            password (str): Hasło użytkownika
+            ad_domain (str, optional): Domena AD
+        """
+        self.server = server
+        self.database = database
+        self.username = username
+        self.password = password
+        self.ad_domain = ad_domain
+        self.url = None
+        self.engine = None
+        self.Session = None
+
+    @classmethod
+    def from_url(cls, url):
+        """
+        Tworzy połączenie dla gotowego URL (np. sqlite+aiosqlite:// w testach)
+        """
+        instance = cls(server=None, database=None, username=None, password=None)
+        instance.url = url
+        return instance
+
+    def create_connection_url(self):
+        """
+        Tworzy URL połączenia - taki sam jak w wersji synchronicznej,
+        ale ze sterownikiem aioodbc
+        """
+        if self.url is not None:
+            return self.url
+        return ad_connection_url(
+            self.server, self.database, self.username, self.password, self.ad_domain,
+            drivername="mssql+aioodbc",
+        )
+
+    async def connect(self):
+        """
+        Tworzy silnik AsyncEngine i fabrykę sesji asynchronicznych
+        """
+        try:
+            # Utworzenie asynchronicznego silnika SQLAlchemy
+            self.engine = create_async_engine(
+                self.create_connection_url(),
+                echo=False,  # Ustaw na True dla debugowania SQL
+                pool_pre_ping=True,  # Sprawdza połączenie przed użyciem
+                pool_recycle=3600,  # Odśwież połączenia po godzinie
+            )
+
+            # Utworzenie fabryki sesji
+            self.Session = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+            # Test połączenia
+            async with self.engine.connect() as connection:
+                if self.engine.dialect.name == "mssql":
+                    result = await connection.execute(text("SELECT @@VERSION"))
+                    logger.info(f"Połączono z SQL Server. Wersja: {result.scalar()}")
+                else:
+                    await connection.execute(text("SELECT 1"))
+                    logger.info(f"Połączono z bazą ({self.engine.dialect.name})")
+
+            return self.engine
+
+        except Exception as e:
+            logger.error(f"Błąd podczas łączenia z bazą: {str(e)}")
+            raise
+
+    async def create_tables(self):
+        """
+        Tworzy wszystkie zdefiniowane tabele w bazie
+        """
+        try:
+            async with self.engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+            logger.info("Tabele zostały utworzone pomyślnie")
+        except Exception as e:
+            logger.error(f"Błąd podczas tworzenia tabel: {str(e)}")
+            raise
+
+    async def test_connection(self):
+        """
+        Testuje połączenie wykonując przykładowe zapytania
+        """
+        try:
+            async with self.get_session() as session:
+                # Sprawdź tożsamość użytkownika
+                result = await session.execute(text("SELECT SYSTEM_USER, CURRENT_USER"))
+                system_user, database_user = result.first()
+                logger.info(f"Zalogowany użytkownik systemowy: {system_user}")
+                logger.info(f"Zalogowany użytkownik bazy: {database_user}")
+
+                # Sprawdź uprawnienia
+                result = await session.execute(text("""
+                    SELECT
+                        dp.name as principal_name,
+                        dp.type_desc as principal_type,
+                        o.name as object_name,
+                        p.permission_name
+                    FROM sys.database_permissions p
+                    JOIN sys.database_principals dp ON p.grantee_principal_id = dp.principal_id
+                    LEFT JOIN sys.objects o ON p.major_id = o.object_id
+                    WHERE dp.name = SYSTEM_USER
+                """))
+
+                logger.info("Uprawnienia użytkownika:")
+                for row in result:
+                    logger.info(f"- {row.permission_name} na {row.object_name or 'DATABASE'}")
+
+        except Exception as e:
+            logger.error(f"Błąd podczas testowania połączenia: {str(e)}")
+            raise
+
+    def get_session(self):
+        """
+        Zwraca nową sesję AsyncSession (używaj z `async with`)
+        """
+        if not self.Session:
+            raise Exception("Połączenie nie zostało zainicjalizowane!")
+        return self.Session()
+
+    async def dispose(self):
+        """
+        Zamyka pulę połączeń silnika
+        """
+        if self.engine is not None:
+            await self.engine.dispose()
+            self.engine = None
+            self.Session = None
+
+# Przykład użycia
+async def example_usage():
+    # Konfiguracja połączenia
+    config = {
+        "server": "twoj-serwer.database.windows.net",
+        "database": "twoja-baza",
+        "username": "twoj_uzytkownik",
+        "password": "twoje_haslo",
+        "ad_domain": "TWOJA-DOMENA"  # opcjonalne
+    }
+
+    db = AsyncSQLAlchemyADConnection(**config)
+
+    try:
+        await db.connect()
+        await db.test_connection()
+
+        async with db.get_session() as session:
+            result = await session.execute(text("SELECT DB_NAME()"))
+            print(f"Aktualna baza danych: {result.scalar()}")
+
+    except Exception as e:
+        logger.error(f"Wystąpił błąd: {str(e)}")
+        raise
+    finally:
+        await db.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(example_usage())
@@ -1,16 +1,14 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text
 from sqlalchemy.engine import URL
-import gssapi
 import logging
-import os
-import subprocess
-from pathlib import Path
+from sql_base import SQLConnectionBase
+from sql_drivers import resolve_driver
+from sql_kerberos import KerberosTicketManager, bind_ccache, krb5_config, memory_ccache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SQLServerWindowsAuth:
+class SQLServerWindowsAuth(SQLConnectionBase):
     def __init__(self, server, database, domain, username, password):
         """
         Inicjalizacja połączenia do SQL Server z uwierzytelnianiem Windows
@@ -29,64 +27,37 @@ class SQLServerWindowsAuth:
         self.password = password
         self.engine = None
         self.Session = None
+        self.ticket_manager = None
         
     def setup_krb5_config(self):
         """
-        Tworzy tymczasowy plik konfiguracyjny Kerberos
-        """
-        krb5_conf = f"""[libdefaults]
-default_realm = {self.domain}
-dns_lookup_realm = false
-dns_lookup_kdc = true
-ticket_lifetime = 24h
-forwardable = true
-proxiable = true
-
-[realms]
-{self.domain} = {{
-    kdc = {self.domain.lower()}
-    admin_server = {self.domain.lower()}
-}}
+        Zwraca plik konfiguracyjny Kerberos obejmujący domenę
 
-[domain_realm]
-.{self.domain.lower()} = {self.domain}
-{self.domain.lower()} = {self.domain}
-"""
-        # Zapisz do pliku w katalogu użytkownika
-        krb5_path = Path.home() / '.krb5.conf'
-        krb5_path.write_text(krb5_conf)
-        os.environ['KRB5_CONFIG'] = str(krb5_path)
-        return krb5_path
+        Plik jest generowany raz (wspólny dla wszystkich domen w procesie)
+        i nie jest usuwany po połączeniu.
+        """
+        return krb5_config(self.domain)
 
     def get_ticket(self):
         """
         Uzyskuje bilet Kerberos używając loginu i hasła
+
+        Ważny bilet z credential cache jest używany ponownie, a nowy bilet
+        pobierany jest z KDC tylko gdy poprzedni wygasł. Bilet odnawiany
+        jest w tle przed końcem ważności.
         """
+        # gssapi ładowany dopiero, gdy potrzebny jest bilet Kerberos
+        import gssapi
+
         try:
-            # Usuń stare bilety
-            subprocess.run(['kdestroy'], stderr=subprocess.DEVNULL)
-            
-            # Przygotuj principal
-            principal = f"{self.username}@{self.domain}"
-            
-            # Utwórz credential cache
-            ccache = "FILE:/tmp/krb5cc_{}".format(os.getuid())
-            os.environ['KRB5CCNAME'] = ccache
-            
-            # Uzyskaj bilet używając loginu i hasła
-            name = gssapi.Name(principal, name_type=gssapi.NameType.user)
-            store = {'ccache': ccache, 'client_name': name}
-            
-            flags = (
-                gssapi.RequirementFlag.delegate_to_peer |
-                gssapi.RequirementFlag.mutual_authentication |
-                gssapi.RequirementFlag.out_of_sequence_detection
-            )
-            
-            gssapi.Credentials(usage='initiate', name=name, password=self.password,
-                             store=store, flags=flags)
-            
-            logger.info(f"Uzyskano bilet Kerberos dla {principal}")
+            if self.ticket_manager is None:
+                # Przygotuj principal i credential cache w pamięci procesu
+                # (osobny dla każdego principala, bez zmiany KRB5CCNAME)
+                principal = f"{self.username}@{self.domain}"
+                ccache = memory_ccache(principal)
+                self.ticket_manager = KerberosTicketManager(principal, self.password, ccache)
+
+            self.ticket_manager.ensure_ticket()
             return True
             
         except gssapi.exceptions.GSSError as e:
@@ -100,7 +71,7 @@ proxiable = true
         connection_url = URL.create(
             "mssql+pyodbc",
             query={
-                "driver": "ODBC Driver 18 for SQL Server",
+                "driver": resolve_driver("ODBC Driver 18 for SQL Server"),
                 "TrustServerCertificate": "yes",
                 "Authentication": "ActiveDirectoryIntegrated",
                 "Encrypt": "yes"
@@ -116,18 +87,19 @@ proxiable = true
         """
         try:
             # Konfiguracja Kerberos
-            krb5_path = self.setup_krb5_config()
+            self.setup_krb5_config()
             self.get_ticket()
             
-            # Utworzenie silnika SQLAlchemy
-            self.engine = create_engine(
+            # Silnik SQLAlchemy i fabryka sesji ze wspólnego rejestru
+            # (klucz obejmuje principal, żeby nie mieszać poświadczeń)
+            self.acquire_engine(
                 self.create_connection_url(),
+                identity=self.ticket_manager.principal,
                 echo=False,
                 pool_pre_ping=True
             )
-            
-            # Utworzenie fabryki sesji
-            self.Session = sessionmaker(bind=self.engine)
+            # Logowanie każdego połączenia puli biletem tej instancji
+            bind_ccache(self.engine, self.ticket_manager.ccache)
             
             # Test połączenia
             with self.engine.connect() as conn:
@@ -139,18 +111,24 @@ proxiable = true
         except Exception as e:
             logger.error(f"Błąd podczas łączenia z bazą: {str(e)}")
             raise
-        finally:
-            # Usuń tymczasowy plik konfiguracyjny
-            if krb5_path.exists():
-                krb5_path.unlink()
-    
-    def get_session(self):
+
+    def close(self):
+        """
+        Zwalnia silnik i zatrzymuje odnawianie biletu Kerberos w tle
+
+        (release_engine() tego nie robi - wywołuje je także connect())
+        """
+        super().close()
+        if self.ticket_manager is not None:
+            self.ticket_manager.stop()
+
+    def dispose(self):
         """
-        Zwraca nową sesję SQLAlchemy
+        Zamyka pulę połączeń i zatrzymuje odnawianie biletu Kerberos w tle
         """
-        if not self.Session:
-            raise Exception("Połączenie nie zostało zainicjalizowane!")
-        return self.Session()
+        super().dispose()
+        if self.ticket_manager is not None:
+            self.ticket_manager.stop()
 
 # Przykład użycia
 def example_usage():
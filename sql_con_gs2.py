@@ -1,15 +1,17 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text
 from sqlalchemy.engine import URL
 import logging
-import subprocess
 from pathlib import Path
 import os
+from sql_base import SQLConnectionBase
+from sql_drivers import resolve_driver
+from sql_statements import statements
+from sql_kerberos import KerberosTicketManager
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SQLServerWindowsAuth:
+class SQLServerWindowsAuth(SQLConnectionBase):
     def __init__(self, server, database, domain, username, password):
         """
         Inicjalizacja połączenia do SQL Server z uwierzytelnianiem Windows
@@ -28,32 +30,29 @@ class SQLServerWindowsAuth:
         self.password = password
         self.engine = None
         self.Session = None
+        self.ticket_manager = None
 
     def setup_kerberos(self):
         """
         Konfiguruje Kerberos i uzyskuje bilet
+
+        Istniejący ważny bilet jest używany ponownie, nowy bilet pobierany
+        jest z KDC tylko gdy to konieczne, a odnawianie odbywa się w tle.
         """
         try:
-            # Usuń stare bilety
-            subprocess.run(['kdestroy', '-A'], stderr=subprocess.DEVNULL)
-            
-            # Przygotuj principal name
-            principal = f"{self.username}@{self.domain}"
-            
-            # Uzyskaj bilet Kerberos
-            kinit = subprocess.Popen(
-                ['kinit', principal],
-                stdin=subprocess.PIPE,
-                stderr=subprocess.PIPE
+            if self.ticket_manager is None:
+                # Przygotuj principal name; bilet trafia do domyślnego ccache
+                # (KRB5CCNAME), z którego korzystają też inne narzędzia -
+                # połączenie tej klasy nie wiąże silnika z własnym ccache
+                principal = f"{self.username}@{self.domain}"
+                self.ticket_manager = KerberosTicketManager(principal, self.password)
+
+            # Uzyskaj (lub użyj ponownie) bilet Kerberos
+            self.ticket_manager.ensure_ticket()
+            logger.info(
+                f"Bilet Kerberos ważny jeszcze "
+                f"{int(self.ticket_manager.remaining_lifetime())} s"
             )
-            kinit.communicate(input=self.password.encode())
-            
-            if kinit.returncode != 0:
-                raise Exception("Błąd podczas uzyskiwania biletu Kerberos")
-            
-            # Sprawdź bilet
-            klist = subprocess.run(['klist'], capture_output=True, text=True)
-            logger.info(f"Status biletów Kerberos:\n{klist.stdout}")
             
         except Exception as e:
             logger.error(f"Błąd konfiguracji Kerberos: {str(e)}")
@@ -66,7 +65,7 @@ class SQLServerWindowsAuth:
         return URL.create(
             "mssql+pyodbc",
             query={
-                "driver": "ODBC Driver 18 for SQL Server",
+                "driver": resolve_driver("ODBC Driver 18 for SQL Server"),
                 "server": self.server,
                 "database": self.database,
                 "Authentication": "ActiveDirectoryPassword",
@@ -85,17 +84,14 @@ class SQLServerWindowsAuth:
             # Konfiguracja połączenia
             conn_url = self.create_connection_string()
             
-            # Utworzenie silnika SQLAlchemy
-            self.engine = create_engine(
+            # Silnik SQLAlchemy i fabryka sesji ze wspólnego rejestru
+            self.acquire_engine(
                 conn_url,
                 echo=False,
                 pool_pre_ping=True,
                 pool_recycle=3600
             )
             
-            # Utworzenie fabryki sesji
-            self.Session = sessionmaker(bind=self.engine)
-            
             # Test połączenia
             with self.engine.connect() as conn:
                 result = conn.execute(text("SELECT SYSTEM_USER, USER_NAME()"))
@@ -109,13 +105,23 @@ class SQLServerWindowsAuth:
             logger.error(f"Błąd podczas łączenia z bazą: {str(e)}")
             raise
 
-    def get_session(self):
+    def close(self):
+        """
+        Zwalnia silnik i zatrzymuje odnawianie biletu Kerberos w tle
+
+        (release_engine() tego nie robi - wywołuje je także connect())
+        """
+        super().close()
+        if self.ticket_manager is not None:
+            self.ticket_manager.stop()
+
+    def dispose(self):
         """
-        Zwraca nową sesję SQLAlchemy
+        Zamyka pulę połączeń i zatrzymuje odnawianie biletu Kerberos w tle
         """
-        if not self.Session:
-            raise Exception("Połączenie nie zostało zainicjalizowane!")
-        return self.Session()
+        super().dispose()
+        if self.ticket_manager is not None:
+            self.ticket_manager.stop()
 
     def test_connection(self):
         """
@@ -129,17 +135,10 @@ class SQLServerWindowsAuth:
                 logger.info(f"Wersja SQL Server: {version}")
 
                 # Test uprawnień
-                result = session.execute(text("""
-                    SELECT 
-                        dp.name as principal_name,
-                        dp.type_desc as principal_type,
-                        o.name as object_name,
-                        p.permission_name
-                    FROM sys.database_permissions p
-                    JOIN sys.database_principals dp ON p.grantee_principal_id = dp.principal_id
-                    LEFT JOIN sys.objects o ON p.major_id = o.object_id
-                    WHERE dp.name = SYSTEM_USER
-                """))
+                # (wynik buforowany, jeśli włączono enable_result_cache())
+                result = self.cached_query(
+                    statements.get("user_permissions"), ttl=300, session=session
+                )
                 
                 logger.info("Uprawnienia użytkownika:")
                 for row in result:
@@ -1,5 +1,5 @@
-import pyodbc
 import logging
+from sql_drivers import resolve_driver
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -8,15 +8,17 @@ def test_sql_connection():
     """
     Test połączenia z SQL Server używając Windows Authentication
     """
+    # pyodbc ładowany dopiero przy teście połączenia
+    import pyodbc
+
     try:
-        # Lista dostępnych sterowników
-        logger.info("Dostępne sterowniki ODBC:")
-        for driver in pyodbc.drivers():
-            logger.info(f"- {driver}")
+        # Sterownik wykrywany raz i zapamiętywany na dysku
+        driver = resolve_driver("ODBC Driver 18 for SQL Server")
+        logger.info(f"Sterownik ODBC: {driver}")
 
         # String połączenia
         conn_str = (
-            "DRIVER={ODBC Driver 18 for SQL Server};"
+            f"DRIVER={{{driver}}};"
             "SERVER=serwer.domena.com;"
             "DATABASE=nazwa_bazy;"
             "Authentication=ActiveDirectoryIntegrated;"
@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Sterowniki SQL Server w kolejności preferencji
+KNOWN_DRIVERS = (
+    "ODBC Driver 18 for SQL Server",
+    "ODBC Driver 17 for SQL Server",
+)
+
+# Jak długo wynik wykrywania jest ważny bez sprawdzania (1 dzień)
+CACHE_TTL = 24 * 3600
+
+_lock = threading.Lock()
+_resolved = {}
+
+
+def cache_path():
+    """
+    Zwraca ścieżkę pliku z zapamiętanym wynikiem wykrywania sterowników
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'sql_con' / 'odbc_drivers.json'
+
+
+def _odbcinst_files():
+    paths = [Path('/etc/odbcinst.ini'), Path.home() / '.odbcinst.ini']
+    if os.environ.get('ODBCSYSINI'):
+        paths.append(Path(os.environ['ODBCSYSINI']) / 'odbcinst.ini')
+    if os.environ.get('ODBCINSTINI'):
+        paths.append(Path(os.environ['ODBCINSTINI']))
+    return paths
+
+
+def config_fingerprint():
+    """
+    Odcisk konfiguracji unixODBC (ścieżki i czasy modyfikacji odbcinst.ini)
+
+    Instalacja lub usunięcie sterownika zmienia odbcinst.ini, co unieważnia
+    zapamiętany wynik.
+    """
+    parts = []
+    for path in _odbcinst_files():
+        try:
+            stat = path.stat()
+            parts.append(f"{path}:{stat.st_mtime_ns}:{stat.st_size}")
+        except OSError:
+            parts.append(f"{path}:-")
+    return "|".join(parts)
+
+
+def available_drivers():
+    """
+    Zwraca listę sterowników ODBC (import pyodbc dopiero tutaj)
+    """
+    import pyodbc
+    return list(pyodbc.drivers())
+
+
+def _read_cache(path, fingerprint):
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if data.get('fingerprint') != fingerprint:
+        return None
+    if time.time() - data.get('created_at', 0) > CACHE_TTL:
+        return None
+    return data.get('drivers')
+
+
+def _write_cache(path, fingerprint, drivers):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({
+            'fingerprint': fingerprint,
+            'created_at': time.time(),
+            'drivers': drivers,
+        }))
+        tmp.replace(path)
+    except OSError as e:
+        logger.warning(f"Nie udało się zapisać listy sterowników ODBC: {str(e)}")
+
+
+def installed_drivers(refresh=False):
+    """
+    Zwraca listę zainstalowanych sterowników, korzystając z pamięci podręcznej
+    na dysku (odświeżanej po zmianie odbcinst.ini, po CACHE_TTL lub na żądanie)
+
+    Args:
+        refresh (bool): Pomiń zapamiętany wynik i wykryj sterowniki od nowa
+    """
+    path = cache_path()
+    fingerprint = config_fingerprint()
+    drivers = None if refresh else _read_cache(path, fingerprint)
+    if drivers is None:
+        drivers = available_drivers()
+        logger.info(f"Dostępne sterowniki ODBC: {', '.join(drivers) or 'brak'}")
+        _write_cache(path, fingerprint, drivers)
+    return drivers
+
+
+def resolve_driver(preferred=None, refresh=False):
+    """
+    Wybiera sterownik ODBC dla SQL Server - raz na proces
+
+    Kolejność: zmienna SQL_ODBC_DRIVER, sterownik `preferred` (jeśli jest
+    zainstalowany), potem pozostałe z KNOWN_DRIVERS. Gdy pyodbc nie jest
+    dostępny, zwracany jest `preferred`.
+
+    Args:
+        preferred (str, optional): Sterownik preferowany przez wywołującego
+        refresh (bool): Wymuś ponowne wykrycie sterowników
+    """
+    override = os.environ.get('SQL_ODBC_DRIVER')
+    if override:
+        return override
+
+    with _lock:
+        if not refresh and preferred in _resolved:
+            return _resolved[preferred]
+
+        candidates = ([preferred] if preferred else []) + [
+            d for d in KNOWN_DRIVERS if d != preferred
+        ]
+        try:
+            drivers = installed_drivers(refresh)
+        except ImportError:
+            drivers = None
+
+        if drivers is None:
+            driver = preferred or KNOWN_DRIVERS[0]
+        else:
+            driver = next((d for d in candidates if d in drivers), None)
+            if driver is None:
+                raise Exception(
+                    f"Brak sterownika ODBC dla SQL Server (zainstalowane: {', '.join(drivers) or 'brak'})"
+                )
+            if preferred and driver != preferred:
+                logger.info(f"Sterownik {preferred} niedostępny, używam {driver}")
+
+        _resolved[preferred] = driver
+        return driver
@@ -0,0 +1,279 @@
+from sqlalchemy import types as sqltypes
+import csv
+import logging
+import os
+import time
+from sql_stream import as_statement
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMATS = ("parquet", "arrow", "csv")
+
+# Limit wierszy wstrzymywanych do czasu, gdy kolumny bez typu dostaną
+# pierwszą wartość różną od NULL (potem typ tekstowy)
+MAX_INFERENCE_ROWS = 100000
+
+
+class ExportResult:
+    def __init__(self, path, rows, batches, seconds):
+        """
+        Podsumowanie eksportu: plik, liczba wierszy i paczek, czas trwania
+        """
+        self.path = path
+        self.rows = rows
+        self.batches = batches
+        self.seconds = seconds
+        self.bytes = os.path.getsize(path) if os.path.exists(path) else 0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def __repr__(self):
+        return (
+            f"ExportResult(path={self.path!r}, rows={self.rows}, batches={self.batches}, "
+            f"bytes={self.bytes}, rows_per_second={self.rows_per_second:.0f})"
+        )
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Eksport do Parquet/Arrow wymaga pakietu pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def arrow_type(sql_type):
+    """
+    Mapuje typ kolumny SQLAlchemy na typ Arrow (None - typ wyznaczany z danych)
+    """
+    pa = _pyarrow()
+    if isinstance(sql_type, sqltypes.Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, sqltypes.SmallInteger):
+        return pa.int16()
+    if isinstance(sql_type, sqltypes.Integer):
+        return pa.int64()
+    if isinstance(sql_type, sqltypes.Float):
+        return pa.float64()
+    if isinstance(sql_type, sqltypes.Numeric):
+        if sql_type.precision and sql_type.precision <= 38:
+            return pa.decimal128(sql_type.precision, sql_type.scale or 0)
+        return pa.float64() if not sql_type.asdecimal else None
+    if isinstance(sql_type, sqltypes.DateTime):
+        return pa.timestamp("us", tz="UTC" if sql_type.timezone else None)
+    if isinstance(sql_type, sqltypes.Date):
+        return pa.date32()
+    if isinstance(sql_type, sqltypes.Time):
+        return pa.time64("us")
+    if isinstance(sql_type, sqltypes.String):
+        return pa.string()
+    if isinstance(sql_type, (sqltypes.LargeBinary, sqltypes.BINARY, sqltypes.VARBINARY)):
+        return pa.binary()
+    return None
+
+
+def _explicit_types(schema):
+    if schema is None:
+        return {}
+    if isinstance(schema, dict):
+        return dict(schema)
+    return dict(zip(schema.names, schema.types))
+
+
+def untyped_columns(statement, keys, schema=None):
+    """
+    Zwraca kolumny, których typ Arrow trzeba wyznaczyć z danych
+    (np. text() albo typy bez odpowiednika) - bez jawnego `schema`
+    """
+    explicit = _explicit_types(schema)
+    typed = set(explicit)
+    for column in getattr(statement, "selected_columns", []):
+        if column.key in keys and not isinstance(column.type, sqltypes.NullType):
+            if arrow_type(column.type) is not None:
+                typed.add(column.key)
+    return [key for key in keys if key not in typed]
+
+
+def arrow_schema(statement, keys, first_batch, schema=None):
+    """
+    Buduje schemat Arrow: z jawnego `schema`, z typów kolumn zapytania,
+    a dla pozostałych kolumn (np. text()) - z podanych wierszy
+
+    Args:
+        statement: Zapytanie
+        keys (list): Nazwy kolumn wyniku
+        first_batch (list): Wiersze, z których wyznaczane są brakujące typy
+        schema (pyarrow.Schema | dict, optional): Jawne typy kolumn
+    """
+    pa = _pyarrow()
+    column_types = {}
+    for column in getattr(statement, "selected_columns", []):
+        if column.key in keys and not isinstance(column.type, sqltypes.NullType):
+            column_types[column.key] = arrow_type(column.type)
+    column_types.update(_explicit_types(schema))
+
+    fields = []
+    for index, key in enumerate(keys):
+        field_type = column_types.get(key)
+        if field_type is None:
+            inferred = pa.array([row[index] for row in first_batch])
+            field_type = pa.string() if pa.types.is_null(inferred.type) else inferred.type
+        fields.append(pa.field(key, field_type))
+    return pa.schema(fields)
+
+
+def _record_batch(batch, schema):
+    pa = _pyarrow()
+    # Wiersze -> kolumny: jedna tablica Arrow na kolumnę
+    columns = list(zip(*batch)) if batch else [[] for _ in schema]
+    return pa.record_batch(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+class _ArrowWriter:
+    def __init__(self, path, format, statement, keys, compression, schema=None):
+        self.path = path
+        self.format = format
+        self.statement = statement
+        self.keys = keys
+        self.compression = compression
+        self.explicit_schema = schema
+        self.schema = None
+        self._writer = None
+        self._pending = []
+        # Kolumny bez typu, które dotąd miały same wartości NULL
+        self._untyped = untyped_columns(statement, keys, schema)
+        self._unresolved = {keys.index(key) for key in self._untyped}
+
+    def write(self, batch):
+        if self._writer is not None:
+            self._write_batch(batch)
+            return
+        # Typ kolumny bez typu wyznaczany z pierwszej wartości różnej od NULL,
+        # a nie z samych NULL-i pierwszej paczki
+        self._pending.extend(batch)
+        for index in list(self._unresolved):
+            if any(row[index] is not None for row in batch):
+                self._unresolved.discard(index)
+        if self._unresolved and len(self._pending) < MAX_INFERENCE_ROWS:
+            return
+        self._open()
+
+    def _open(self):
+        pa = _pyarrow()
+        pending, self._pending = self._pending, []
+        self.schema = arrow_schema(self.statement, self.keys, pending, self.explicit_schema)
+        if self.format == "parquet":
+            self._writer = pa.parquet.ParquetWriter(
+                self.path, self.schema, compression=self.compression or "snappy"
+            )
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pa.ipc.new_file(self.path, self.schema, options=options)
+        if pending:
+            self._write_batch(pending)
+
+    def _write_batch(self, batch):
+        pa = _pyarrow()
+        try:
+            record_batch = _record_batch(batch, self.schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            if not self._untyped:
+                raise
+            types = ", ".join(f"{key}: {self.schema.field(key).type}" for key in self._untyped)
+            raise ValueError(
+                f"Wartości niezgodne z typem wyznaczonym z danych ({types}) - "
+                f"podaj typy kolumn w parametrze schema: {e}"
+            ) from e
+        self._writer.write_batch(record_batch)
+
+    def close(self):
+        if self._writer is None:
+            # Wstrzymane wiersze albo pusty wynik (sam schemat)
+            self._open()
+        self._writer.close()
+
+
+class _CsvWriter:
+    def __init__(self, path, keys, delimiter):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file, delimiter=delimiter)
+        self._writer.writerow(keys)
+
+    def write(self, batch):
+        self._writer.writerows(batch)
+
+    def close(self):
+        self._file.close()
+
+
+def export(engine, query, path, format=None, chunk_size=50000, params=None,
+           compression=None, delimiter=",", schema=None):
+    """
+    Eksportuje wynik zapytania do pliku Parquet, Arrow (IPC) albo CSV
+
+    Wiersze są pobierane kursorem strumieniowym i zapisywane paczkami
+    (Parquet: jedna grupa wierszy na paczkę), więc zużycie pamięci zależy
+    od `chunk_size`, a nie od rozmiaru tabeli.
+
+    Args:
+        engine (Engine): Silnik SQLAlchemy
+        query (str | Select | Query): Zapytanie
+        path (str): Plik docelowy
+        format (str, optional): "parquet", "arrow" albo "csv" (domyślnie
+            z rozszerzenia pliku)
+        chunk_size (int): Liczba wierszy w paczce
+        params (dict, optional): Parametry zapytania
+        compression (str, optional): Kompresja Parquet/Arrow (np. "zstd")
+        delimiter (str): Separator pól CSV
+        schema (pyarrow.Schema | dict, optional): Typy Arrow kolumn (wszystkich
+            albo wybranych, np. {"wartosc": pa.int64()}) - dla zapytań bez
+            typów (text()) zamiast wyznaczania typu z danych
+    """
+    path = str(path)
+    if format is None:
+        extension = os.path.splitext(path)[1].lower().lstrip(".")
+        format = {"pq": "parquet", "feather": "arrow", "ipc": "arrow"}.get(extension, extension)
+    if format not in FORMATS:
+        raise ValueError(f"Nieobsługiwany format eksportu: {format}")
+
+    statement = as_statement(query)
+    rows = 0
+    batches = 0
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=chunk_size
+        ).execute(statement, params)
+        keys = list(result.keys())
+        if format == "csv":
+            writer = _CsvWriter(path, keys, delimiter)
+        else:
+            writer = _ArrowWriter(path, format, statement, keys, compression, schema)
+        try:
+            for batch in result.partitions(chunk_size):
+                writer.write(batch)
+                rows += len(batch)
+                batches += 1
+        except Exception:
+            # Nie zostawiaj niekompletnego pliku
+            result.close()
+            writer.close()
+            os.remove(path)
+            raise
+        result.close()
+        writer.close()
+
+    export_result = ExportResult(path, rows, batches, time.perf_counter() - started)
+    logger.info(
+        f"Wyeksportowano {rows} wierszy do {path} ({format}, {batches} paczek, "
+        f"{export_result.rows_per_second:.0f} wierszy/s)"
+    )
+    return export_result
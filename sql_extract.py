@@ -0,0 +1,389 @@
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.pool import NullPool
+import decimal
+import glob
+import logging
+import os
+import pickle
+import shutil
+import time
+from sql_bulk import table_of
+from sql_export import FORMATS, _pyarrow, arrow_schema, export, untyped_columns
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+METHODS = ("minmax", "histogram")
+
+# Opcje puli nie mają sensu w procesie roboczym (jedno połączenie, NullPool)
+_WORKER_SKIPPED_OPTIONS = (
+    "poolclass", "pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping",
+)
+
+
+class ExtractResult:
+    def __init__(self, path, partitions, rows, seconds, workers):
+        """
+        Podsumowanie ekstrakcji: pliki (albo wiersze) partycji, liczba
+        wierszy, czas trwania i liczba procesów
+        """
+        self.path = path
+        self.partitions = partitions
+        self.rows = rows
+        self.seconds = seconds
+        self.workers = workers
+
+    @property
+    def row_count(self):
+        return sum(partition["rows"] for partition in self.partitions)
+
+    @property
+    def rows_per_second(self):
+        return self.row_count / self.seconds if self.seconds > 0 else float(self.row_count)
+
+    def __repr__(self):
+        return (
+            f"ExtractResult(path={self.path!r}, partitions={len(self.partitions)}, "
+            f"rows={self.row_count}, workers={self.workers}, seconds={self.seconds:.3f})"
+        )
+
+
+def key_column(table, key=None):
+    """
+    Zwraca kolumnę podziału: podaną albo jednokolumnowy klucz główny
+    """
+    if key is not None:
+        return table.c[key] if isinstance(key, str) else key
+    columns = list(table.primary_key.columns)
+    if len(columns) != 1:
+        raise ValueError(
+            f"Tabela {table.name} nie ma jednokolumnowego klucza głównego - podaj key"
+        )
+    return columns[0]
+
+
+def _minmax_bounds(connection, column, partitions):
+    low, high = connection.execute(select(func.min(column), func.max(column))).one()
+    if low is None or low == high:
+        return []
+    if not isinstance(low, (int, float, decimal.Decimal)):
+        raise ValueError(
+            f"Podział min/max wymaga klucza liczbowego ({column.name}) - użyj method='histogram'"
+        )
+    step = (high - low) / partitions
+    if isinstance(low, int):
+        step = max(1, -(-(high - low + 1) // partitions))
+    bounds = []
+    value = low + step
+    while value <= high and len(bounds) < partitions - 1:
+        bounds.append(value)
+        value += step
+    return bounds
+
+
+def _histogram_bounds(connection, column, partitions, sample_size):
+    if connection.dialect.name == "mssql":
+        # Próbka stron danych zamiast pełnego skanu
+        sample = connection.exec_driver_sql(
+            f"SELECT {connection.dialect.identifier_preparer.quote(column.name)} "
+            f"FROM {connection.dialect.identifier_preparer.format_table(column.table)} "
+            f"TABLESAMPLE ({int(sample_size)} ROWS)"
+        ).scalars().all()
+    else:
+        sample = connection.execute(
+            select(column).order_by(func.random()).limit(sample_size)
+        ).scalars().all()
+    sample = sorted(value for value in sample if value is not None)
+    if not sample:
+        return []
+    bounds = []
+    for index in range(1, partitions):
+        value = sample[index * len(sample) // partitions]
+        # Powtarzające się wartości dają jedną granicę (bez pustych zakresów)
+        if not bounds or value > bounds[-1]:
+            bounds.append(value)
+    return bounds
+
+
+def key_ranges(engine, model, partitions, method="minmax", key=None, sample_size=10000):
+    """
+    Dzieli tabelę na zakresy klucza [od, do)
+
+    Pierwszy zakres nie ma dolnej, a ostatni górnej granicy, więc wiersze
+    dodane w trakcie podziału nie są pomijane.
+
+    Args:
+        engine (Engine): Silnik SQLAlchemy
+        model: Model deklaratywny albo Table
+        partitions (int): Docelowa liczba zakresów
+        method (str): "minmax" - równe przedziały między MIN i MAX klucza
+            liczbowego; "histogram" - kwantyle z losowej próbki kluczy
+            (klucze nierównomierne, tekstowe, daty)
+        key (str, optional): Kolumna podziału (domyślnie klucz główny)
+        sample_size (int): Wielkość próbki dla method="histogram"
+
+    Returns:
+        list: Krotki (od, do); None oznacza brak granicy
+    """
+    if method not in METHODS:
+        raise ValueError(f"Nieznana metoda podziału: {method}")
+    if partitions < 1:
+        raise ValueError("partitions musi być dodatnie")
+    column = key_column(table_of(model), key)
+    with engine.connect() as connection:
+        if partitions == 1:
+            bounds = []
+        elif method == "minmax":
+            bounds = _minmax_bounds(connection, column, partitions)
+        else:
+            bounds = _histogram_bounds(connection, column, partitions, sample_size)
+    edges = [None] + bounds + [None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def range_statement(table, column, low, high):
+    """
+    Zwraca SELECT wierszy zakresu [low, high) uporządkowany po kluczu
+    """
+    statement = select(table)
+    if low is not None:
+        statement = statement.where(column >= low)
+    if high is not None:
+        statement = statement.where(column < high)
+    return statement.order_by(column)
+
+
+def worker_engine_options(engine_options):
+    """
+    Wybiera opcje silnika, które można przekazać do procesu roboczego
+    """
+    options = {}
+    for name, value in (engine_options or {}).items():
+        if name in _WORKER_SKIPPED_OPTIONS:
+            continue
+        try:
+            pickle.dumps(value)
+        except Exception:
+            logger.warning(f"Opcja silnika {name} nie zostanie przekazana do procesów roboczych")
+            continue
+        options[name] = value
+    return options
+
+
+def partition_schema(engine, table, sample_size=1000):
+    """
+    Buduje jeden schemat Arrow dla wszystkich partycji
+
+    Typy kolumn bez odpowiednika Arrow (np. Numeric bez precyzji) są
+    wyznaczane z próbki wartości różnych od NULL; dla liczb dziesiętnych
+    z pełną precyzją, żeby zmieściły się wartości z każdego zakresu.
+    """
+    pa = _pyarrow()
+    statement = select(table)
+    keys = list(statement.selected_columns.keys())
+    types = {}
+    untyped = untyped_columns(statement, keys)
+    if untyped:
+        with engine.connect() as connection:
+            for key in untyped:
+                column = statement.selected_columns[key]
+                values = connection.execute(
+                    select(column).where(column.is_not(None)).limit(sample_size)
+                ).scalars().all()
+                inferred = pa.array(values).type if values else pa.string()
+                if pa.types.is_decimal(inferred):
+                    inferred = pa.decimal128(38, inferred.scale)
+                types[key] = inferred
+    return arrow_schema(statement, keys, [], types)
+
+
+def _create_engine(url, engine_options, engine_setup):
+    engine = create_engine(url, poolclass=NullPool, **engine_options)
+    if engine_setup is not None:
+        # Np. token dostępu podpinany przez zdarzenie do_connect
+        engine_setup(engine)
+    return engine
+
+
+def _extract_partition(task):
+    # Uruchamiane w procesie roboczym: własny silnik, jedno połączenie
+    (index, url, engine_options, engine_setup, table, key, low, high, path, format,
+     chunk_size, schema) = task
+    engine = _create_engine(url, engine_options, engine_setup)
+    try:
+        statement = range_statement(table, table.c[key], low, high)
+        started = time.perf_counter()
+        if path is None:
+            with engine.connect() as connection:
+                rows = [tuple(row) for row in connection.execute(statement)]
+            return index, len(rows), time.perf_counter() - started, rows
+        result = export(engine, statement, path, format, chunk_size, schema=schema)
+        return index, result.rows, result.seconds, None
+    finally:
+        engine.dispose()
+
+
+def _merge_files(paths, path, format):
+    if format == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as target:
+            for number, part in enumerate(paths):
+                with open(part, newline="", encoding="utf-8") as source:
+                    header = source.readline()
+                    if number == 0:
+                        target.write(header)
+                    shutil.copyfileobj(source, target)
+        return
+    pa = _pyarrow()
+    writer = None
+    try:
+        for part in paths:
+            if format == "parquet":
+                source = pa.parquet.ParquetFile(part)
+                schema = source.schema_arrow
+                batches = source.iter_batches()
+            else:
+                source = pa.ipc.open_file(part)
+                schema = source.schema
+                batches = (source.get_batch(i) for i in range(source.num_record_batches))
+            if writer is None:
+                if format == "parquet":
+                    writer = pa.parquet.ParquetWriter(path, schema)
+                else:
+                    writer = pa.ipc.new_file(path, schema)
+            for batch in batches:
+                writer.write_batch(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def extract(url, model, path=None, partitions=None, workers=None, method="minmax", key=None,
+            format=None, merge=False, chunk_size=50000, sample_size=10000, engine_options=None,
+            engine=None, engine_setup=None, initializer=None, initargs=()):
+    """
+    Równoległa ekstrakcja tabeli: zakresy klucza czytane w osobnych procesach
+
+    Dekodowanie wierszy (pyodbc/SQLAlchemy) zajmuje jeden rdzeń na
+    połączenie, więc każdy zakres jest pobierany przez osobny proces
+    z własnym silnikiem utworzonym z tego samego URL.
+
+    Args:
+        url (str | URL): URL połączenia, np. z create_connection_url()
+        model: Model deklaratywny (np. User) albo Table
+        path (str, optional): Katalog plików partycji (part-00000.parquet, ...)
+            albo plik wynikowy przy merge=True; None - wiersze zwracane
+            w pamięci, scalone w kolejności klucza
+        partitions (int, optional): Liczba zakresów (domyślnie 4 * workers)
+        workers (int, optional): Liczba procesów (domyślnie liczba rdzeni)
+        method (str): "minmax" albo "histogram" (zob. key_ranges())
+        key (str, optional): Kolumna podziału (domyślnie klucz główny)
+        format (str, optional): "parquet", "arrow" albo "csv" (domyślnie
+            z rozszerzenia pliku, dla katalogu parquet)
+        merge (bool): Scal pliki partycji w jeden plik `path` (w kolejności klucza)
+        chunk_size (int): Liczba wierszy w paczce zapisu
+        sample_size (int): Wielkość próbki dla method="histogram"
+        engine_options (dict, optional): Opcje create_engine() procesów roboczych
+        engine (Engine, optional): Silnik do wyznaczenia zakresów (domyślnie
+            tymczasowy silnik z `url`)
+        engine_setup (callable, optional): Funkcja (serializowalna - pickle)
+            wywoływana z każdym nowym silnikiem procesu roboczego, np.
+            sql_token.WorkerTokenSetup dla uwierzytelniania tokenem
+        initializer (callable, optional): Funkcja uruchamiana w każdym procesie
+            roboczym przed pracą (np. pobranie biletu Kerberos - bufor
+            MEMORY: nie jest dzielony między procesami)
+        initargs (tuple): Argumenty funkcji initializer
+
+    Returns:
+        ExtractResult: pliki albo wiersze partycji i statystyki
+    """
+    table = table_of(model)
+    column = key_column(table, key)
+    workers = workers or os.cpu_count() or 1
+    partitions = partitions or 4 * workers
+    engine_options = worker_engine_options(engine_options)
+    if path is not None:
+        path = str(path)
+        if format is None:
+            extension = os.path.splitext(path)[1].lower().lstrip(".")
+            extension = {"pq": "parquet", "feather": "arrow", "ipc": "arrow"}.get(extension, extension)
+            # Katalog partycji bez rozszerzenia - domyślnie Parquet
+            format = extension if extension in FORMATS else "parquet"
+        if format not in FORMATS:
+            raise ValueError(f"Nieobsługiwany format eksportu: {format}")
+    elif merge:
+        raise ValueError("merge=True wymaga podania path")
+
+    started = time.perf_counter()
+    owned = engine is None
+    if owned:
+        engine = _create_engine(url, engine_options, engine_setup)
+    try:
+        ranges = key_ranges(engine, table, partitions, method, column.key, sample_size)
+        # Wspólny schemat - pliki partycji muszą mieć te same typy, żeby je scalić
+        schema = partition_schema(engine, table) if format in ("parquet", "arrow") else None
+    finally:
+        if owned:
+            engine.dispose()
+
+    directory = None
+    if path is not None:
+        directory = f"{path}.parts" if merge else path
+        os.makedirs(directory, exist_ok=True)
+        # Pliki partycji poprzedniej ekstrakcji (np. z większą liczbą zakresów)
+        for stale in glob.glob(os.path.join(directory, "part-[0-9]*.*")):
+            os.remove(stale)
+    if isinstance(url, str):
+        worker_url = url
+    else:
+        # URL.__str__ ukrywa hasło
+        worker_url = url.render_as_string(hide_password=False)
+    tasks = [
+        (
+            index, worker_url, engine_options, engine_setup, table, column.key, low, high,
+            os.path.join(directory, f"part-{index:05d}.{format}") if directory else None,
+            format, chunk_size, schema,
+        )
+        for index, (low, high) in enumerate(ranges)
+    ]
+    logger.info(
+        f"Ekstrakcja {table.name}: {len(tasks)} zakresów ({method}), {workers} procesów"
+    )
+
+    results = [None] * len(tasks)
+    try:
+        with ProcessPoolExecutor(workers, initializer=initializer, initargs=initargs) as pool:
+            for index, rows, seconds, data in pool.map(_extract_partition, tasks):
+                low, high = ranges[index]
+                results[index] = {
+                    "index": index,
+                    "low": low,
+                    "high": high,
+                    "rows": rows,
+                    "seconds": seconds,
+                    "path": tasks[index][8],
+                    "data": data,
+                }
+    except Exception as e:
+        logger.error(f"Błąd ekstrakcji {table.name}: {e}")
+        raise
+
+    rows = None
+    if path is None:
+        # Zakresy są rozłączne i uporządkowane - konkatenacja zachowuje kolejność klucza
+        rows = [row for partition in results for row in partition.pop("data")]
+    else:
+        for partition in results:
+            partition.pop("data")
+        if merge:
+            _merge_files([partition["path"] for partition in results], path, format)
+            shutil.rmtree(directory)
+            for partition in results:
+                partition["path"] = None
+
+    extract_result = ExtractResult(path, results, rows, time.perf_counter() - started, workers)
+    logger.info(
+        f"Wyekstrahowano {extract_result.row_count} wierszy z {table.name} "
+        f"({extract_result.rows_per_second:.0f} wierszy/s, {workers} procesów)"
+    )
+    return extract_result
@@ -0,0 +1,206 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from sqlalchemy import event
+import logging
+import threading
+import time
+from sql_stream import as_statement
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Odstęp (s) między kolejnymi próbami przerwania anulowanego zapytania
+CANCEL_RETRY_INTERVAL = 0.05
+
+
+class QueryTimeout(Exception):
+    """
+    Zapytanie przekroczyło limit czasu i zostało anulowane
+    """
+
+
+class QueryCancelled(Exception):
+    """
+    Zapytanie anulowane, zanim zdążyło się wykonać
+    """
+
+
+class _Task:
+    def __init__(self, index, statement, params, timeout):
+        self.index = index
+        self.statement = statement
+        self.params = params
+        self.timeout = timeout
+        self.started_at = None
+        self.timed_out = False
+        self.cancelled = False
+        self._dbapi_connection = None
+        self._cursor = None
+        self._lock = threading.Lock()
+
+    def _cancelled_error(self):
+        if self.timed_out:
+            return QueryTimeout(f"Zapytanie {self.index} przekroczyło limit {self.timeout} s")
+        return QueryCancelled(f"Zapytanie {self.index} anulowane")
+
+    def run(self, engine):
+        with self._lock:
+            if self.cancelled:
+                raise self._cancelled_error()
+            self.started_at = time.monotonic()
+        with engine.connect() as connection:
+            dbapi_connection = connection.connection.dbapi_connection
+            with self._lock:
+                # Anulowanie mogło przyjść w trakcie pobierania połączenia z puli
+                if self.cancelled:
+                    raise self._cancelled_error()
+                self._dbapi_connection = dbapi_connection
+            # pyodbc: limit czasu zapytania egzekwowany przez sterownik/serwer
+            query_timeout = getattr(dbapi_connection, 'timeout', None)
+            if self.timeout is not None and query_timeout is not None:
+                dbapi_connection.timeout = max(1, int(self.timeout + 0.999))
+
+            def remember_cursor(conn, cursor, statement, parameters, context, executemany):
+                with self._lock:
+                    if self.cancelled:
+                        raise self._cancelled_error()
+                    self._cursor = cursor
+
+            event.listen(connection, "before_cursor_execute", remember_cursor)
+            try:
+                return connection.execute(self.statement, self.params).all()
+            except Exception:
+                if self.cancelled:
+                    raise self._cancelled_error()
+                raise
+            finally:
+                # Pod blokadą: cancel() nie może przerwać połączenia, które
+                # wróciło już do puli i wykonuje inne zapytanie
+                with self._lock:
+                    self._dbapi_connection = None
+                    self._cursor = None
+                event.remove(connection, "before_cursor_execute", remember_cursor)
+                if self.timeout is not None and query_timeout is not None:
+                    dbapi_connection.timeout = query_timeout
+
+    def overdue(self, now):
+        return (
+            self.timeout is not None
+            and self.started_at is not None
+            and now - self.started_at > self.timeout
+        )
+
+    def cancel(self, timed_out=False):
+        """
+        Przerywa zapytanie (sqlite3: interrupt(), pyodbc: cursor.cancel())
+        """
+        with self._lock:
+            already_cancelled = self.cancelled
+            self.cancelled = True
+            self.timed_out = self.timed_out or timed_out
+            running = self._interrupt()
+        if running and not already_cancelled:
+            # Przerwanie tuż przed startem zapytania w sterowniku nie działa -
+            # ponawiane, dopóki run() nie odda połączenia
+            threading.Thread(
+                target=self._keep_interrupting, name=f"sql-fanout-cancel-{self.index}",
+                daemon=True,
+            ).start()
+
+    def _interrupt(self):
+        # Wywoływane pod blokadą - run() nie odda w tym czasie połączenia do puli
+        dbapi_connection, cursor = self._dbapi_connection, self._cursor
+        try:
+            if dbapi_connection is not None and hasattr(dbapi_connection, 'interrupt'):
+                dbapi_connection.interrupt()
+            elif cursor is not None and hasattr(cursor, 'cancel'):
+                cursor.cancel()
+            else:
+                return False
+        except Exception as e:
+            logger.warning(f"Nie udało się anulować zapytania {self.index}: {str(e)}")
+            return False
+        return True
+
+    def _keep_interrupting(self, interval=CANCEL_RETRY_INTERVAL):
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                if not self._interrupt():
+                    return
+
+
+def _normalize(item):
+    if isinstance(item, tuple):
+        query, params = item
+        return as_statement(query), params
+    return as_statement(item), None
+
+
+def fan_out(engine, statements, max_workers=8, timeout=None, return_exceptions=False):
+    """
+    Wykonuje niezależne zapytania równolegle, każde na osobnym połączeniu z puli
+
+    Args:
+        engine (Engine): Silnik SQLAlchemy
+        statements (list): Zapytania albo krotki (zapytanie, parametry)
+        max_workers (int): Maksymalna liczba zapytań wykonywanych naraz
+        timeout (float, optional): Limit czasu pojedynczego zapytania liczony
+            od jego startu (nie od kolejki)
+        return_exceptions (bool): Jeśli True, błędy trafiają na listę wyników
+            zamiast przerywać całość
+
+    Returns:
+        list: Wiersze każdego zapytania, w kolejności wejściowej
+    """
+    tasks = [
+        _Task(index, statement, params, timeout)
+        for index, (statement, params) in enumerate(map(_normalize, statements))
+    ]
+    if not tasks:
+        return []
+
+    results = [None] * len(tasks)
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(tasks))), thread_name_prefix="sql-fanout"
+    )
+    futures = {executor.submit(task.run, engine): task for task in tasks}
+    pending = set(futures)
+    abandoned = False
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=0.05 if timeout is not None else None,
+                                 return_when=FIRST_COMPLETED)
+            failed = []
+            for future in done:
+                task = futures[future]
+                try:
+                    results[task.index] = future.result()
+                except Exception as e:
+                    failed.append((task, e))
+
+            # Zapytania po czasie: anuluj i nie czekaj dłużej na wynik
+            now = time.monotonic()
+            for future in list(pending):
+                task = futures[future]
+                if task.overdue(now):
+                    task.cancel(timed_out=True)
+                    pending.discard(future)
+                    abandoned = True
+                    failed.append((task, QueryTimeout(
+                        f"Zapytanie {task.index} przekroczyło limit {task.timeout} s"
+                    )))
+
+            for task, error in failed:
+                if not return_exceptions:
+                    raise error
+                results[task.index] = error
+    except BaseException:
+        # Pierwszy błąd przerywa pozostałe zapytania
+        for future in pending:
+            future.cancel()
+            futures[future].cancel()
+        abandoned = True
+        raise
+    finally:
+        executor.shutdown(wait=not abandoned, cancel_futures=True)
+    return results
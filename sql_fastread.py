@@ -0,0 +1,150 @@
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+from sqlalchemy.engine.cursor import CursorFetchStrategy
+from sqlalchemy.sql.expression import FromClause
+import logging
+from sql_stream import as_statement
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Ostrzeżenie o braku szybkiej ścieżki wypisywane raz na proces
+_warned = False
+
+
+@lru_cache(maxsize=256)
+def row_class(names):
+    """
+    Zwraca klasę wiersza (krotka z __slots__ = ()) dla podanych nazw kolumn
+
+    Dostęp przez atrybut (row.username) i indeks, bez słownika na wiersz.
+    """
+    return namedtuple("FastRow", names, rename=True)
+
+
+def _select(query):
+    # Model deklaratywny albo Table -> SELECT wszystkich kolumn
+    if hasattr(query, '__table__'):
+        query = query.__table__
+    if isinstance(query, FromClause):
+        return query.select()
+    return as_statement(query)
+
+
+def _processors(result):
+    # Konwersje typów SQLAlchemy (np. tekst -> datetime w SQLite); dla pyodbc
+    # zwykle brak - wtedy wiersze z kursora są używane bez kopiowania
+    if type(result.cursor_strategy) is not CursorFetchStrategy:
+        # Strategia buforująca (np. stream_results) mogła już pobrać wiersze
+        return None
+    processors = getattr(result._metadata, '_effective_processors', None)
+    if processors is None:
+        global _warned
+        if not _warned:
+            _warned = True
+            logger.warning(
+                "Ta wersja SQLAlchemy nie udostępnia procesorów typów wyniku - "
+                "szybki odczyt używa wolniejszej ścieżki przez Row"
+            )
+        return None
+    processors = list(processors)
+    return processors if any(processors) else []
+
+
+def _raw_batches(result, chunk_size):
+    processors = _processors(result)
+    if processors is None:
+        # Nieznana wersja SQLAlchemy albo buforowany wynik - ścieżka przez Row
+        for batch in result.partitions(chunk_size):
+            yield [tuple(row) for row in batch]
+        return
+    cursor = result.cursor
+    while True:
+        batch = cursor.fetchmany(chunk_size)
+        if not batch:
+            return
+        if processors:
+            batch = [
+                tuple(p(v) if p else v for p, v in zip(processors, row)) for row in batch
+            ]
+        yield batch
+
+
+def fetch_tuples(engine, query, params=None, chunk_size=10000):
+    """
+    Pobiera wiersze jako lekkie krotki z nazwanymi polami, bez obiektów ORM
+
+    Zapytanie o model (np. User albo select(User)) zwraca kolumny tabeli;
+    nie powstaje mapa tożsamości ani instrumentacja atrybutów.
+
+    Args:
+        engine (Engine): Silnik SQLAlchemy
+        query: Model, Table, select(...) albo tekst SQL
+        params (dict, optional): Parametry zapytania
+        chunk_size (int): Liczba wierszy pobieranych z kursora naraz
+
+    Returns:
+        list: Krotki z polami o nazwach kolumn
+    """
+    with engine.connect() as connection:
+        result = connection.execute(_select(query), params)
+        make = row_class(tuple(result.keys()))._make
+        rows = []
+        for batch in _raw_batches(result, chunk_size):
+            rows.extend(map(make, batch))
+        result.close()
+    return rows
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _to_array(values, numpy):
+    if numpy is not None:
+        column = numpy.array(values)
+        # Tekst i wartości mieszane zostają obiektami Pythona (bez kopiowania napisów)
+        return column if column.dtype.kind in "biufcmM" else numpy.array(values, dtype=object)
+    if values and all(type(v) is int for v in values):
+        try:
+            return array("q", values)
+        except OverflowError:
+            return values
+    if values and all(type(v) is float for v in values):
+        return array("d", values)
+    return values
+
+
+def fetch_columns(engine, query, params=None, chunk_size=10000, use_numpy=None):
+    """
+    Pobiera wynik kolumnami: {kolumna: tablica wartości}
+
+    Kolumny liczbowe trafiają do tablic NumPy (jeśli zainstalowany) albo
+    array.array, pozostałe do list - bez obiektu na każdy wiersz.
+
+    Args:
+        engine (Engine): Silnik SQLAlchemy
+        query: Model, Table, select(...) albo tekst SQL
+        params (dict, optional): Parametry zapytania
+        chunk_size (int): Liczba wierszy pobieranych z kursora naraz
+        use_numpy (bool, optional): Wymuś (True) albo wyłącz (False) NumPy;
+            domyślnie używany, gdy jest dostępny
+    """
+    numpy = _numpy() if use_numpy is not False else None
+    if use_numpy and numpy is None:
+        raise ImportError("Tryb kolumnowy z NumPy wymaga pakietu numpy (pip install numpy)")
+    with engine.connect() as connection:
+        result = connection.execute(_select(query), params)
+        keys = list(result.keys())
+        columns = [[] for _ in keys]
+        for batch in _raw_batches(result, chunk_size):
+            # Transpozycja paczki: wiersze -> kolumny
+            for column, values in zip(columns, zip(*batch)):
+                column.extend(values)
+        result.close()
+    return {key: _to_array(values, numpy) for key, values in zip(keys, columns)}
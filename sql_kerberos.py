@@ -0,0 +1,317 @@
+from pathlib import Path
+from sqlalchemy import event
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def default_ccache():
+    """
+    Zwraca domyślny credential cache dla bieżącego użytkownika
+    """
+    return os.environ.get('KRB5CCNAME') or "FILE:/tmp/krb5cc_{}".format(os.getuid())
+
+
+def memory_ccache(principal):
+    """
+    Zwraca nazwę credential cache w pamięci procesu (MEMORY:) dla principala
+
+    Każdy principal ma własny cache, więc instancje z różnymi kontami nie
+    nadpisują sobie biletów, a instancje z tym samym kontem współdzielą bilet.
+    """
+    digest = hashlib.sha256(principal.encode()).hexdigest()[:16]
+    return f"MEMORY:sql_con_{digest}"
+
+
+# Realmy zarejestrowane w procesie -> wpis [realms] w wygenerowanej konfiguracji
+_realms = {}
+_config_lock = threading.Lock()
+_base_config = None
+
+
+def krb5_config_dir():
+    """
+    Zwraca katalog na wygenerowane pliki konfiguracji Kerberos
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'sql_con' / 'krb5'
+
+
+def render_krb5_config(realms):
+    """
+    Tworzy treść krb5.conf dla podanych realmów ({realm: kdc})
+    """
+    default_realm = next(iter(realms))
+    sections = [f"""[libdefaults]
+default_realm = {default_realm}
+dns_lookup_realm = false
+dns_lookup_kdc = true
+ticket_lifetime = 24h
+forwardable = true
+proxiable = true
+"""]
+    sections.append("[realms]")
+    for realm, kdc in realms.items():
+        sections.append(f"""{realm} = {{
+    kdc = {kdc}
+    admin_server = {kdc}
+}}""")
+    sections.append("\n[domain_realm]")
+    for realm in realms:
+        sections.append(f".{realm.lower()} = {realm}\n{realm.lower()} = {realm}")
+    return "\n".join(sections) + "\n"
+
+
+def krb5_config(realm, kdc=None):
+    """
+    Zwraca ścieżkę wygenerowanej konfiguracji Kerberos obejmującej realm
+
+    Plik zawiera wszystkie realmy zarejestrowane w procesie i jest nazwany
+    skrótem treści, więc powstaje raz i nie jest nadpisywany ani usuwany przy
+    kolejnych connect(). KRB5_CONFIG wskazuje go przed dotychczasową
+    konfiguracją (np. /etc/krb5.conf), która dalej obowiązuje.
+
+    Args:
+        realm (str): Realm Kerberos (np. FIRMA.COM)
+        kdc (str, optional): Adres KDC (domyślnie nazwa domeny)
+    """
+    global _base_config
+    realm = realm.upper()
+    with _config_lock:
+        _realms.setdefault(realm, kdc or realm.lower())
+        content = render_krb5_config(_realms)
+        digest = hashlib.sha256(content.encode()).hexdigest()[:16]
+        path = krb5_config_dir() / f"krb5_{digest}.conf"
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_suffix(f".{os.getpid()}.tmp")
+            temporary.write_text(content)
+            os.replace(temporary, path)
+            logger.info(f"Zapisano konfigurację Kerberos: {path}")
+
+        if _base_config is None:
+            _base_config = os.environ.get('KRB5_CONFIG', '/etc/krb5.conf')
+        # MIT Kerberos łączy pliki z listy rozdzielonej dwukropkami
+        config = f"{path}:{_base_config}" if _base_config else str(path)
+        if os.environ.get('KRB5_CONFIG') != config:
+            os.environ['KRB5_CONFIG'] = config
+        return path
+
+
+def _thread_ccache(name):
+    """
+    Ustawia credential cache GSSAPI dla bieżącego wątku i zwraca poprzedni
+    """
+    import gssapi.raw
+
+    return gssapi.raw.krb5_ccache_name(name.encode() if isinstance(name, str) else name)
+
+
+def bind_ccache(engine, ccache):
+    """
+    Wiąże nowe połączenia silnika z credential cache (jednokrotnie)
+
+    Sterownik ODBC uwierzytelnia się przez GSSAPI w wątku, który otwiera
+    połączenie; na czas logowania wątek dostaje ccache tej instancji
+    (gss_krb5_ccache_name), bez zmiany KRB5CCNAME całego procesu.
+    """
+    if getattr(engine, 'kerberos_ccache', None) is not None:
+        return engine.kerberos_ccache
+    engine.kerberos_ccache = ccache
+
+    def connect_with_ccache(dialect, connection_record, cargs, cparams):
+        previous = _thread_ccache(ccache)
+        try:
+            return dialect.connect(*cargs, **cparams)
+        finally:
+            _thread_ccache(previous)
+
+    event.listen(engine, "do_connect", connect_with_ccache)
+    return ccache
+
+
+def renewal_delay(lifetime, renew_fraction=0.75, jitter=0.0, min_delay=30):
+    """
+    Oblicza po ilu sekundach należy odnowić bilet
+
+    Args:
+        lifetime (float): Pozostały czas życia biletu w sekundach
+        renew_fraction (float): Ułamek czasu życia, po którym odnawiamy bilet
+        jitter (float): Maksymalne losowe przesunięcie (ułamek opóźnienia),
+            żeby wiele procesów nie odnawiało biletów w tej samej chwili
+        min_delay (float): Minimalne opóźnienie w sekundach
+    """
+    if lifetime is None:
+        return None
+    delay = lifetime * renew_fraction
+    if jitter:
+        delay -= delay * random.uniform(0, jitter)
+    return max(min_delay, delay)
+
+
+def _load_credentials(principal, ccache):
+    """
+    Odczytuje istniejący bilet z credential cache (bez ruchu do KDC)
+    """
+    import gssapi
+
+    name = gssapi.Name(principal, name_type=gssapi.NameType.user)
+    try:
+        return gssapi.Credentials(name=name, usage='initiate', store={'ccache': ccache})
+    except gssapi.exceptions.GSSError:
+        return None
+
+
+def _acquire_credentials(principal, password, ccache):
+    """
+    Uzyskuje nowy bilet TGT z KDC i zapisuje go w credential cache
+    """
+    import gssapi
+
+    name = gssapi.Name(principal, name_type=gssapi.NameType.user)
+    result = gssapi.raw.acquire_cred_with_password(
+        name, password.encode(), usage='initiate'
+    )
+    creds = gssapi.Credentials(result.creds)
+    creds.store(store={'ccache': ccache}, usage='initiate', overwrite=True)
+    return creds
+
+
+class KerberosTicketManager:
+    def __init__(self, principal, password, ccache=None, renew_fraction=0.75,
+                 min_lifetime=300, jitter=0.1, load_credentials=None,
+                 acquire_credentials=None, clock=time.monotonic):
+        """
+        Zarządza biletem Kerberos: używa ponownie ważnego biletu z ccache
+        i odnawia go w tle zanim wygaśnie
+
+        Args:
+            principal (str): Principal Kerberos (user@DOMENA.COM)
+            password (str): Hasło użytkownika
+            ccache (str, optional): Credential cache (domyślnie KRB5CCNAME
+                lub FILE:/tmp/krb5cc_<uid>)
+            renew_fraction (float): Ułamek czasu życia biletu, po którym
+                bilet jest odnawiany w tle
+            min_lifetime (int): Minimalny pozostały czas życia (s), przy którym
+                istniejący bilet jest jeszcze używany
+            jitter (float): Losowe przesunięcie momentu odnowienia
+            load_credentials (callable, optional): Funkcja (principal, ccache)
+                zwracająca obiekt z atrybutem `lifetime` lub None
+            acquire_credentials (callable, optional): Funkcja
+                (principal, password, ccache) uzyskująca nowy bilet
+            clock (callable): Źródło czasu (monotoniczne)
+        """
+        self.principal = principal
+        self.password = password
+        self.ccache = ccache or default_ccache()
+        self.renew_fraction = renew_fraction
+        self.min_lifetime = min_lifetime
+        self.jitter = jitter
+        self._load = load_credentials or _load_credentials
+        self._acquire = acquire_credentials or _acquire_credentials
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._timer = None
+        self.credentials = None
+        self.expires_at = None
+        self.acquired_count = 0
+        self.reused_count = 0
+
+    def remaining_lifetime(self):
+        """
+        Zwraca pozostały czas życia bieżącego biletu w sekundach
+        """
+        if self.expires_at is None:
+            return 0
+        return max(0, self.expires_at - self._clock())
+
+    def _remember(self, creds):
+        lifetime = getattr(creds, 'lifetime', None)
+        self.credentials = creds
+        # lifetime=None oznacza bilet bez ograniczenia czasu
+        self.expires_at = None if lifetime is None else self._clock() + lifetime
+        return lifetime
+
+    def ensure_ticket(self):
+        """
+        Zapewnia ważny bilet: najpierw sprawdza ccache, a do KDC idzie
+        tylko wtedy, gdy bilet wygasł lub kończy się jego ważność
+        """
+        with self._lock:
+            if self.credentials is not None and (
+                self.expires_at is None or self.remaining_lifetime() > self.min_lifetime
+            ):
+                if self.expires_at is not None and (self._timer is None or not self._timer.is_alive()):
+                    # Odnawianie zatrzymane przez stop() - wznów przy ponownym użyciu
+                    self._schedule_renewal()
+                return self.credentials
+
+            creds = self._load(self.principal, self.ccache)
+            lifetime = getattr(creds, 'lifetime', None) if creds is not None else 0
+            if creds is not None and (lifetime is None or lifetime > self.min_lifetime):
+                self._remember(creds)
+                self.reused_count += 1
+                logger.info(
+                    f"Używam istniejącego biletu Kerberos dla {self.principal} "
+                    f"(ważny jeszcze {lifetime} s)"
+                )
+            else:
+                self.renew()
+            self._schedule_renewal()
+            return self.credentials
+
+    def renew(self):
+        """
+        Uzyskuje nowy bilet z KDC
+        """
+        with self._lock:
+            creds = self._acquire(self.principal, self.password, self.ccache)
+            lifetime = self._remember(creds)
+            self.acquired_count += 1
+            logger.info(f"Uzyskano bilet Kerberos dla {self.principal} (ważny {lifetime} s)")
+            return creds
+
+    def _schedule_renewal(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        delay = renewal_delay(
+            None if self.expires_at is None else self.remaining_lifetime(),
+            self.renew_fraction, self.jitter,
+        )
+        if delay is None:
+            return
+        self._timer = threading.Timer(delay, self._renew_in_background)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _renew_in_background(self):
+        try:
+            with self._lock:
+                self.renew()
+                self._schedule_renewal()
+        except Exception as e:
+            logger.error(f"Błąd podczas odnawiania biletu Kerberos: {str(e)}")
+            # Spróbuj ponownie, dopóki stary bilet jest jeszcze ważny
+            with self._lock:
+                if self.remaining_lifetime() > 0:
+                    self._timer = threading.Timer(
+                        min(60, self.remaining_lifetime() / 2), self._renew_in_background
+                    )
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def stop(self):
+        """
+        Zatrzymuje odnawianie biletu w tle
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
@@ -0,0 +1,114 @@
+import bisect
+import threading
+
+# Domyślne przedziały histogramów czasu (w sekundach)
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Prosty histogram kumulatywny zgodny z formatem Prometheus
+
+        Args:
+            buckets (tuple): Rosnące górne granice przedziałów
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """
+        Dodaje pomiar do histogramu
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+
+    def quantile(self, q):
+        """
+        Szacuje kwantyl: interpolacja liniowa wewnątrz przedziału, w którym
+        leży, nie więcej niż największy zaobserwowany pomiar
+        """
+        with self._lock:
+            if not self._count:
+                return 0.0
+            target = q * self._count
+            running = 0
+            lower = 0.0
+            for bound, count in zip(self.buckets, self._counts):
+                if count and running + count >= target:
+                    upper = min(bound, self._max)
+                    fraction = max(0.0, target - running) / count
+                    return min(lower + (upper - lower) * fraction, self._max)
+                running += count
+                lower = bound
+            return self._max
+
+    def snapshot(self):
+        """
+        Zwraca stan histogramu jako słownik
+        """
+        with self._lock:
+            cumulative = []
+            running = 0
+            for bound, count in zip(self.buckets, self._counts):
+                running += count
+                cumulative.append((bound, running))
+            return {
+                "count": self._count,
+                "sum": self._sum,
+                "max": self._max,
+                "buckets": cumulative,
+            }
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra=None):
+    items = dict(labels or {})
+    if extra:
+        items.update(extra)
+    if not items:
+        return ""
+    body = ",".join(
+        f'{key}="{_escape(value)}"' for key, value in items.items()
+    )
+    return "{" + body + "}"
+
+
+def render_counter(name, value, help_text, labels=None, kind="counter"):
+    """
+    Formatuje licznik (lub wskaźnik - kind="gauge") w formacie tekstowym Prometheus
+    """
+    return (
+        f"# HELP {name} {help_text}\n"
+        f"# TYPE {name} {kind}\n"
+        f"{name}{_labels(labels)} {value}\n"
+    )
+
+
+def render_histogram(name, histogram, help_text, labels=None):
+    """
+    Formatuje histogram w formacie tekstowym Prometheus
+    """
+    snap = histogram.snapshot() if isinstance(histogram, Histogram) else histogram
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for bound, count in snap["buckets"]:
+        lines.append(f"{name}_bucket{_labels(labels, {'le': bound})} {count}")
+    lines.append(f"{name}_bucket{_labels(labels, {'le': '+Inf'})} {snap['count']}")
+    lines.append(f"{name}_sum{_labels(labels)} {snap['sum']}")
+    lines.append(f"{name}_count{_labels(labels)} {snap['count']}")
+    return "\n".join(lines) + "\n"
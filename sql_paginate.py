@@ -0,0 +1,188 @@
+from sqlalchemy import and_, inspect, or_, select
+from sqlalchemy.orm import Session
+import base64
+import datetime
+import decimal
+import json
+import logging
+import uuid
+from sql_bulk import table_of
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"d": value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {"t": value.isoformat()}
+    if isinstance(value, uuid.UUID):
+        return {"u": str(value)}
+    if isinstance(value, decimal.Decimal):
+        return {"dec": str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {"b": base64.b64encode(value).decode()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return datetime.date.fromisoformat(value["d"])
+        if "t" in value:
+            return datetime.time.fromisoformat(value["t"])
+        if "u" in value:
+            return uuid.UUID(value["u"])
+        if "dec" in value:
+            return decimal.Decimal(value["dec"])
+        if "b" in value:
+            return base64.b64decode(value["b"])
+    return value
+
+
+def encode_cursor(values):
+    """
+    Zamienia wartości klucza ostatniego wiersza na nieprzezroczysty token
+    """
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Odczytuje wartości klucza z tokenu utworzonego przez encode_cursor()
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise ValueError("Nieprawidłowy token stronicowania") from None
+    if not isinstance(values, list):
+        raise ValueError("Nieprawidłowy token stronicowania")
+    try:
+        values = [_decode_value(v) for v in values]
+    except (ValueError, TypeError, ArithmeticError):
+        raise ValueError("Nieprawidłowy token stronicowania") from None
+    # Zmieniony token z obiektem albo listą zamiast wartości klucza
+    if any(isinstance(v, (dict, list)) for v in values):
+        raise ValueError("Nieprawidłowy token stronicowania")
+    return values
+
+
+def keyset_predicate(columns, values, descending=False):
+    """
+    Buduje warunek "za ostatnim wierszem" dla klucza wielokolumnowego
+
+    (a, b) > (x, y) rozpisane jako a > x OR (a = x AND b > y), bo SQL Server
+    nie obsługuje porównań krotek.
+    """
+    alternatives = []
+    for index, column in enumerate(columns):
+        after = column < values[index] if descending else column > values[index]
+        equal = [columns[i] == values[i] for i in range(index)]
+        alternatives.append(and_(*equal, after) if equal else after)
+    return or_(*alternatives)
+
+
+class Page:
+    def __init__(self, items, next_cursor):
+        """
+        Strona wyników i token następnej strony (None - ostatnia strona)
+        """
+        self.items = items
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return f"Page(items={len(self.items)}, next_cursor={self.next_cursor!r})"
+
+
+def _key_columns(model, order_by):
+    table = table_of(model)
+    orm = table is not model
+    if order_by is None:
+        if orm:
+            mapper = inspect(model)
+            order_by = [mapper.get_property_by_column(c).key for c in mapper.primary_key]
+        else:
+            order_by = [c.key for c in table.primary_key.columns]
+        if not order_by:
+            raise ValueError(f"Tabela {table.name} nie ma klucza głównego - podaj order_by")
+    elif not isinstance(order_by, (list, tuple)):
+        order_by = [order_by]
+    # Atrybuty modelu (ORM) albo kolumny tabeli
+    return [
+        (getattr(model, c) if orm else table.c[c]) if isinstance(c, str) else c
+        for c in order_by
+    ]
+
+
+def paginate(engine, model, order_by=None, page_size=1000, cursor=None, where=None,
+             descending=False):
+    """
+    Stronicuje tabelę metodą keyset (seek) zamiast OFFSET/LIMIT
+
+    Każda strona to zapytanie "WHERE klucz > ostatni klucz ORDER BY klucz",
+    które korzysta z indeksu, więc strona tysięczna kosztuje tyle co pierwsza.
+    Strony są czytane w osobnych, krótkich sesjach; iterację można przerwać
+    i wznowić od `next_cursor` dowolnej strony.
+
+    Args:
+        engine (Engine): Silnik SQLAlchemy
+        model: Model deklaratywny (np. User) albo Table
+        order_by (list, optional): Kolumny unikalnego klucza (domyślnie klucz
+            główny), np. [User.username, User.id]
+        page_size (int): Liczba wierszy na stronie
+        cursor (str, optional): Token strony, od której zacząć
+        where (optional): Dodatkowy warunek zapytania
+        descending (bool): Kolejność malejąca
+
+    Argumenty i token są sprawdzane od razu, a nie przy pierwszym next().
+
+    Returns:
+        generator: Obiekty Page - obiekty modelu (albo wiersze tabeli) i token
+            następnej strony
+    """
+    if page_size < 1:
+        raise ValueError("page_size musi być dodatni")
+    columns = _key_columns(model, order_by)
+    values = decode_cursor(cursor) if cursor else None
+    if values is not None and len(values) != len(columns):
+        raise ValueError("Token stronicowania nie pasuje do klucza")
+    return _pages(engine, model, columns, values, page_size, where, descending)
+
+
+def _pages(engine, model, columns, values, page_size, where, descending):
+    base = select(model)
+    if where is not None:
+        base = base.where(where)
+    ordering = [c.desc() if descending else c.asc() for c in columns]
+    key_names = [c.key for c in columns]
+    orm = table_of(model) is not model
+
+    while True:
+        statement = base
+        if values is not None:
+            statement = statement.where(keyset_predicate(columns, values, descending))
+        statement = statement.order_by(*ordering).limit(page_size)
+        with Session(engine) as session:
+            result = session.execute(statement)
+            items = result.scalars().all() if orm else result.all()
+        if not items:
+            return
+        last = items[-1]
+        values = [getattr(last, name) for name in key_names]
+        next_cursor = encode_cursor(values) if len(items) == page_size else None
+        yield Page(items, next_cursor)
+        if next_cursor is None:
+            return
@@ -0,0 +1,209 @@
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+import logging
+import threading
+import time
+import weakref
+from sql_metrics import Histogram, render_counter, render_histogram
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Przedziały wieku połączeń (w sekundach) - od sekund do kilku godzin
+AGE_BUCKETS = (1, 10, 60, 300, 900, 1800, 3600, 7200, 14400)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool mierzący czas oczekiwania na połączenie z puli
+    """
+    metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.increment("timeouts")
+            raise
+        # Odczytywane przez PoolMetrics w zdarzeniu checkout (nie w `info`,
+        # bo recykling połączenia czyści `info` przed zdarzeniem checkout)
+        record.checkout_wait = time.perf_counter() - started
+        return record
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+# SQLAlchemy nazywa logger puli od modułu klasy, więc ta pula loguje poza
+# drzewem "sqlalchemy" - domyślnie tak jak SQLAlchemy tylko ostrzeżenia
+_pool_logger = logging.getLogger(f"{__name__}.InstrumentedQueuePool")
+if _pool_logger.level == logging.NOTSET:
+    _pool_logger.setLevel(logging.WARN)
+
+
+def pool_label(url):
+    """
+    Zwraca etykietę puli (backend, serwer, baza) bez danych uwierzytelniających
+    """
+    host, database = url.host, url.database
+    odbc_connect = url.query.get('odbc_connect')
+    if odbc_connect:
+        # URL z odbc_connect zawiera serwer i bazę (oraz hasło) w stringu ODBC
+        params = {}
+        for item in odbc_connect.split(';'):
+            key, _, value = item.partition('=')
+            params[key.strip().upper()] = value.strip()
+        host, database = params.get('SERVER'), params.get('DATABASE')
+    return f"{url.get_backend_name()}://{host or ''}/{database or ''}"
+
+
+def default_pool_class(url):
+    """
+    Zwraca klasę puli używaną przez dialekt dla danego URL
+    """
+    return url.get_dialect().get_pool_class(url)
+
+
+class PoolMetrics:
+    COUNTERS = (
+        "connects", "checkouts", "checkins", "invalidations",
+        "pre_ping_failures", "recycles", "timeouts",
+    )
+
+    def __init__(self, name="default"):
+        """
+        Metryki puli połączeń: histogramy czasu oczekiwania i wieku połączeń
+        oraz liczniki zdarzeń puli
+
+        Args:
+            name (str): Nazwa puli (etykieta w metrykach)
+        """
+        self.name = name
+        self.engine = None
+        self.checkout_wait = Histogram()
+        self.connection_age = Histogram(AGE_BUCKETS)
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+        self._seen = weakref.WeakSet()
+        self._invalidated = weakref.WeakSet()
+
+    @classmethod
+    def attach(cls, engine, name=None):
+        """
+        Podpina metryki do silnika (jednokrotnie - silnik może być współdzielony)
+        """
+        existing = getattr(engine, 'pool_metrics', None)
+        if existing is not None:
+            return existing
+        metrics = cls(name or pool_label(engine.url))
+        metrics.engine = engine
+        engine.pool_metrics = metrics
+        if isinstance(engine.pool, InstrumentedQueuePool):
+            engine.pool.metrics = metrics
+
+        event.listen(engine, "connect", metrics.on_connect)
+        event.listen(engine, "checkout", metrics.on_checkout)
+        event.listen(engine, "checkin", metrics.on_checkin)
+        event.listen(engine, "invalidate", metrics.on_invalidate)
+        return metrics
+
+    def increment(self, counter, value=1):
+        with self._lock:
+            self.counters[counter] += value
+
+    def on_connect(self, dbapi_connection, connection_record):
+        connection_record.info['created_at'] = time.time()
+        self.increment("connects")
+        with self._lock:
+            # Ponowne połączenie rekordu, który nie został unieważniony,
+            # oznacza recykling (pool_recycle lub unieważnienie puli)
+            if connection_record in self._seen and connection_record not in self._invalidated:
+                self.counters["recycles"] += 1
+            self._invalidated.discard(connection_record)
+            self._seen.add(connection_record)
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.increment("checkouts")
+        wait = getattr(connection_record, 'checkout_wait', None)
+        if wait is not None:
+            connection_record.checkout_wait = None
+            self.checkout_wait.observe(wait)
+        created_at = connection_record.info.get('created_at')
+        if created_at is not None:
+            self.connection_age.observe(time.time() - created_at)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        self.increment("checkins")
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.increment("invalidations")
+        if isinstance(exception, exc.DisconnectionError):
+            # pool_pre_ping zgłasza niedziałające połączenie jako DisconnectionError
+            self.increment("pre_ping_failures")
+        with self._lock:
+            self._invalidated.add(connection_record)
+
+    def pool_state(self):
+        """
+        Zwraca bieżący stan puli (rozmiar, pobrane połączenia, nasycenie)
+        """
+        pool = self.engine.pool if self.engine is not None else None
+        if not isinstance(pool, QueuePool):
+            return {}
+        size = pool.size()
+        capacity = size + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        return {
+            "size": size,
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "checked_in": pool.checkedin(),
+            "checked_out": checked_out,
+            "overflow": pool.overflow(),
+            "saturation": checked_out / capacity if capacity > 0 else 0.0,
+        }
+
+    def snapshot(self):
+        """
+        Zwraca wszystkie metryki jako słownik
+        """
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "pool": self.name,
+            "counters": counters,
+            "state": self.pool_state(),
+            "checkout_wait": self.checkout_wait.snapshot(),
+            "connection_age": self.connection_age.snapshot(),
+        }
+
+    def prometheus(self, prefix="sql_pool"):
+        """
+        Zwraca metryki w formacie tekstowym Prometheus
+        """
+        snap = self.snapshot()
+        labels = {"pool": self.name}
+        parts = []
+        for counter, value in snap["counters"].items():
+            parts.append(render_counter(
+                f"{prefix}_{counter}_total", value, f"Liczba zdarzeń puli: {counter}", labels
+            ))
+        for key in ("size", "checked_in", "checked_out", "overflow", "saturation"):
+            if key in snap["state"]:
+                parts.append(render_counter(
+                    f"{prefix}_{key}", snap["state"][key], f"Stan puli: {key}", labels,
+                    kind="gauge",
+                ))
+        parts.append(render_histogram(
+            f"{prefix}_checkout_wait_seconds", snap["checkout_wait"],
+            "Czas oczekiwania na połączenie z puli", labels,
+        ))
+        parts.append(render_histogram(
+            f"{prefix}_connection_age_seconds", snap["connection_age"],
+            "Wiek połączenia w chwili pobrania z puli", labels,
+        ))
+        return "".join(parts)
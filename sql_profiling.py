@@ -0,0 +1,254 @@
+from collections import deque
+from functools import lru_cache
+from sqlalchemy import event
+import logging
+import random
+import re
+import threading
+import time
+from sql_metrics import Histogram
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger(f"{__name__}.slow")
+
+# Kolejność ma znaczenie: komentarze i literały przed liczbami i parametrami
+_FINGERPRINT_RULES = (
+    (re.compile(r"--[^\n]*|/\*.*?\*/", re.S), " "),
+    (re.compile(r"N?'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "?"),
+    (re.compile(r"(?<![\w@#$])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b"), "?"),
+    (re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|@P\d+"), "?"),
+    (re.compile(r"\s+"), " "),
+    # IN (?, ?, ?) i wielowierszowe VALUES - jeden odcisk niezależnie od liczby
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?, ...)"),
+    (re.compile(r"(\(\?(?:, \.\.\.)?\))(?:\s*,\s*\(\?(?:, \.\.\.)?\))+"), r"\1, ..."),
+)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement):
+    """
+    Normalizuje zapytanie do odcisku: literały i parametry zastąpione przez ?,
+    białe znaki scalone, listy IN/VALUES zwinięte
+    """
+    for pattern, replacement in _FINGERPRINT_RULES:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def _value_size(value):
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return len(value)
+    if value is None:
+        return 0
+    return 8
+
+
+class StatementStats:
+    def __init__(self, fingerprint):
+        """
+        Statystyki jednego odcisku zapytania
+        """
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.latency = Histogram()
+
+    def snapshot(self):
+        count = self.count
+        return {
+            "fingerprint": self.fingerprint,
+            "count": count,
+            "errors": self.errors,
+            "total_time": self.total_time,
+            "mean": self.total_time / count if count else 0.0,
+            "p50": self.latency.quantile(0.50),
+            "p99": self.latency.quantile(0.99),
+            "max": self.latency.snapshot()["max"],
+            "rows": self.rows,
+            "bytes": self.bytes,
+        }
+
+
+class _CountingCursor:
+    """
+    Nakładka na kursor DBAPI zliczająca pobrane wiersze i ich przybliżony rozmiar
+    """
+
+    def __init__(self, cursor, profiler, stats):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._stats = stats
+
+    def _count(self, rows):
+        size = 0
+        for row in rows:
+            for value in row:
+                size += _value_size(value)
+        self._profiler._add_fetched(self._stats, len(rows), size)
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count((row,))
+        return row
+
+    def fetchmany(self, *args):
+        return self._count(self._cursor.fetchmany(*args))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._count((row,))
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class QueryProfiler:
+    def __init__(self, slow_threshold=1.0, sample_rate=1.0, max_statements=1000,
+                 slow_log_size=100, count_fetched=True, rng=None):
+        """
+        Profil zapytań silnika: czasy, liczby wierszy i bajtów per odcisk
+        zapytania oraz dziennik wolnych zapytań
+
+        Czas to wykonanie zapytania przez kursor (bez pobierania wierszy);
+        wiersze i bajty są doliczane w miarę pobierania wyniku.
+
+        Args:
+            slow_threshold (float): Próg (s), od którego zapytanie jest wolne
+            sample_rate (float): Odsetek wolnych zapytań trafiających do dziennika
+            max_statements (int): Limit różnych odcisków (nadmiar trafia do "<inne>")
+            slow_log_size (int): Liczba ostatnich wolnych zapytań w pamięci
+            count_fetched (bool): Zliczaj wiersze i bajty pobierane z kursora
+            rng (random.Random, optional): Generator losowy (np. do testów)
+        """
+        self.slow_threshold = slow_threshold
+        self.sample_rate = sample_rate
+        self.max_statements = max_statements
+        self.count_fetched = count_fetched
+        self.rng = rng or random.Random()
+        self.statements = {}
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_engine(cls, engine, **options):
+        """
+        Zwraca profiler silnika, tworząc i podpinając go przy pierwszym użyciu
+        """
+        profiler = getattr(engine, 'query_profiler', None)
+        if profiler is None:
+            profiler = cls(**options).attach(engine)
+            engine.query_profiler = profiler
+        return profiler
+
+    def attach(self, engine):
+        """
+        Podpina pomiar pod before_cursor_execute/after_cursor_execute silnika
+        """
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context.profile_started = time.perf_counter()
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context.profile_started
+            stats = self._record(statement, elapsed)
+            if cursor.description is None:
+                # INSERT/UPDATE/DELETE - liczba zmienionych wierszy
+                if cursor.rowcount is not None and cursor.rowcount >= 0:
+                    self._add_fetched(stats, cursor.rowcount, 0)
+            elif self.count_fetched:
+                # Wynik jest tworzony z context.cursor już po tym zdarzeniu
+                context.cursor = _CountingCursor(cursor, self, stats)
+
+        def handle_error(context):
+            if context.statement is not None:
+                with self._lock:
+                    self._stats(fingerprint(context.statement)).errors += 1
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(engine, "handle_error", handle_error)
+        return self
+
+    def _stats(self, key):
+        stats = self.statements.get(key)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                key = "<inne>"
+                stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats(key)
+        return stats
+
+    def _record(self, statement, elapsed):
+        key = fingerprint(statement)
+        with self._lock:
+            stats = self._stats(key)
+            stats.count += 1
+            stats.total_time += elapsed
+        stats.latency.observe(elapsed)
+        if elapsed >= self.slow_threshold and self.rng.random() < self.sample_rate:
+            entry = {
+                "fingerprint": key,
+                "seconds": elapsed,
+                "timestamp": time.time(),
+                "statement": statement[:2000],
+            }
+            self.slow_queries.append(entry)
+            slow_logger.warning(f"Wolne zapytanie ({elapsed:.3f} s): {key[:500]}")
+        return stats
+
+    def _add_fetched(self, stats, rows, size):
+        with self._lock:
+            stats.rows += rows
+            stats.bytes += size
+
+    def top(self, n=10, by="total_time"):
+        """
+        Zwraca n najbardziej kosztownych zapytań
+
+        Args:
+            n (int): Liczba zapytań
+            by (str): Kryterium: total_time, count, mean, p99, max, rows,
+                bytes albo errors
+        """
+        with self._lock:
+            snapshots = [stats.snapshot() for stats in self.statements.values()]
+        if snapshots and by not in snapshots[0]:
+            raise ValueError(f"Nieznane kryterium sortowania: {by}")
+        return sorted(snapshots, key=lambda item: item[by], reverse=True)[:n]
+
+    def slow_log(self):
+        """
+        Zwraca ostatnie wolne zapytania (od najstarszego)
+        """
+        return list(self.slow_queries)
+
+    def reset(self):
+        """
+        Czyści zebrane statystyki i dziennik wolnych zapytań
+        """
+        with self._lock:
+            self.statements.clear()
+            self.slow_queries.clear()
+
+    def report(self, n=10, by="total_time"):
+        """
+        Zwraca czytelne zestawienie najbardziej kosztownych zapytań
+        """
+        lines = [f"{'liczba':>8} {'suma [s]':>10} {'śr. [ms]':>9} {'p99 [ms]':>9} {'wiersze':>10}  zapytanie"]
+        for item in self.top(n, by):
+            lines.append(
+                f"{item['count']:>8} {item['total_time']:>10.3f} {item['mean'] * 1000:>9.2f} "
+                f"{item['p99'] * 1000:>9.2f} {item['rows']:>10}  {item['fingerprint'][:120]}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,145 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+import hashlib
+import logging
+import os
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _normalize_odbc_connect(conn_str):
+    """
+    Normalizuje string ODBC (kolejność i wielkość liter kluczy)
+    """
+    parts = []
+    for item in conn_str.split(';'):
+        if not item.strip():
+            continue
+        key, _, value = item.partition('=')
+        parts.append((key.strip().upper(), value.strip()))
+    return ';'.join(f"{k}={v}" for k, v in sorted(parts))
+
+
+def normalize_url(url):
+    """
+    Zwraca znormalizowaną postać URL połączenia (używaną jako klucz rejestru)
+    """
+    url = make_url(url)
+    query = {}
+    for key, value in url.query.items():
+        if key.lower() == 'odbc_connect':
+            value = _normalize_odbc_connect(value)
+        query[key.lower()] = value
+    url = url.set(
+        drivername=url.drivername.lower(),
+        host=url.host.lower() if url.host else url.host,
+        query=dict(sorted(query.items())),
+    )
+    return url.render_as_string(hide_password=False)
+
+
+def registry_key(url, engine_options=None, identity=None):
+    """
+    Tworzy klucz rejestru z URL, tożsamości i opcji silnika
+
+    Klucz jest skrótem SHA-256, żeby hasła nie były przechowywane jawnie.
+    """
+    options = sorted((engine_options or {}).items())
+    raw = f"{normalize_url(url)}|{identity}|{options!r}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class RegistryEntry:
+    def __init__(self, key, engine, session_factory):
+        """
+        Wpis rejestru: współdzielony silnik, fabryka sesji i licznik referencji
+        """
+        self.key = key
+        self.engine = engine
+        self.Session = session_factory
+        self.refcount = 0
+        self.pid = os.getpid()
+
+
+class EngineRegistry:
+    def __init__(self):
+        """
+        Rejestr silników SQLAlchemy współdzielonych w obrębie procesu
+
+        Instancje łączące się z tym samym serwerem, bazą i tym samym
+        użytkownikiem dostają ten sam Engine (i jedną pulę połączeń).
+        """
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def acquire(self, url, identity=None, **engine_options):
+        """
+        Zwraca wpis rejestru dla danego URL, tworząc silnik gdy to konieczne
+
+        Args:
+            url (str | URL): URL połączenia
+            identity (str, optional): Tożsamość spoza URL (np. principal
+                Kerberos), która odróżnia pule o tym samym URL
+            **engine_options: Opcje przekazywane do create_engine()
+        """
+        key = registry_key(url, engine_options, identity)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                engine = create_engine(url, **engine_options)
+                entry = RegistryEntry(key, engine, sessionmaker(bind=engine))
+                self._entries[key] = entry
+                logger.info(f"Utworzono nowy silnik w rejestrze ({engine.url.get_backend_name()})")
+            else:
+                self._check_fork(entry)
+            entry.refcount += 1
+            return entry
+
+    def release(self, entry):
+        """
+        Zmniejsza licznik referencji; ostatnie zwolnienie zamyka pulę
+        """
+        with self._lock:
+            if self._entries.get(entry.key) is not entry:
+                return
+            entry.refcount -= 1
+            if entry.refcount <= 0:
+                del self._entries[entry.key]
+                entry.engine.dispose()
+
+    def dispose(self, entry=None):
+        """
+        Zamyka pulę wskazanego wpisu albo wszystkich silników w rejestrze
+        """
+        with self._lock:
+            entries = [entry] if entry is not None else list(self._entries.values())
+            for item in entries:
+                if self._entries.get(item.key) is item:
+                    del self._entries[item.key]
+                item.engine.dispose()
+
+    def _check_fork(self, entry):
+        # Połączeń odziedziczonych po procesie macierzystym nie wolno używać
+        # ani zamykać w procesie potomnym - pula budowana jest od nowa
+        if entry.pid != os.getpid():
+            entry.engine.dispose(close=False)
+            entry.pid = os.getpid()
+
+    def _after_fork(self):
+        # Blokada mogła być zajęta przez inny wątek w chwili fork()
+        self._lock = threading.RLock()
+        for entry in list(self._entries.values()):
+            self._check_fork(entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Rejestr współdzielony przez wszystkie klasy połączeń w procesie
+registry = EngineRegistry()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry._after_fork)
@@ -0,0 +1,230 @@
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+import logging
+import random
+import threading
+import time
+from sql_pool_metrics import pool_label
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _set_odbc_option(conn_str, key, value):
+    parts = [item for item in conn_str.split(';') if item.strip()]
+    parts = [item for item in parts if item.partition('=')[0].strip().upper() != key.upper()]
+    parts.append(f"{key}={value}")
+    return ';'.join(parts)
+
+
+def replica_url(url, host=None, read_intent=True):
+    """
+    Tworzy URL repliki na podstawie URL serwera głównego
+
+    Na SQL Server dodaje ApplicationIntent=ReadOnly (Azure SQL i grupy
+    dostępności kierują wtedy połączenie do repliki do odczytu). Dla innych
+    backendów zmienia tylko host.
+
+    Args:
+        url (str | URL): URL serwera głównego
+        host (str, optional): Host repliki (domyślnie ten sam serwer)
+        read_intent (bool): Dodaj ApplicationIntent=ReadOnly
+    """
+    url = make_url(url)
+    odbc_key = next((k for k in url.query if k.lower() == 'odbc_connect'), None)
+    if odbc_key is not None:
+        conn_str = url.query[odbc_key]
+        if host is not None:
+            conn_str = _set_odbc_option(conn_str, "SERVER", host)
+        if read_intent:
+            conn_str = _set_odbc_option(conn_str, "ApplicationIntent", "ReadOnly")
+        return url.update_query_dict({odbc_key: conn_str})
+    if host is not None:
+        url = url.set(host=host)
+    if read_intent and url.get_backend_name() == "mssql":
+        url = url.update_query_dict({"ApplicationIntent": "ReadOnly"})
+    return url
+
+
+class ReplicaHealth:
+    def __init__(self, name, alpha=0.2, cooldown=30.0, clock=time.monotonic):
+        """
+        Stan repliki: średnia krocząca opóźnienia i okres wyłączenia po awarii
+        """
+        self.name = name
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.clock = clock
+        self.latency = None
+        self.failures = 0
+        self.down_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def attach(cls, engine, name=None):
+        """
+        Podpina pomiar opóźnień i błędów połączeń do silnika (jednokrotnie)
+        """
+        existing = getattr(engine, 'replica_health', None)
+        if existing is not None:
+            return existing
+        health = cls(name or pool_label(engine.url))
+        engine.replica_health = health
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context.replica_started = time.perf_counter()
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            health.observe(time.perf_counter() - context.replica_started)
+
+        def handle_error(context):
+            # Błąd logowania albo zerwane połączenie - nie błąd samego zapytania
+            if context.connection is None or context.is_disconnect:
+                health.fail(str(context.original_exception))
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(engine, "handle_error", handle_error)
+        return health
+
+    def observe(self, seconds):
+        with self._lock:
+            if self.latency is None:
+                self.latency = seconds
+            else:
+                self.latency += self.alpha * (seconds - self.latency)
+            self.failures = 0
+
+    def fail(self, reason):
+        with self._lock:
+            self.failures += 1
+            self.down_until = self.clock() + self.cooldown
+        logger.warning(f"Replika {self.name} niedostępna przez {self.cooldown:.0f} s: {reason}")
+
+    def recover(self):
+        with self._lock:
+            self.down_until = 0.0
+
+    def healthy(self, now):
+        return now >= self.down_until
+
+
+class ReplicaRouter:
+    def __init__(self, primary, replicas, cooldown=30.0, rng=None, clock=time.monotonic):
+        """
+        Kieruje zapytania tylko do odczytu na repliki, a zapisy na serwer główny
+
+        Replika jest losowana z wagą odwrotnie proporcjonalną do średniego
+        opóźnienia; repliki z błędem połączenia są pomijane przez `cooldown`
+        sekund. Gdy żadna replika nie jest dostępna, odczyt trafia na serwer
+        główny.
+
+        Args:
+            primary (Engine): Silnik serwera głównego
+            replicas (list): Silniki replik
+            cooldown (float): Czas wyłączenia repliki po błędzie połączenia
+            rng (random.Random, optional): Generator losowy (np. do testów)
+            clock (callable): Zegar monotoniczny
+        """
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.cooldown = cooldown
+        self.rng = rng or random.Random()
+        self.clock = clock
+        for replica in self.replicas:
+            health = ReplicaHealth.attach(replica)
+            health.cooldown = cooldown
+            health.clock = clock
+
+    def choose(self, read_only=True):
+        """
+        Zwraca silnik dla zapytania: replikę dla odczytu, główny dla zapisu
+        """
+        if not read_only or not self.replicas:
+            return self.primary
+        now = self.clock()
+        candidates = [r for r in self.replicas if r.replica_health.healthy(now)]
+        if not candidates:
+            logger.warning("Brak dostępnych replik - odczyt z serwera głównego")
+            return self.primary
+        known = [r.replica_health.latency for r in candidates if r.replica_health.latency is not None]
+        # Replika bez pomiaru dostaje wagę najszybszej, żeby zebrać pomiary
+        default_latency = min(known) if known else 1.0
+        weights = [
+            1.0 / max(r.replica_health.latency or default_latency, 1e-4)
+            for r in candidates
+        ]
+        return self.rng.choices(candidates, weights=weights)[0]
+
+    def check_health(self):
+        """
+        Sprawdza wszystkie repliki (SELECT 1) i zwraca opóźnienie albo None
+
+        Replika wyłączona po błędzie wraca do puli po udanym sprawdzeniu.
+        """
+        report = {}
+        for replica in self.replicas:
+            health = replica.replica_health
+            started = time.perf_counter()
+            try:
+                with replica.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except Exception as e:
+                # Błąd logowania mógł już wyłączyć replikę (handle_error)
+                if health.healthy(self.clock()):
+                    health.fail(str(e))
+                report[health.name] = None
+                continue
+            health.observe(time.perf_counter() - started)
+            health.recover()
+            report[health.name] = health.latency
+        return report
+
+    def session(self, read_only=True, **options):
+        """
+        Zwraca sesję kierowaną według intencji (odczyt/zapis)
+        """
+        return RoutedSession(self, read_only=read_only, **options)
+
+    def snapshot(self):
+        """
+        Zwraca stan replik: opóźnienie, liczba błędów, dostępność
+        """
+        now = self.clock()
+        return {
+            r.replica_health.name: {
+                "latency": r.replica_health.latency,
+                "failures": r.replica_health.failures,
+                "healthy": r.replica_health.healthy(now),
+            }
+            for r in self.replicas
+        }
+
+
+class RoutedSession(Session):
+    def __init__(self, router, read_only=True, **options):
+        """
+        Sesja wybierająca silnik dla każdego zapytania
+
+        Odczyty w sesji tylko do odczytu trafiają na jedną replikę (wybraną
+        przy pierwszym zapytaniu). Zapisy (flush, INSERT/UPDATE/DELETE) idą na
+        serwer główny, a po pierwszym zapisie również odczyty - sesja widzi
+        własne zmiany.
+        """
+        options.setdefault("bind", router.primary)
+        super().__init__(**options)
+        self.router = router
+        self.read_only = read_only
+        self._replica = None
+        self._wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self._wrote = True
+        if not self.read_only or self._wrote:
+            return self.router.primary
+        if self._replica is None:
+            self._replica = self.router.choose(read_only=True)
+        return self._replica
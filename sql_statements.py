@@ -0,0 +1,273 @@
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, default
+from sqlalchemy.orm import Session
+import datetime
+import decimal
+import logging
+import re
+import threading
+from sql_stream import as_statement
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Domyślny rozmiar cache skompilowanych zapytań silnika (SQLAlchemy: 500)
+QUERY_CACHE_SIZE = 1200
+
+# Limit uchwytów sp_prepare na połączenie (najdawniej użyte są zwalniane)
+MAX_PREPARED = 256
+
+# Status cache kompilacji SQLAlchemy -> nazwa licznika
+_CACHE_STATUS = {
+    default.CACHE_HIT: "hits",
+    default.CACHE_MISS: "misses",
+    default.CACHING_DISABLED: "disabled",
+    default.NO_CACHE_KEY: "no_cache_key",
+    default.NO_DIALECT_SUPPORT: "no_dialect_support",
+}
+
+
+class CompiledCacheStats:
+    def __init__(self):
+        """
+        Liczniki trafień cache skompilowanych zapytań silnika
+        """
+        self.counters = dict.fromkeys(_CACHE_STATUS.values(), 0)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def attach(cls, engine):
+        """
+        Podpina liczniki do silnika (jednokrotnie - silnik może być współdzielony)
+        """
+        existing = getattr(engine, 'compiled_cache_stats', None)
+        if existing is not None:
+            return existing
+        stats = cls()
+        engine.compiled_cache_stats = stats
+
+        def count_cache_status(conn, cursor, statement, parameters, context, executemany):
+            status = _CACHE_STATUS.get(getattr(context, 'cache_hit', None))
+            if status is not None:
+                with stats._lock:
+                    stats.counters[status] += 1
+
+        event.listen(engine, "before_cursor_execute", count_cache_status)
+        return stats
+
+    def snapshot(self):
+        """
+        Zwraca liczniki i współczynnik trafień
+        """
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+        return counters
+
+
+def sql_server_type(value):
+    """
+    Dobiera typ parametru sp_prepare na podstawie wartości
+
+    Typ musi pomieścić wartość bez obcinania - wartość, która nie mieści się
+    w typie poprzedniego wywołania, daje inny typ i nowe przygotowanie.
+    """
+    if isinstance(value, bool):
+        return "bit"
+    if isinstance(value, int):
+        return "bigint" if -2 ** 63 <= value < 2 ** 63 else "decimal(38, 0)"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, decimal.Decimal):
+        exponent = value.as_tuple().exponent
+        scale = min(38, -exponent) if isinstance(exponent, int) and exponent < 0 else 0
+        return f"decimal(38, {scale})"
+    if isinstance(value, datetime.datetime):
+        return "datetimeoffset" if value.tzinfo is not None else "datetime2"
+    if isinstance(value, datetime.date):
+        return "date"
+    if isinstance(value, datetime.time):
+        return "time"
+    if isinstance(value, (bytes, bytearray)):
+        return "varbinary(max)"
+    if isinstance(value, str) and len(value) > 4000:
+        return "nvarchar(max)"
+    return "nvarchar(4000)"
+
+
+class NamedStatement:
+    def __init__(self, name, statement, param_types=None):
+        """
+        Zapytanie zadeklarowane raz i wykonywane po nazwie
+
+        Args:
+            name (str): Nazwa zapytania
+            statement (str | Select): Zapytanie (parametry jako :nazwa)
+            param_types (dict, optional): Typy parametrów SQL Server dla
+                sp_prepare (domyślnie dobierane z wartości każdego wywołania)
+        """
+        self.name = name
+        self.statement = as_statement(statement)
+        self.param_types = dict(param_types or {})
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def compiled(self, dialect):
+        """
+        Zwraca zapytanie skompilowane dla dialektu (kompilacja raz na dialekt)
+        """
+        key = (dialect.name, dialect.driver, dialect.paramstyle)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.get(key)
+                if compiled is None:
+                    compiled = self.statement.compile(dialect=dialect)
+                    self._compiled[key] = compiled
+        return compiled
+
+
+class StatementRegistry:
+    def __init__(self):
+        """
+        Rejestr nazwanych zapytań
+
+        Każde zapytanie jest jednym obiektem, więc cache kompilacji SQLAlchemy
+        trafia przy każdym wykonaniu; na SQL Server zapytania są dodatkowo
+        przygotowywane raz na połączenie (sp_prepare) i wykonywane przez
+        sp_execute, bez ponownej kompilacji planu po stronie serwera.
+        """
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def declare(self, name, statement, param_types=None):
+        """
+        Deklaruje zapytanie pod nazwą (ponowna deklaracja zastępuje poprzednią)
+        """
+        named = NamedStatement(name, statement, param_types)
+        with self._lock:
+            self._statements[name] = named
+        return named
+
+    def get(self, name):
+        """
+        Zwraca zadeklarowane zapytanie (obiekt SQLAlchemy)
+        """
+        return self[name].statement
+
+    def __getitem__(self, name):
+        try:
+            return self._statements[name]
+        except KeyError:
+            raise KeyError(f"Nieznane zapytanie: {name}") from None
+
+    def __contains__(self, name):
+        return name in self._statements
+
+    def execute(self, executor, name, params=None, prepare=True):
+        """
+        Wykonuje zapytanie po nazwie i zwraca listę wierszy
+
+        Args:
+            executor: Engine, Connection albo Session
+            name (str): Nazwa zadeklarowanego zapytania
+            params (dict, optional): Parametry
+            prepare (bool): Na SQL Server używaj sp_prepare/sp_execute
+        """
+        named = self[name]
+        if isinstance(executor, Engine):
+            with executor.begin() as connection:
+                return self.execute(connection, name, params, prepare)
+        connection = executor.connection() if isinstance(executor, Session) else executor
+
+        if prepare and connection.dialect.name == "mssql" and connection.dialect.driver == "pyodbc":
+            return self._execute_prepared(connection, named, params or {})
+        result = connection.execute(named.statement, params)
+        return result.all() if result.returns_rows else []
+
+    def _execute_prepared(self, connection, named, params):
+        # Uchwyty sp_prepare są ważne w obrębie sesji serwera, więc trzymamy je
+        # w `info` połączenia z puli (czyszczonym przy ponownym połączeniu)
+        handles = connection.connection.info.setdefault('prepared_statements', OrderedDict())
+        compiled = named.compiled(connection.dialect)
+        names = list(compiled.positiontup or [])
+        values = [params.get(n, compiled.binds[n].value) for n in names]
+        sql, declarations = self._prepared_sql(named, compiled, names, values)
+        # Klucz to tekst zapytania i typy parametrów: ponowna deklaracja pod tą
+        # samą nazwą albo wartość niemieszcząca się w typie daje nowy uchwyt
+        key = (sql, declarations)
+        placeholders = ", ".join(["?"] * (len(values) + 1))
+        for attempt in range(2):
+            handle = handles.get(key)
+            if handle is None:
+                handle = self._prepare(connection, named, sql, declarations)
+                handles[key] = handle
+                self._unprepare_oldest(connection, handles)
+            handles.move_to_end(key)
+            try:
+                result = connection.exec_driver_sql(
+                    f"EXEC sp_execute {placeholders}", (handle, *values)
+                )
+                break
+            except Exception as e:
+                # Uchwyt mógł zostać zwolniony (np. reset sesji) - przygotuj ponownie
+                if attempt or "prepared statement" not in str(e).lower():
+                    raise
+                handles.pop(key, None)
+        # Te same wiersze SQLAlchemy co bez przygotowania
+        return result.all() if result.returns_rows else []
+
+    def _prepared_sql(self, named, compiled, names, values):
+        declarations = []
+        for index, (bind, value) in enumerate(zip(names, values), start=1):
+            sql_type = named.param_types.get(bind) or sql_server_type(value)
+            declarations.append(f"@P{index} {sql_type}")
+        # Kolejne znaczniki ? (poza literałami) -> @P1, @P2, ...
+        counter = iter(range(1, len(names) + 1))
+        sql = re.sub(
+            r"('(?:[^']|'')*')|\?", lambda m: m.group(1) or f"@P{next(counter)}", str(compiled)
+        )
+        return sql, ", ".join(declarations)
+
+    def _prepare(self, connection, named, sql, declarations):
+        # Bez SET NOCOUNT - ustawienie zostałoby na połączeniu z puli i psuło
+        # rowcount kolejnych zapytań; zliczenia wierszy pomijamy przez nextset()
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(
+                "DECLARE @handle int; EXEC sp_prepare @handle OUTPUT, ?, ?; SELECT @handle",
+                declarations, sql,
+            )
+            while cursor.description is None and cursor.nextset():
+                pass
+            handle = cursor.fetchone()[0]
+        finally:
+            cursor.close()
+        logger.info(f"Przygotowano zapytanie {named.name} (uchwyt {handle})")
+        return handle
+
+    def _unprepare_oldest(self, connection, handles):
+        while len(handles) > MAX_PREPARED:
+            _, handle = handles.popitem(last=False)
+            try:
+                connection.exec_driver_sql("EXEC sp_unprepare ?", (handle,))
+            except Exception as e:
+                logger.warning(f"Nie udało się zwolnić uchwytu {handle}: {e}")
+
+
+# Rejestr współdzielony w procesie
+statements = StatementRegistry()
+
+statements.declare("user_permissions", """
+    SELECT
+        dp.name as principal_name,
+        dp.type_desc as principal_type,
+        o.name as object_name,
+        p.permission_name
+    FROM sys.database_permissions p
+    JOIN sys.database_principals dp ON p.grantee_principal_id = dp.principal_id
+    LEFT JOIN sys.objects o ON p.major_id = o.object_id
+    WHERE dp.name = SYSTEM_USER
+""")
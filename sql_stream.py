@@ -0,0 +1,69 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Query, Session
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def as_statement(query):
+    """
+    Zamienia zapytanie (tekst SQL, Query ORM, select) na obiekt wykonywalny
+    """
+    if isinstance(query, str):
+        return text(query)
+    if isinstance(query, Query):
+        return query.statement
+    return query
+
+
+def is_orm_statement(statement):
+    """
+    Sprawdza, czy zapytanie odwołuje się do encji ORM (np. select(User))
+    """
+    return getattr(statement, '_propagate_attrs', {}).get('compile_state_plugin') == 'orm'
+
+
+def stream(engine, query, chunk_size=1000, params=None, batches=False):
+    """
+    Strumieniuje wyniki zapytania kursorem po stronie serwera
+
+    Wiersze są pobierane paczkami po `chunk_size`, więc zużycie pamięci
+    nie zależy od rozmiaru tabeli. Obie ścieżki (Core i ORM) zwracają
+    obiekty Row - dla select(User) encja jest w row[0] (row.User).
+
+    Args:
+        engine (Engine): Silnik SQLAlchemy
+        query (str | Select | Query): Zapytanie
+        chunk_size (int): Liczba wierszy pobieranych z kursora naraz
+        params (dict, optional): Parametry zapytania
+        batches (bool): Jeśli True, zwraca listy wierszy zamiast pojedynczych wierszy
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size musi być dodatni")
+    statement = as_statement(query)
+
+    if is_orm_statement(statement):
+        # Encje ORM: yield_per ogranicza liczbę obiektów tworzonych naraz
+        with Session(engine) as session:
+            result = session.execute(
+                statement.execution_options(yield_per=chunk_size), params
+            )
+            yield from _iterate(result, batches, chunk_size)
+        return
+
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True, yield_per=chunk_size
+        ).execute(statement, params)
+        yield from _iterate(result, batches, chunk_size)
+
+
+def _iterate(result, batches, chunk_size):
+    try:
+        if batches:
+            yield from result.partitions(chunk_size)
+        else:
+            yield from result
+    finally:
+        result.close()
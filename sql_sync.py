@@ -0,0 +1,374 @@
+from sqlalchemy import and_, func, or_, select, text
+import logging
+import sqlite3
+import threading
+import time
+from sql_bulk import table_of
+from sql_paginate import decode_cursor, encode_cursor, keyset_predicate
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("updated_at", "rowversion", "change_tracking")
+
+# Liczba kluczy w jednym zapytaniu o zmienione wiersze (change_tracking)
+KEY_BATCH = 500
+
+
+class WatermarkStore:
+    def __init__(self, path):
+        """
+        Lokalny magazyn znaczników synchronizacji (plik SQLite)
+
+        Przechowuje znacznik (high-water mark) każdej synchronizacji oraz,
+        gdy wykrywane są usunięcia, zbiór znanych kluczy.
+
+        Args:
+            path (str): Ścieżka pliku (":memory:" - tylko w pamięci)
+        """
+        self.path = str(path)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS watermarks "
+                "(name TEXT PRIMARY KEY, value TEXT, updated_at REAL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS known_keys "
+                "(name TEXT, key TEXT, PRIMARY KEY (name, key))"
+            )
+            # Klucze z ostatniego skanu - zastępują known_keys przy save()
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS scanned_keys "
+                "(name TEXT, key TEXT, PRIMARY KEY (name, key))"
+            )
+
+    def get(self, name):
+        """
+        Zwraca zapisany znacznik (lista wartości) albo None
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM watermarks WHERE name = ?", (name,)
+            ).fetchone()
+        return decode_cursor(row[0]) if row and row[0] is not None else None
+
+    def keys(self, name):
+        """
+        Zwraca zbiór znanych kluczy (tokeny encode_cursor)
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key FROM known_keys WHERE name = ?", (name,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def begin_scan(self, name):
+        """
+        Rozpoczyna skan kluczy (czyści klucze poprzedniego, niezatwierdzonego skanu)
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM scanned_keys WHERE name = ?", (name,))
+
+    def add_scanned(self, name, keys):
+        """
+        Zapisuje paczkę kluczy odczytanych ze źródła
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO scanned_keys (name, key) VALUES (?, ?)",
+                ((name, key) for key in keys),
+            )
+
+    def missing_keys(self, name):
+        """
+        Zwraca znane klucze, których nie było w skanie (usunięte wiersze)
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key FROM known_keys k WHERE name = ? AND NOT EXISTS "
+                "(SELECT 1 FROM scanned_keys s WHERE s.name = k.name AND s.key = k.key)",
+                (name,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def save(self, name, watermark, replace_keys=False):
+        """
+        Zapisuje znacznik (i klucze ostatniego skanu) w jednej transakcji
+        """
+        value = encode_cursor(watermark) if watermark is not None else None
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO watermarks (name, value, updated_at) VALUES (?, ?, ?)",
+                (name, value, time.time()),
+            )
+            if replace_keys:
+                self._connection.execute("DELETE FROM known_keys WHERE name = ?", (name,))
+                self._connection.execute(
+                    "INSERT INTO known_keys (name, key) "
+                    "SELECT name, key FROM scanned_keys WHERE name = ?",
+                    (name,),
+                )
+                self._connection.execute("DELETE FROM scanned_keys WHERE name = ?", (name,))
+
+    def reset(self, name):
+        """
+        Usuwa znacznik i klucze - następna synchronizacja będzie pełna
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM watermarks WHERE name = ?", (name,))
+            self._connection.execute("DELETE FROM known_keys WHERE name = ?", (name,))
+            self._connection.execute("DELETE FROM scanned_keys WHERE name = ?", (name,))
+
+    def close(self):
+        self._connection.close()
+
+
+class Delta:
+    def __init__(self, changed, deleted, watermark, full, seconds, keys_scanned=False,
+                 operations=None):
+        """
+        Wynik jednej synchronizacji: zmienione wiersze, klucze usuniętych
+        wierszy i nowy znacznik
+        """
+        # Wiersze tabeli (same kolumny tabeli - także przy change tracking)
+        self.changed = changed
+        self.deleted = deleted
+        self.watermark = watermark
+        # full=True: pierwsza (albo wymuszona) synchronizacja - pełny obraz tabeli
+        self.full = full
+        self.seconds = seconds
+        # Skan kluczy (wykrywanie usunięć) do zatwierdzenia w commit()
+        self.keys_scanned = keys_scanned
+        # change_tracking: operacja ("I" albo "U") każdego wiersza z `changed`
+        self.operations = operations
+
+    def __repr__(self):
+        return (
+            f"Delta(changed={len(self.changed)}, deleted={len(self.deleted)}, "
+            f"full={self.full}, seconds={self.seconds:.3f})"
+        )
+
+
+class DeltaSync:
+    def __init__(self, engine, model, store, name=None, strategy="updated_at", column=None,
+                 detect_deletes=False, batch_size=10000):
+        """
+        Przyrostowa synchronizacja tabeli: zwraca tylko wiersze zmienione od
+        poprzedniego wywołania
+
+        Strategie:
+            updated_at - kolumna z czasem modyfikacji (np. SQLite); wiersze
+                z tym samym czasem rozróżnia klucz główny. Wiersze z NULL
+                są zwracane tylko przez pełną synchronizację - późniejsze
+                zmiany muszą ustawiać kolumnę (domyślna wartość, wyzwalacz)
+            rowversion - kolumna rowversion SQL Server; górną granicą jest
+                MIN_ACTIVE_ROWVERSION(), więc trwające transakcje nie giną
+            change_tracking - CHANGETABLE(CHANGES ...) SQL Server (wymaga
+                włączonego change tracking dla bazy i tabeli); zwraca też usunięcia
+
+        Znacznik jest zapisywany dopiero przez commit(delta), po przetworzeniu
+        zmian - przerwana synchronizacja zostanie powtórzona.
+
+        Args:
+            engine (Engine): Silnik SQLAlchemy
+            model: Model deklaratywny albo Table
+            store (WatermarkStore | str): Magazyn znaczników albo ścieżka pliku
+            name (str, optional): Nazwa synchronizacji (domyślnie nazwa tabeli)
+            strategy (str): updated_at, rowversion albo change_tracking
+            column (str, optional): Kolumna znacznika (updated_at/rowversion)
+            detect_deletes (bool): Wykrywaj usunięcia przez porównanie kluczy
+                głównych z poprzednią synchronizacją (updated_at/rowversion)
+            batch_size (int): Liczba wierszy pobieranych jednym zapytaniem
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Nieznana strategia synchronizacji: {strategy}")
+        self.engine = engine
+        self.table = table_of(model)
+        self.store = store if isinstance(store, WatermarkStore) else WatermarkStore(store)
+        self.name = name or self.table.name
+        self.strategy = strategy
+        self.detect_deletes = detect_deletes
+        self.batch_size = batch_size
+        self.key = list(self.table.primary_key.columns)
+        if not self.key:
+            raise ValueError(f"Tabela {self.table.name} nie ma klucza głównego")
+        if strategy != "change_tracking":
+            if column is None:
+                column = "updated_at" if strategy == "updated_at" else "rowversion"
+            self.column = self.table.c[column]
+
+    def poll(self):
+        """
+        Pobiera zmiany od ostatniego zatwierdzonego znacznika
+
+        Wszystkie zmienione wiersze trafiają do jednej listy; pierwszą (pełną)
+        synchronizację dużej tabeli lepiej przetwarzać przez batches().
+        """
+        started = time.perf_counter()
+        deltas = list(self.batches())
+        last = deltas[-1]
+        operations = None
+        if all(delta.operations is not None for delta in deltas):
+            operations = [op for delta in deltas for op in delta.operations]
+        delta = Delta(
+            [row for delta in deltas for row in delta.changed], last.deleted, last.watermark,
+            deltas[0].full, time.perf_counter() - started, last.keys_scanned, operations,
+        )
+        logger.info(
+            f"Synchronizacja {self.name}: {len(delta.changed)} zmienionych, "
+            f"{len(delta.deleted)} usuniętych{' (pełna)' if delta.full else ''}"
+        )
+        return delta
+
+    def batches(self):
+        """
+        Pobiera zmiany paczkami po batch_size wierszy, bez trzymania całej
+        tabeli w pamięci (np. pierwsza, pełna synchronizacja)
+
+        Każda paczka to Delta ze znacznikiem po jej ostatnim wierszu -
+        commit(delta) po przetworzeniu paczki pozwala wznowić przerwaną
+        synchronizację od tego miejsca. Usunięcia są w ostatniej paczce.
+        """
+        watermark = self.store.get(self.name)
+        if self.strategy == "change_tracking":
+            yield from self._change_tracking_batches(watermark)
+        else:
+            yield from self._column_batches(watermark)
+
+    def commit(self, delta):
+        """
+        Zapisuje znacznik (i klucze) po przetworzeniu zmian
+        """
+        self.store.save(self.name, delta.watermark, replace_keys=delta.keys_scanned)
+
+    def reset(self):
+        """
+        Wymusza pełną synchronizację przy następnym poll()
+        """
+        self.store.reset(self.name)
+
+    def _after(self, ordering, values):
+        if self.strategy == "updated_at" and values[0] is None:
+            # NULL jest sortowany przed datami (SQL Server, SQLite): najpierw
+            # pozostałe wiersze z NULL według klucza, potem wszystkie z datą
+            return or_(
+                and_(self.column.is_(None), keyset_predicate(self.key, values[1:])),
+                self.column.isnot(None),
+            )
+        return keyset_predicate(ordering, values)
+
+    def _column_batches(self, watermark):
+        if self.strategy == "updated_at":
+            # Czas modyfikacji nie jest unikalny - klucz główny rozstrzyga remisy
+            ordering = [self.column] + self.key
+        else:
+            ordering = [self.column]
+        values = watermark
+        full = watermark is None
+        with self.engine.connect() as connection:
+            upper = None
+            if self.strategy == "rowversion":
+                upper = connection.execute(select(func.min_active_rowversion())).scalar()
+            while True:
+                started = time.perf_counter()
+                statement = select(self.table)
+                if values is not None:
+                    statement = statement.where(self._after(ordering, values))
+                if upper is not None:
+                    statement = statement.where(self.column < upper)
+                statement = statement.order_by(*ordering).limit(self.batch_size)
+                rows = connection.execute(statement).all()
+                if rows:
+                    values = [rows[-1]._mapping[c] for c in ordering]
+                if len(rows) == self.batch_size:
+                    yield Delta(rows, [], values, full, time.perf_counter() - started)
+                    continue
+
+                deleted = []
+                if self.detect_deletes:
+                    # Skan samego klucza głównego (indeks) paczkami; porównanie ze
+                    # znanymi kluczami odbywa się w magazynie, nie w pamięci
+                    self.store.begin_scan(self.name)
+                    result = connection.execution_options(
+                        stream_results=True, yield_per=self.batch_size
+                    ).execute(select(*self.key))
+                    for batch in result.partitions(self.batch_size):
+                        self.store.add_scanned(
+                            self.name, [encode_cursor(list(row)) for row in batch]
+                        )
+                    deleted = [decode_cursor(token) for token in self.store.missing_keys(self.name)]
+                yield Delta(rows, deleted, values, full, time.perf_counter() - started,
+                            self.detect_deletes)
+                return
+
+    def _change_tracking_batches(self, watermark):
+        preparer = self.engine.dialect.identifier_preparer
+        table_name = preparer.format_table(self.table)
+        with self.engine.connect() as connection:
+            started = time.perf_counter()
+            current, min_valid = connection.execute(
+                text(
+                    "SELECT CHANGE_TRACKING_CURRENT_VERSION(), "
+                    "CHANGE_TRACKING_MIN_VALID_VERSION(OBJECT_ID(:table))"
+                ),
+                {"table": table_name},
+            ).one()
+            if current is None:
+                raise Exception(f"Change tracking nie jest włączony dla {table_name}")
+            last = watermark[0] if watermark else None
+            if last is None or min_valid is None or last < min_valid:
+                # Brak znacznika albo historia zmian już wyczyszczona - pełny odczyt
+                if last is not None:
+                    logger.warning(f"Znacznik {self.name} starszy niż historia zmian - pełna synchronizacja")
+                result = connection.execution_options(
+                    stream_results=True, yield_per=self.batch_size
+                ).execute(select(self.table))
+                rows = []
+                for batch in result.partitions(self.batch_size):
+                    if rows:
+                        # Znacznik zapisywany dopiero z ostatnią paczką: przerwany
+                        # pełny odczyt zaczyna się od nowa
+                        yield Delta(rows, [], watermark, True, time.perf_counter() - started)
+                        started = time.perf_counter()
+                    rows = batch
+                yield Delta(rows, [], [current], True, time.perf_counter() - started)
+                return
+
+            # Same klucze i operacje z CHANGETABLE; wiersze pobierane osobno,
+            # żeby miały ten sam kształt co przy pełnej synchronizacji
+            key_names = ", ".join(f"ct.{preparer.quote(c.name)}" for c in self.key)
+            result = connection.execute(
+                text(
+                    f"SELECT ct.SYS_CHANGE_OPERATION, {key_names} "
+                    f"FROM CHANGETABLE(CHANGES {table_name}, :last) AS ct "
+                    f"WHERE ct.SYS_CHANGE_VERSION <= :current"
+                ),
+                {"last": last, "current": current},
+            )
+            operations = {}
+            deleted = []
+            for row in result:
+                if row[0] == "D":
+                    deleted.append(list(row[1:]))
+                else:
+                    operations[tuple(row[1:])] = row[0]
+            changed = []
+            changed_operations = []
+            keys = list(operations)
+            for start in range(0, len(keys), KEY_BATCH):
+                statement = select(self.table).where(self._key_in(keys[start:start + KEY_BATCH]))
+                for row in connection.execute(statement):
+                    changed.append(row)
+                    changed_operations.append(
+                        operations[tuple(row._mapping[c] for c in self.key)]
+                    )
+        yield Delta(changed, deleted, [current], False, time.perf_counter() - started,
+                    operations=changed_operations)
+
+    def _key_in(self, keys):
+        if len(self.key) == 1:
+            return self.key[0].in_([key[0] for key in keys])
+        # SQL Server nie obsługuje (a, b) IN ((...), ...)
+        return or_(*[and_(*[c == v for c, v in zip(self.key, key)]) for key in keys])
@@ -0,0 +1,256 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+import logging
+import threading
+import time
+import uuid
+from sql_registry import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TenantLimitError(Exception):
+    """
+    Limit połączeń wyczerpany, a żadnego silnika nie można zwolnić
+    """
+
+
+class TenantEngine:
+    def __init__(self, key, entry):
+        """
+        Silnik jednej bazy (tenanta) wraz ze statystykami użycia
+        """
+        self.key = key
+        self.entry = entry
+        self.engine = entry.engine
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        self.checkouts = 0
+        self.pending = 0
+        # Wolne połączenia puli obiecane trwającym connect()
+        self.idle_claims = 0
+
+    def open_connections(self):
+        pool = self.engine.pool
+        if isinstance(pool, QueuePool):
+            return pool.checkedin() + pool.checkedout()
+        return 0
+
+    def busy(self):
+        pool = self.engine.pool
+        return isinstance(pool, QueuePool) and pool.checkedout() > 0
+
+    def idle_connections(self):
+        pool = self.engine.pool
+        return pool.checkedin() if isinstance(pool, QueuePool) else 0
+
+
+class TenantEngineManager:
+    def __init__(self, url_factory, max_connections=100, pool_size=2, max_overflow=3,
+                 idle_timeout=600, wait_timeout=30, identity=None, **engine_options):
+        """
+        Silniki wielu baz (tenantów) tworzone na żądanie ze wspólnym limitem
+        połączeń
+
+        Gdy suma otwartych połączeń osiąga limit, zamykane są (dispose())
+        najdawniej używane silniki, które nie mają pobranych połączeń.
+        Silniki nieużywane dłużej niż `idle_timeout` są zamykane przy
+        kolejnym dostępie do menedżera.
+
+        Args:
+            url_factory (callable): Funkcja (server, database) zwracająca URL,
+                np. lambda s, d: SQLAlchemyADConnection(s, d, user, pwd).create_connection_url()
+            max_connections (int): Limit otwartych połączeń wszystkich silników
+            pool_size (int): Rozmiar puli jednego tenanta
+            max_overflow (int): Dodatkowe połączenia jednego tenanta
+            idle_timeout (float): Czas bezczynności (s), po którym silnik jest
+                zamykany (None - bez limitu)
+            wait_timeout (float): Maksymalny czas oczekiwania na zwolnienie
+                połączenia, gdy limit jest wyczerpany
+            identity (str, optional): Tożsamość spoza URL (klucz rejestru)
+            **engine_options: Opcje przekazywane do create_engine()
+        """
+        self.url_factory = url_factory
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self.identity = identity
+        # Silniki menedżera nie są współdzielone z innymi użytkownikami rejestru:
+        # zamknięty (wyrzucony) silnik musi naprawdę zwolnić połączenia
+        self._registry_identity = f"{identity}|tenants:{uuid.uuid4().hex}"
+        engine_options.setdefault("pool_pre_ping", True)
+        self.engine_options = dict(
+            engine_options, pool_size=pool_size, max_overflow=max_overflow,
+            pool_timeout=wait_timeout,
+        )
+        self.evictions = 0
+        self._tenants = OrderedDict()
+        self._pending = 0
+        self._lock = threading.RLock()
+        # Osobna blokada: zdarzenie checkin nie może czekać na blokadę menedżera
+        self._released = threading.Condition()
+
+    def _tenant(self, server, database):
+        key = (server, database)
+        tenant = self._tenants.get(key)
+        if tenant is None:
+            entry = registry.acquire(
+                self.url_factory(server, database), identity=self._registry_identity,
+                poolclass=QueuePool, **self.engine_options
+            )
+            tenant = TenantEngine(key, entry)
+            self._tenants[key] = tenant
+            event.listen(tenant.engine, "checkin", self._on_checkin)
+            logger.info(f"Utworzono silnik dla {server}/{database} ({len(self._tenants)} aktywnych)")
+        self._tenants.move_to_end(key)
+        tenant.last_used = time.monotonic()
+        return tenant
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._released:
+            self._released.notify_all()
+
+    def open_connections(self):
+        """
+        Zwraca liczbę otwartych połączeń wszystkich silników
+        """
+        with self._lock:
+            return sum(tenant.open_connections() for tenant in self._tenants.values())
+
+    def _evict(self, tenant, reason):
+        del self._tenants[tenant.key]
+        event.remove(tenant.engine, "checkin", self._on_checkin)
+        # Ostatnie zwolnienie wpisu rejestru wywołuje dispose() silnika
+        registry.release(tenant.entry)
+        self.evictions += 1
+        server, database = tenant.key
+        logger.info(f"Zamknięto silnik {server}/{database} ({reason})")
+
+    def evict_idle(self):
+        """
+        Zamyka silniki nieużywane dłużej niż idle_timeout
+        """
+        if self.idle_timeout is None:
+            return 0
+        now = time.monotonic()
+        evicted = 0
+        with self._lock:
+            for tenant in list(self._tenants.values()):
+                if (not tenant.busy() and not tenant.pending
+                        and now - tenant.last_used > self.idle_timeout):
+                    self._evict(tenant, "bezczynny")
+                    evicted += 1
+        return evicted
+
+    def _reserve(self, current):
+        # Nowe połączenie potrzebne tylko, gdy pula tenanta ma wolne połączenie,
+        # którego nie obiecano jeszcze innemu connect()
+        needed = 0 if current.idle_connections() > current.idle_claims else 1
+        while self.open_connections() + self._pending + needed > self.max_connections:
+            # Najdawniej używane silniki są na początku OrderedDict
+            victim = next(
+                (t for t in self._tenants.values()
+                 if t is not current and not t.busy() and not t.pending),
+                None,
+            )
+            if victim is None:
+                return None
+            self._evict(victim, "limit połączeń")
+        self._pending += needed
+        current.pending += 1
+        if not needed:
+            current.idle_claims += 1
+        return needed
+
+    def engine(self, server, database):
+        """
+        Zwraca silnik bazy, tworząc go w razie potrzeby
+
+        Limit połączeń jest pilnowany przy connect()/session() menedżera;
+        połączenia pobierane bezpośrednio z silnika go omijają.
+        """
+        self.evict_idle()
+        with self._lock:
+            return self._tenant(server, database).engine
+
+    def connect(self, server, database):
+        """
+        Zwraca połączenie z bazy tenanta w granicach wspólnego limitu
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            self.evict_idle()
+            with self._lock:
+                tenant = self._tenant(server, database)
+                reserved = self._reserve(tenant)
+            if reserved is not None:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TenantLimitError(
+                    f"Wyczerpany limit {self.max_connections} połączeń - "
+                    f"wszystkie silniki mają pobrane połączenia"
+                )
+            with self._released:
+                self._released.wait(min(remaining, 0.1))
+        try:
+            # Logowanie poza blokadą - miejsce w limicie jest już zarezerwowane
+            connection = tenant.engine.connect()
+        finally:
+            with self._lock:
+                self._pending -= reserved
+                tenant.pending -= 1
+                if not reserved:
+                    tenant.idle_claims -= 1
+        tenant.checkouts += 1
+        return connection
+
+    @contextmanager
+    def session(self, server, database, **options):
+        """
+        Sesja ORM na połączeniu tenanta; połączenie wraca do puli po wyjściu
+        """
+        with self.connect(server, database) as connection:
+            with Session(bind=connection, **options) as session:
+                yield session
+
+    def stats(self):
+        """
+        Zwraca statystyki użycia per tenant oraz łączne
+        """
+        now = time.monotonic()
+        with self._lock:
+            tenants = {
+                f"{server}/{database}": {
+                    "open_connections": tenant.open_connections(),
+                    "checked_out": tenant.engine.pool.checkedout(),
+                    "checkouts": tenant.checkouts,
+                    "idle_seconds": now - tenant.last_used,
+                }
+                for (server, database), tenant in self._tenants.items()
+            }
+            return {
+                "engines": len(self._tenants),
+                "open_connections": self.open_connections(),
+                "max_connections": self.max_connections,
+                "evictions": self.evictions,
+                "tenants": tenants,
+            }
+
+    def dispose(self):
+        """
+        Zamyka wszystkie silniki menedżera
+        """
+        with self._lock:
+            for tenant in list(self._tenants.values()):
+                self._evict(tenant, "dispose")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.dispose()
@@ -0,0 +1,168 @@
+from sqlalchemy import event
+import logging
+import pickle
+import struct
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Atrybut połączenia ODBC przekazujący token dostępu (msodbcsql.h)
+SQL_COPT_SS_ACCESS_TOKEN = 1256
+
+# Zakres tokenu dla Azure SQL Database
+SQL_TOKEN_SCOPE = "https://database.windows.net/.default"
+
+
+def encode_access_token(token):
+    """
+    Koduje token do struktury ACCESSTOKEN oczekiwanej przez sterownik ODBC
+
+    Args:
+        token (str): Token dostępu (JWT)
+    """
+    raw = token.encode("utf-16-le")
+    return struct.pack("<i", len(raw)) + raw
+
+
+class AccessToken:
+    def __init__(self, token, expires_on):
+        """
+        Token dostępu wraz z czasem wygaśnięcia
+
+        Args:
+            token (str): Token dostępu
+            expires_on (float): Czas wygaśnięcia (unix timestamp)
+        """
+        self.token = token
+        self.expires_on = expires_on
+
+
+def azure_identity_provider(credential=None, scope=SQL_TOKEN_SCOPE):
+    """
+    Zwraca dostawcę tokenów opartego o pakiet azure-identity
+
+    Args:
+        credential (optional): Obiekt poświadczeń azure-identity
+            (domyślnie DefaultAzureCredential)
+        scope (str): Zakres tokenu
+    """
+    if credential is None:
+        from azure.identity import DefaultAzureCredential
+        credential = DefaultAzureCredential()
+
+    def provider():
+        return credential.get_token(scope)
+
+    return provider
+
+
+class TokenCache:
+    def __init__(self, provider, refresh_margin=300, clock=time.time):
+        """
+        Bezpieczny wątkowo bufor tokenu dostępu
+
+        Token jest pobierany raz i współdzielony przez wszystkie połączenia
+        puli; odświeżenie następuje z wyprzedzeniem przed wygaśnięciem.
+
+        Args:
+            provider (callable): Funkcja zwracająca obiekt z atrybutami
+                `token` i `expires_on` albo krotkę (token, expires_on)
+            refresh_margin (int): Ile sekund przed wygaśnięciem odświeżyć token
+            clock (callable): Źródło czasu (unix timestamp)
+        """
+        self.provider = provider
+        self.refresh_margin = refresh_margin
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._token = None
+        self.acquired_count = 0
+
+    def _needs_refresh(self):
+        return (
+            self._token is None
+            or self._token.expires_on - self._clock() <= self.refresh_margin
+        )
+
+    def get(self):
+        """
+        Zwraca ważny token, pobierając nowy tylko gdy to konieczne
+        """
+        token = self._token
+        if token is not None and not self._needs_refresh():
+            return token
+        with self._lock:
+            # Inny wątek mógł już odświeżyć token
+            if self._needs_refresh():
+                result = self.provider()
+                if isinstance(result, tuple):
+                    result = AccessToken(*result)
+                self._token = AccessToken(result.token, result.expires_on)
+                self.acquired_count += 1
+                logger.info(
+                    f"Pobrano token dostępu (ważny "
+                    f"{int(self._token.expires_on - self._clock())} s)"
+                )
+            return self._token
+
+    def encoded(self):
+        """
+        Zwraca bieżący token zakodowany dla atrybutu SQL_COPT_SS_ACCESS_TOKEN
+        """
+        return encode_access_token(self.get().token)
+
+    def invalidate(self):
+        """
+        Wymusza pobranie nowego tokenu przy następnym połączeniu
+        """
+        with self._lock:
+            self._token = None
+
+
+def attach_token_cache(engine, cache):
+    """
+    Przekazuje token z bufora do każdego nowego połączenia fizycznego silnika
+
+    Zwraca bufor faktycznie podpięty do silnika (przy silniku współdzielonym
+    z rejestru może to być bufor podpięty wcześniej).
+    """
+    existing = getattr(engine, 'token_cache', None)
+    if existing is not None:
+        return existing
+    engine.token_cache = cache
+
+    def provide_token(dialect, conn_rec, cargs, cparams):
+        attrs_before = dict(cparams.get("attrs_before") or {})
+        attrs_before[SQL_COPT_SS_ACCESS_TOKEN] = cache.encoded()
+        cparams["attrs_before"] = attrs_before
+
+    event.listen(engine, "do_connect", provide_token)
+    return cache
+
+
+class WorkerTokenSetup:
+    def __init__(self, cache):
+        """
+        Podpina token dostępu pod silnik tworzony w innym procesie
+        (np. procesy robocze sql_extract)
+
+        Dostawca tokenów trafia do procesu, jeśli da się go serializować
+        (pickle); w przeciwnym razie proces dostaje bieżący token.
+
+        Args:
+            cache (TokenCache): Bufor tokenu silnika procesu głównego
+        """
+        try:
+            pickle.dumps(cache.provider)
+            self.provider = cache.provider
+            self.token = None
+        except Exception:
+            self.provider = None
+            self.token = cache.get()
+
+    def _current_token(self):
+        return self.token
+
+    def __call__(self, engine):
+        attach_token_cache(engine, TokenCache(self.provider or self._current_token))
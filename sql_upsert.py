@@ -0,0 +1,206 @@
+from sqlalchemy import Column, MetaData, Table, func, select, text
+import logging
+import time
+from sql_bulk import enable_fast_executemany, iter_batches, table_of
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class UpsertResult:
+    def __init__(self, rows, inserted, updated, seconds):
+        """
+        Podsumowanie upsertu: liczba wierszy wstawionych i zaktualizowanych
+        """
+        self.rows = rows
+        self.inserted = inserted
+        self.updated = updated
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+    def __repr__(self):
+        return (
+            f"UpsertResult(rows={self.rows}, inserted={self.inserted}, updated={self.updated}, "
+            f"seconds={self.seconds:.3f}, rows_per_second={self.rows_per_second:.0f})"
+        )
+
+
+def staging_table(table, columns, key, dialect_name):
+    """
+    Tworzy definicję tymczasowej tabeli pośredniej o kolumnach tabeli docelowej
+
+    Klucz jest kluczem głównym tabeli pośredniej: przyspiesza złączenie
+    i odrzuca duplikaty kluczy w danych wejściowych.
+    """
+    metadata = MetaData()
+    staging_columns = [
+        Column(name, table.c[name].type, primary_key=name in key, autoincrement=False)
+        for name in columns
+    ]
+    if dialect_name == "mssql":
+        # Tabela #... żyje tylko w sesji serwera bieżącego połączenia
+        return Table(f"#stage_{table.name}", metadata, *staging_columns)
+    return Table(f"stage_{table.name}", metadata, *staging_columns, prefixes=["TEMPORARY"])
+
+
+def _identity_column(connection, table, target_name):
+    # Kolumna IDENTITY tabeli docelowej (None, jeśli tabela jej nie ma)
+    return connection.exec_driver_sql(
+        "SELECT name FROM sys.identity_columns WHERE object_id = OBJECT_ID(?)", (target_name,)
+    ).scalar()
+
+
+def _merge(connection, table, staging, columns, key):
+    quote = connection.dialect.identifier_preparer.format_table
+    column = connection.dialect.identifier_preparer.quote
+    target_name = quote(table)
+    staging_name = quote(staging)
+    identity = _identity_column(connection, table, target_name)
+    on = " AND ".join(f"t.{column(k)} = s.{column(k)}" for k in key)
+    # Kolumny IDENTITY nie można aktualizować
+    updates = [c for c in columns if c not in key and c != identity]
+    inserted_columns = ", ".join(column(c) for c in columns)
+    inserted_values = ", ".join(f"s.{column(c)}" for c in columns)
+
+    # Akcje MERGE trafiają do tabeli tymczasowej i są zliczane po stronie
+    # serwera - bez przesyłania wierszy OUTPUT. Osobne polecenia zamiast
+    # SET NOCOUNT ON: ustawienie zostałoby na połączeniu z puli, a MERGE na
+    # początku polecenia widzi unieważnianie bufora wyników (sql_cache)
+    actions = quote(Table(f"#actions_{table.name}", MetaData()))
+    connection.exec_driver_sql(f"CREATE TABLE {actions} (action nvarchar(10))")
+    sql = f"MERGE {target_name} WITH (HOLDLOCK) AS t USING {staging_name} AS s ON {on}"
+    if updates:
+        assignments = ", ".join(f"t.{column(c)} = s.{column(c)}" for c in updates)
+        sql += f" WHEN MATCHED THEN UPDATE SET {assignments}"
+    sql += (
+        f" WHEN NOT MATCHED BY TARGET THEN INSERT ({inserted_columns}) VALUES ({inserted_values})"
+        f" OUTPUT $action INTO {actions};"
+    )
+    explicit_identity = identity is not None and identity in columns
+    if explicit_identity:
+        # Wstawianie podanych wartości klucza do kolumny IDENTITY
+        connection.exec_driver_sql(f"SET IDENTITY_INSERT {target_name} ON")
+    try:
+        connection.exec_driver_sql(sql)
+    finally:
+        if explicit_identity:
+            # Ustawienie sesji (nie transakcji) - wyłączane także po błędzie
+            try:
+                connection.exec_driver_sql(f"SET IDENTITY_INSERT {target_name} OFF")
+            except Exception as e:
+                logger.error(f"Nie udało się wyłączyć IDENTITY_INSERT dla {target_name}: {e}")
+    inserted, updated = connection.exec_driver_sql(
+        "SELECT SUM(CASE WHEN action = 'INSERT' THEN 1 ELSE 0 END), "
+        f"SUM(CASE WHEN action = 'UPDATE' THEN 1 ELSE 0 END) FROM {actions}"
+    ).one()
+    connection.exec_driver_sql(f"DROP TABLE {actions}")
+    return inserted or 0, updated or 0
+
+
+def _on_conflict(connection, table, staging, columns, key):
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    # Liczba kluczy już obecnych w tabeli docelowej = liczba aktualizacji
+    matched = select(func.count()).select_from(
+        staging.join(table, *[staging.c[k] == table.c[k] for k in key])
+    )
+    updated = connection.execute(matched).scalar()
+    total = connection.execute(select(func.count()).select_from(staging)).scalar()
+
+    source = select(*[staging.c[c] for c in columns])
+    if connection.dialect.name == "sqlite":
+        # SQLite: INSERT ... SELECT ... ON CONFLICT wymaga klauzuli WHERE
+        source = source.where(text("true"))
+    statement = insert(table).from_select(columns, source)
+    updates = [c for c in columns if c not in key]
+    if updates:
+        statement = statement.on_conflict_do_update(
+            index_elements=key, set_={c: statement.excluded[c] for c in updates}
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=key)
+    connection.execute(statement)
+    return total - updated, updated if updates else 0
+
+
+def upsert(engine, model, rows, key=None, batch_size=10000, columns=None):
+    """
+    Wstawia albo aktualizuje wiersze jednym poleceniem zbiorowym
+
+    Wiersze są najpierw ładowane paczkami (executemany) do tymczasowej tabeli
+    pośredniej, a potem scalane z tabelą docelową jednym MERGE (SQL Server)
+    albo INSERT ... ON CONFLICT (SQLite, PostgreSQL). Całość wykonuje się
+    w jednej transakcji.
+
+    Args:
+        engine (Engine): Silnik SQLAlchemy
+        model: Model deklaratywny (np. User) albo Table
+        rows (iterable): Słowniki albo krotki z wartościami kolumn
+        key (list, optional): Kolumny identyfikujące wiersz (domyślnie
+            klucz główny; dla ON CONFLICT muszą mieć ograniczenie unikalności)
+        batch_size (int): Liczba wierszy w jednej paczce ładowania
+        columns (list, optional): Nazwy kolumn dla wierszy-krotek
+            (domyślnie wszystkie kolumny tabeli w kolejności definicji)
+
+    Returns:
+        UpsertResult: liczba wierszy wstawionych i zaktualizowanych
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size musi być dodatni")
+    table = table_of(model)
+    if key is None:
+        key = [column.name for column in table.primary_key.columns]
+    key = list(key)
+    if not key:
+        raise ValueError(f"Tabela {table.name} nie ma klucza głównego - podaj key")
+    if columns is None:
+        columns = [column.name for column in table.columns]
+    columns = list(columns)
+    missing = [k for k in key if k not in columns]
+    if missing:
+        raise ValueError(f"Kolumny klucza spoza danych: {', '.join(missing)}")
+
+    dialect_name = engine.dialect.name
+    if dialect_name == "mssql":
+        merge = _merge
+    elif dialect_name in ("sqlite", "postgresql"):
+        merge = _on_conflict
+    else:
+        raise NotImplementedError(f"Upsert nie jest obsługiwany dla dialektu {dialect_name}")
+    enable_fast_executemany(engine)
+
+    staging = staging_table(table, columns, key, dialect_name)
+    total = 0
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        try:
+            with connection.begin():
+                staging.create(connection)
+                statement = staging.insert()
+                for batch in iter_batches(rows, batch_size, columns):
+                    connection.execute(statement, batch)
+                    total += len(batch)
+                inserted, updated = (
+                    merge(connection, table, staging, columns, key) if total else (0, 0)
+                )
+        finally:
+            # pysqlite tworzy tabelę TEMPORARY poza transakcją, więc wycofanie
+            # jej nie usuwa - zostałaby na połączeniu wracającym do puli
+            try:
+                staging.drop(connection, checkfirst=True)
+                connection.commit()
+            except Exception as e:
+                logger.error(f"Nie udało się usunąć tabeli pośredniej {staging.name}: {e}")
+
+    result = UpsertResult(total, inserted, updated, time.perf_counter() - started)
+    logger.info(
+        f"Upsert {table.name}: {result.inserted} wstawionych, {result.updated} zaktualizowanych "
+        f"({result.rows_per_second:.0f} wierszy/s)"
+    )
+    return result
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.pool import QueuePool
+import logging
+import statistics
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class WarmupResult:
+    def __init__(self, requested, latencies, errors, seconds):
+        """
+        Podsumowanie rozgrzewania puli: czasy nawiązania połączeń i błędy
+        """
+        self.requested = requested
+        self.latencies = latencies
+        self.errors = errors
+        self.seconds = seconds
+
+    @property
+    def opened(self):
+        return len(self.latencies)
+
+    @property
+    def pending(self):
+        # Połączenia, które nie zdążyły się otworzyć w limicie czasu
+        return self.requested - self.opened - len(self.errors)
+
+    def summary(self):
+        """
+        Zwraca statystyki czasu nawiązania połączenia (średnia, percentyle)
+        """
+        ordered = sorted(self.latencies)
+
+        def percentile(q):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+        return {
+            "count": len(ordered),
+            "mean": statistics.fmean(ordered) if ordered else 0.0,
+            "p50": percentile(0.50),
+            "p99": percentile(0.99),
+            "max": ordered[-1] if ordered else 0.0,
+        }
+
+    def __repr__(self):
+        stats = self.summary()
+        return (
+            f"WarmupResult(requested={self.requested}, opened={self.opened}, "
+            f"failed={len(self.errors)}, pending={self.pending}, seconds={self.seconds:.3f}, "
+            f"p50={stats['p50']:.3f}, max={stats['max']:.3f})"
+        )
+
+
+def pool_capacity(engine):
+    """
+    Zwraca liczbę połączeń, które pula utrzymuje po zwrocie (None - bez limitu)
+    """
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        return pool.size()
+    return None
+
+
+def warm_pool(engine, connections=None, timeout=10.0):
+    """
+    Otwiera równolegle `connections` połączeń i oddaje je do puli
+
+    Każde połączenie przechodzi pełne logowanie (TLS, AAD/Kerberos) w osobnym
+    wątku. Wszystkie są trzymane do końca rozgrzewania, żeby pula nie oddała
+    jednego połączenia kilku wątkom. Połączenia nadmiarowe (max_overflow)
+    zostałyby zamknięte po zwrocie, więc liczba jest ograniczana do pool_size.
+
+    Args:
+        engine (Engine): Silnik SQLAlchemy
+        connections (int, optional): Liczba połączeń (domyślnie pool_size)
+        timeout (float): Limit czasu całego rozgrzewania w sekundach;
+            połączenia otwierane dłużej wracają do puli po zakończeniu logowania
+
+    Returns:
+        WarmupResult: czasy nawiązania połączeń i błędy
+    """
+    capacity = pool_capacity(engine)
+    if connections is None:
+        connections = capacity or 1
+    if capacity is not None and connections > capacity:
+        logger.warning(f"Rozgrzewanie ograniczone do rozmiaru puli: {capacity} z {connections}")
+        connections = capacity
+    if connections < 1:
+        return WarmupResult(0, [], [], 0.0)
+
+    latencies = []
+    errors = []
+    finished = threading.Condition()
+    release = threading.Event()
+
+    def open_connection():
+        started = time.perf_counter()
+        try:
+            connection = engine.connect()
+        except Exception as e:
+            with finished:
+                errors.append(e)
+                finished.notify_all()
+            return None
+        latency = time.perf_counter() - started
+        try:
+            with finished:
+                if release.is_set():
+                    # Po limicie czasu - połączenie wraca do puli, ale nie do wyniku
+                    return latency
+                latencies.append(latency)
+                finished.notify_all()
+            release.wait()
+            return latency
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix="sql-warmup")
+    for _ in range(connections):
+        executor.submit(open_connection)
+    try:
+        # Czekaj, aż każde połączenie się otworzy albo zgłosi błąd
+        with finished:
+            finished.wait_for(lambda: len(latencies) + len(errors) >= connections, timeout)
+    finally:
+        with finished:
+            release.set()
+            result = WarmupResult(
+                connections, list(latencies), list(errors), time.perf_counter() - started
+            )
+        # Wątki wciąż logujące się kończą w tle i oddają połączenia do puli
+        executor.shutdown(wait=False)
+
+    for error in result.errors:
+        logger.warning(f"Błąd podczas rozgrzewania puli: {str(error)}")
+    logger.info(
+        f"Rozgrzano pulę: {result.opened}/{connections} połączeń w {result.seconds:.3f} s"
+    )
+    return result
@@ -0,0 +1,261 @@
+from sqlalchemy import inspect
+import atexit
+import logging
+import threading
+import time
+import weakref
+from sql_bulk import enable_fast_executemany, table_of
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Otwarte bufory - zamykane (z opróżnieniem) przy wyjściu z procesu
+_open_writers = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_writers():
+    for writer in list(_open_writers):
+        try:
+            writer.close()
+        except Exception as e:
+            logger.error(f"Błąd opróżniania bufora {writer.table.name} przy zamykaniu: {e}")
+
+
+class BufferFullError(Exception):
+    """
+    Bufor pełny, a zapis się nie zwolnił w wyznaczonym czasie
+    """
+
+
+class WriterClosedError(Exception):
+    """
+    Zapis do zamkniętego bufora
+    """
+
+
+class BufferedWriter:
+    def __init__(self, engine, model, batch_size=1000, flush_interval=1.0, max_buffer=10000,
+                 put_timeout=None, on_error=None, on_flush=None, columns=None):
+        """
+        Bufor zapisu (write-behind): wiersze są zbierane w pamięci i wstawiane
+        paczkami przez wątek w tle
+
+        Paczka jest zapisywana, gdy w buforze jest `batch_size` wierszy albo
+        po `flush_interval` sekundach od najstarszego niezapisanego wiersza.
+        Gdy bufor jest pełny, add() czeka na zapis (backpressure). close()
+        (także przy wyjściu z procesu) zapisuje wszystko, co zostało w buforze.
+
+        Args:
+            engine (Engine): Silnik SQLAlchemy
+            model: Model deklaratywny (np. User) albo Table
+            batch_size (int): Liczba wierszy w jednej paczce (i transakcji)
+            flush_interval (float): Maksymalny czas oczekiwania wiersza w buforze
+            max_buffer (int): Pojemność bufora
+            put_timeout (float, optional): Maksymalny czas oczekiwania add() na
+                miejsce w buforze (None - bez limitu, 0 - błąd od razu)
+            on_error (callable, optional): Wywoływana z (wyjątek, wiersze) dla
+                paczki, której nie udało się zapisać
+            on_flush (callable, optional): Wywoływana z liczbą zapisanych wierszy
+            columns (list, optional): Nazwy kolumn dla wierszy-krotek
+                (domyślnie wszystkie kolumny tabeli w kolejności definicji)
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size musi być dodatni")
+        if max_buffer < batch_size:
+            raise ValueError("max_buffer nie może być mniejszy niż batch_size")
+        self.engine = engine
+        self.table = table_of(model)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.put_timeout = put_timeout
+        self.on_error = on_error
+        self.on_flush = on_flush
+        self.columns = columns or [column.key for column in self.table.columns]
+        self.statement = self.table.insert()
+        enable_fast_executemany(engine)
+
+        self.added = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.waits = 0
+        self._buffer = []
+        self._oldest = None
+        # Numer ostatniego wiersza, na którego zapis czeka flush()
+        self._flush_target = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name=f"BufferedWriter-{self.table.name}", daemon=True
+        )
+        self._thread.start()
+        _open_writers.add(self)
+
+    def _as_dict(self, row):
+        if isinstance(row, dict):
+            return row
+        if hasattr(row, '__table__'):
+            # Obiekt modelu ORM - wartości atrybutów kolumn
+            mapper = inspect(row).mapper
+            return {
+                prop.columns[0].key: getattr(row, prop.key)
+                for prop in mapper.column_attrs
+                if getattr(row, prop.key) is not None
+            }
+        return dict(zip(self.columns, row))
+
+    def add(self, row):
+        """
+        Dodaje wiersz (słownik, krotka albo obiekt modelu) do bufora
+        """
+        self.add_many((row,))
+
+    def add_many(self, rows):
+        """
+        Dodaje wiele wierszy; przy pełnym buforze czeka na zapis
+        """
+        rows = [self._as_dict(row) for row in rows]
+        deadline = None if self.put_timeout is None else time.monotonic() + self.put_timeout
+        with self._condition:
+            for row in rows:
+                while len(self._buffer) >= self.max_buffer and not self._closed:
+                    self.waits += 1
+                    # Pełny bufor - nie czekaj na flush_interval
+                    self._flush_target = max(self._flush_target, self.added)
+                    self._condition.notify_all()
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise BufferFullError(
+                            f"Bufor {self.table.name} pełny ({self.max_buffer} wierszy)"
+                        )
+                    self._condition.wait(remaining)
+                if self._closed:
+                    raise WriterClosedError(f"Bufor {self.table.name} został zamknięty")
+                self._buffer.append(row)
+                self.added += 1
+                if len(self._buffer) == 1:
+                    # Wątek zapisu zaczyna odliczać flush_interval od tego wiersza
+                    self._oldest = time.monotonic()
+                    self._condition.notify_all()
+                elif len(self._buffer) == self.batch_size:
+                    self._condition.notify_all()
+
+    def _take(self):
+        # Wywoływane z założoną blokadą; zwraca paczkę gotową do zapisu albo None
+        if not self._buffer:
+            return None
+        due = (
+            len(self._buffer) >= self.batch_size
+            or self._closed
+            or self._flush_target > self.written + self.failed
+            or time.monotonic() - self._oldest >= self.flush_interval
+        )
+        if not due:
+            return None
+        batch = self._buffer[:self.batch_size]
+        del self._buffer[:self.batch_size]
+        self._oldest = time.monotonic() if self._buffer else None
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                batch = self._take()
+                while batch is None:
+                    if self._closed and not self._buffer:
+                        return
+                    timeout = None
+                    if self._oldest is not None:
+                        timeout = max(0.0, self._oldest + self.flush_interval - time.monotonic())
+                    self._condition.wait(timeout)
+                    batch = self._take()
+            self._write(batch)
+
+    def _write(self, batch):
+        # Wiersze z różnymi zestawami kolumn nie mogą trafić do jednego executemany
+        groups = {}
+        for row in batch:
+            groups.setdefault(tuple(row), []).append(row)
+        written = failed = 0
+        for rows in groups.values():
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(self.statement, rows)
+                written += len(rows)
+            except Exception as e:
+                failed += len(rows)
+                logger.error(f"Błąd zapisu paczki {len(rows)} wierszy do {self.table.name}: {e}")
+                if self.on_error is not None:
+                    try:
+                        self.on_error(e, rows)
+                    except Exception as callback_error:
+                        logger.error(f"Błąd w on_error: {callback_error}")
+        with self._condition:
+            self.written += written
+            self.failed += failed
+            self.batches += 1
+            self._condition.notify_all()
+        if written and self.on_flush is not None:
+            try:
+                self.on_flush(written)
+            except Exception as e:
+                logger.error(f"Błąd w on_flush: {e}")
+
+    def flush(self, timeout=None):
+        """
+        Zapisuje wszystkie dotąd dodane wiersze i czeka na zakończenie zapisu
+
+        Returns:
+            bool: False, gdy zapis nie zakończył się w limicie czasu
+        """
+        with self._condition:
+            target = self.added
+            self._flush_target = max(self._flush_target, target)
+            self._condition.notify_all()
+            return self._condition.wait_for(
+                lambda: self.written + self.failed >= target or not self._thread.is_alive(),
+                timeout,
+            ) and self.written + self.failed >= target
+
+    def close(self, timeout=None):
+        """
+        Zamyka bufor: zapisuje pozostałe wiersze i kończy wątek zapisu
+
+        Returns:
+            bool: False, gdy zapis nie zakończył się w limicie czasu
+        """
+        with self._condition:
+            already_closed = self._closed
+            self._closed = True
+            self._condition.notify_all()
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+        _open_writers.discard(self)
+        if not already_closed:
+            logger.info(
+                f"Zamknięto bufor {self.table.name}: zapisano {self.written} wierszy "
+                f"w {self.batches} paczkach, błędy: {self.failed}"
+            )
+        return not self._thread.is_alive()
+
+    def stats(self):
+        """
+        Zwraca liczniki bufora (dodane, zapisane, błędne, oczekujące)
+        """
+        with self._condition:
+            return {
+                "added": self.added,
+                "written": self.written,
+                "failed": self.failed,
+                "buffered": len(self._buffer),
+                "batches": self.batches,
+                "backpressure_waits": self.waits,
+            }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
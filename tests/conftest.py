@@ -0,0 +1,137 @@
+import os
+import sys
+import types
+import pytest
+
+# Moduły sql_*.py leżą w katalogu głównym repozytorium
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StubCursor:
+    """
+    Kursor pyodbc odpowiadający na zapytania dialektu mssql i metadane serwera
+    """
+    rowcount = -1
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rows = []
+
+    def execute(self, sql, *params):
+        module = self.connection.module
+        module.statements.append(sql)
+        if "@@VERSION" in sql:
+            if module.metadata_failures:
+                module.metadata_failures -= 1
+                raise module.ProgrammingError("Brak uprawnień VIEW SERVER STATE")
+            self.rows = [("Microsoft SQL Server 2022\nStub", "Developer Edition", "16.0.1000.6", 160)]
+        elif "ProductVersion" in sql:
+            self.rows = [("16.0.1000.6",)]
+        elif "sp_prepare" in sql:
+            module.prepared.append(params)
+            self.rows = [(len(module.prepared),)]
+        elif "sp_execute" in sql:
+            # Wiersz z uchwytem i wartościami parametrów
+            self.rows = [tuple(params[0])]
+        elif "sp_unprepare" in sql:
+            module.unprepared.append(params[0][0])
+            self.rows = []
+            self.description = None
+            return self
+        elif "SYSTEM_USER, USER_NAME()" in sql:
+            self.rows = [("FIRMA\\user", "dbo")]
+        elif "SYSTEM_USER" in sql:
+            self.rows = [("FIRMA\\user",)]
+        elif "schema_name()" in sql:
+            self.rows = [("dbo",)]
+        elif "sys.system_views" in sql:
+            self.rows = [("dm_exec_sessions",)]
+        elif "transaction_isolation_level" in sql:
+            self.rows = [("READ COMMITTED",)]
+        elif "test max support" in sql:
+            self.rows = [("test max support",)]
+        else:
+            self.rows = [(1,)]
+        self.description = [(f"c{i}", None, None, None, None, None, None)
+                            for i in range(len(self.rows[0]))]
+        return self
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def nextset(self):
+        return False
+
+    def close(self):
+        pass
+
+
+class StubConnection:
+    autocommit = False
+    timeout = 0
+
+    def __init__(self, module, connection_string, **kwargs):
+        self.module = module
+        self.connection_string = connection_string
+        self.kwargs = kwargs
+
+    def cursor(self):
+        return StubCursor(self)
+
+    def add_output_converter(self, *args):
+        pass
+
+    def getinfo(self, info):
+        return "16.00.1000"
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pyodbc_stub(monkeypatch):
+    """
+    Moduł pyodbc bez sterownika ODBC: zapisuje połączenia i wykonane zapytania
+    """
+    module = types.ModuleType("pyodbc")
+    module.version = "5.1.0"
+    module.paramstyle = "qmark"
+    module.SQL_DBMS_VER = 18
+    module.SQL_DRIVER_NAME = 6
+    module.Cursor = StubCursor
+    module.Connection = StubConnection
+    module.Error = type("Error", (Exception,), {})
+    for name in ("Warning", "InterfaceError", "DatabaseError", "DataError", "OperationalError",
+                 "IntegrityError", "InternalError", "ProgrammingError", "NotSupportedError"):
+        setattr(module, name, type(name, (module.Error,), {}))
+    module.connections = []
+    module.statements = []
+    module.metadata_failures = 0
+    module.prepared = []
+    module.unprepared = []
+
+    def connect(connection_string, **kwargs):
+        connection = StubConnection(module, connection_string, **kwargs)
+        module.connections.append(connection)
+        return connection
+
+    module.connect = connect
+    module.drivers = lambda: ["ODBC Driver 18 for SQL Server"]
+    monkeypatch.setitem(sys.modules, "pyodbc", module)
+    monkeypatch.setenv("SQL_ODBC_DRIVER", "ODBC Driver 18 for SQL Server")
+    return module
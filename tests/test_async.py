@@ -0,0 +1,53 @@
+import asyncio
+from sqlalchemy import select, text
+from sql_con import User, ad_connection_url
+from sql_con_async import AsyncSQLAlchemyADConnection
+
+
+def test_aiosqlite_session_round_trip(tmp_path):
+    async def scenario():
+        db = AsyncSQLAlchemyADConnection.from_url(f"sqlite+aiosqlite:///{tmp_path / 'baza.db'}")
+        await db.connect()
+        try:
+            await db.create_tables()
+            async with db.get_session() as session:
+                session.add_all([User(username="anna"), User(username="jan")])
+                await session.commit()
+
+            async def count(name):
+                async with db.get_session() as session:
+                    result = await session.execute(
+                        select(User.id).where(User.username == name)
+                    )
+                    return len(result.all())
+
+            # Sesje współbieżne na jednej pętli zdarzeń
+            return await asyncio.gather(count("anna"), count("jan"), count("brak"))
+        finally:
+            await db.dispose()
+
+    assert asyncio.run(scenario()) == [1, 1, 0]
+
+
+def test_dispose_resets_engine(tmp_path):
+    async def scenario():
+        db = AsyncSQLAlchemyADConnection.from_url("sqlite+aiosqlite://")
+        await db.connect()
+        async with db.engine.connect() as connection:
+            assert (await connection.execute(text("SELECT 1"))).scalar() == 1
+        await db.dispose()
+        return db
+
+    db = asyncio.run(scenario())
+    assert db.engine is None and db.Session is None
+
+
+def test_connection_url_uses_aioodbc(monkeypatch):
+    monkeypatch.setenv("SQL_ODBC_DRIVER", "ODBC Driver 18 for SQL Server")
+    db = AsyncSQLAlchemyADConnection("serwer", "baza", "user", "haslo", ad_domain="FIRMA")
+    url = db.create_connection_url()
+    assert url.drivername == "mssql+aioodbc"
+    assert url.username == "FIRMA\\user"
+    assert url.query["driver"] == "ODBC Driver 18 for SQL Server"
+    sync_url = ad_connection_url("serwer", "baza", "user", "haslo", ad_domain="FIRMA")
+    assert url.set(drivername="mssql+pyodbc") == sync_url
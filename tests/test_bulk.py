@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sql_bulk import bulk_load, enable_fast_executemany, iter_batches
+from sql_con import User
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    User.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def count(engine):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(User.__table__)).scalar()
+
+
+def test_loads_generator_lazily_in_batches(engine):
+    produced = []
+
+    def rows():
+        for i in range(2500):
+            produced.append(i)
+            yield (i, f"user{i}", f"user{i}@firma.com")
+
+    seen = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def remember(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            seen.append(len(produced))
+
+    result = bulk_load(engine, User, rows(), batch_size=1000)
+    assert (result.rows, result.batches) == (2500, 3)
+    assert result.rows_per_second > 0
+    assert count(engine) == 2500
+    # Każda paczka wstawiana zanim generator wyprodukuje następną
+    assert seen == [1000, 2000, 2500]
+
+
+def test_dict_rows_and_partial_columns(engine):
+    result = bulk_load(engine, User.__table__, [{"username": "anna"}, {"username": "jan"}])
+    assert result.rows == 2
+    result = bulk_load(engine, User, [("ola",)], columns=["username"])
+    assert result.rows == 1
+    assert count(engine) == 3
+
+
+def test_empty_input(engine):
+    result = bulk_load(engine, User, iter(()))
+    assert (result.rows, result.batches) == (0, 0)
+
+
+def test_invalid_batch_size(engine):
+    with pytest.raises(ValueError):
+        bulk_load(engine, User, [], batch_size=0)
+
+
+def test_iter_batches():
+    batches = list(iter_batches(((i, i) for i in range(5)), 2, ["a", "b"]))
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert batches[0][1] == {"a": 1, "b": 1}
+
+
+def test_fast_executemany_only_for_pyodbc(engine, pyodbc_stub):
+    assert enable_fast_executemany(engine) is False
+    mssql = create_engine("mssql+pyodbc://?odbc_connect=DRIVER={X}")
+    assert enable_fast_executemany(mssql) is True
+    assert mssql.dialect.fast_executemany is True
+    assert mssql.dialect.use_insertmanyvalues_wo_returning is False
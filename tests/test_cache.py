@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select, text
+from sql_cache import CachedResult, ResultCache, statement_tables, written_tables
+
+metadata = MetaData()
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String(50)),
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baza.db'}")
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(users.insert(), [{"id": 1, "username": "anna"}])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(engine, clock):
+    return ResultCache(default_ttl=60, clock=clock).attach(engine)
+
+
+QUERY = select(users.c.username).where(users.c.id == 1)
+
+
+def cached_name(cache, engine):
+    with engine.connect() as connection:
+        return cache.execute(connection, QUERY).scalar()
+
+
+def test_hit_and_miss(cache, engine):
+    assert cached_name(cache, engine) == "anna"
+    assert cached_name(cache, engine) == "anna"
+    stats = cache.snapshot()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    # Inna wartość osadzona w zapytaniu - osobny klucz
+    assert ResultCache.make_key(QUERY) != ResultCache.make_key(
+        select(users.c.username).where(users.c.id == 2)
+    )
+
+
+def test_ttl_expiry(cache, engine, clock):
+    cached_name(cache, engine)
+    clock.now += 61
+    cached_name(cache, engine)
+    stats = cache.snapshot()
+    assert (stats["hits"], stats["expirations"]) == (0, 1)
+
+
+def test_write_invalidates_reading_entries(cache, engine):
+    cached_name(cache, engine)
+    with engine.begin() as connection:
+        connection.execute(users.update().values(username="ola"))
+    assert cached_name(cache, engine) == "ola"
+    assert cache.snapshot()["invalidations"] >= 1
+
+
+def test_concurrent_read_before_commit_is_not_kept(cache, engine):
+    with engine.connect() as writer:
+        writer.execute(users.update().values(username="ola"))
+        # Inne połączenie czyta przed COMMIT i zapisuje w buforze stary wynik
+        assert cached_name(cache, engine) == "anna"
+        writer.commit()
+    assert cached_name(cache, engine) == "ola"
+
+
+def test_rollback_drops_uncommitted_result(cache, engine):
+    with engine.connect() as connection:
+        connection.execute(users.update().values(username="ola"))
+        assert cache.execute(connection, QUERY).scalar() == "ola"
+        connection.rollback()
+    assert cached_name(cache, engine) == "anna"
+
+
+def test_lru_limit(clock):
+    cache = ResultCache(max_entries=2, clock=clock)
+    for key in ("a", "b", "c"):
+        cache.put(key, CachedResult(("x",), [(1,)]))
+    assert cache.get("a") is None
+    assert cache.snapshot()["evictions"] == 1
+
+
+def test_table_detection():
+    assert statement_tables(QUERY) == {"users"}
+    assert statement_tables(text("SELECT * FROM dbo.[Users] u JOIN orders o ON 1=1")) == {
+        "users", "orders"
+    }
+    assert written_tables("UPDATE [dbo].[Users] SET x = 1") == {"users"}
+    assert written_tables("MERGE INTO users AS t USING s ON 1=1") == {"users"}
+    assert written_tables("SELECT 1") == set()
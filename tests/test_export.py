@@ -0,0 +1,106 @@
+import csv
+import datetime
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String, create_engine, select, text
+from sqlalchemy.orm import declarative_base
+from sql_export import export
+
+Base = declarative_base()
+
+
+class Pomiar(Base):
+    __tablename__ = "pomiary"
+    id = Column(Integer, primary_key=True)
+    nazwa = Column(String(50))
+    wartosc = Column(Float)
+    aktywny = Column(Boolean)
+    utworzono = Column(DateTime)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baza.db'}")
+    Base.metadata.create_all(engine)
+    created = datetime.datetime(2024, 1, 1, 12, 0)
+    with engine.begin() as connection:
+        connection.execute(Pomiar.__table__.insert(), [
+            {"id": i, "nazwa": f"p{i}", "wartosc": i / 2, "aktywny": i % 2 == 0,
+             "utworzono": created + datetime.timedelta(minutes=i)}
+            for i in range(1, 251)
+        ])
+    yield engine
+    engine.dispose()
+
+
+def test_parquet_schema_from_column_types(engine, tmp_path):
+    path = tmp_path / "pomiary.parquet"
+    result = export(engine, select(Pomiar).order_by(Pomiar.id), path, chunk_size=100)
+    assert (result.rows, result.batches) == (250, 3)
+    table = pq.read_table(path)
+    assert table.schema.types == [
+        pa.int64(), pa.string(), pa.float64(), pa.bool_(), pa.timestamp("us"),
+    ]
+    assert table.column("id").to_pylist() == list(range(1, 251))
+    # Jedna grupa wierszy na paczkę
+    assert pq.ParquetFile(path).num_row_groups == 3
+
+
+def test_text_query_infers_type_from_first_non_null(engine, tmp_path):
+    path = tmp_path / "wynik.arrow"
+    query = text("SELECT id, CASE WHEN id > 150 THEN id * 10 END AS pozniej FROM pomiary ORDER BY id")
+    export(engine, query, path, chunk_size=100)
+    table = pa.ipc.open_file(str(path)).read_all()
+    # Pierwsza paczka to same NULL-e - typ z dalszych wierszy, nie string
+    assert table.schema.field("pozniej").type == pa.int64()
+    assert table.column("pozniej").to_pylist()[150:152] == [1510, 1520]
+
+
+def test_explicit_schema_overrides_inference(engine, tmp_path):
+    path = tmp_path / "wynik.parquet"
+    export(engine, "SELECT id, nazwa FROM pomiary", path, schema={"id": pa.int32()})
+    schema = pq.read_schema(path)
+    assert schema.field("id").type == pa.int32()
+    assert schema.field("nazwa").type == pa.string()
+
+
+def test_all_null_untyped_column_falls_back_to_string(engine, tmp_path):
+    path = tmp_path / "wynik.parquet"
+    result = export(engine, "SELECT id, NULL AS puste FROM pomiary WHERE id <= 3", path)
+    assert result.rows == 3
+    assert pq.read_schema(path).field("puste").type == pa.string()
+
+
+def test_empty_result_writes_schema_only(engine, tmp_path):
+    path = tmp_path / "pusty.parquet"
+    result = export(engine, select(Pomiar).where(Pomiar.id < 0), path)
+    assert result.rows == 0
+    table = pq.read_table(path)
+    assert table.num_rows == 0
+    assert table.schema.names == ["id", "nazwa", "wartosc", "aktywny", "utworzono"]
+
+
+def test_mismatched_inferred_type_removes_partial_file(engine, tmp_path):
+    path = tmp_path / "wynik.parquet"
+    query = "SELECT CASE WHEN id <= 100 THEN id ELSE 'tekst' END AS mieszana FROM pomiary ORDER BY id"
+    with pytest.raises(ValueError, match="schema"):
+        export(engine, query, path, chunk_size=100)
+    assert not path.exists()
+
+
+def test_csv_export(engine, tmp_path):
+    path = tmp_path / "pomiary.csv"
+    result = export(engine, "SELECT id, nazwa FROM pomiary WHERE id <= :n ORDER BY id", path,
+                    params={"n": 3}, delimiter=";")
+    assert result.rows == 3
+    with open(path, newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f, delimiter=";")) == [
+            ["id", "nazwa"], ["1", "p1"], ["2", "p2"], ["3", "p3"],
+        ]
+
+
+def test_unknown_format(engine, tmp_path):
+    with pytest.raises(ValueError, match="format"):
+        export(engine, select(Pomiar), tmp_path / "wynik.xlsx")
@@ -0,0 +1,111 @@
+import csv
+import os
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Numeric, String, Table, create_engine
+from sqlalchemy.orm import declarative_base
+from sql_extract import extract, key_ranges, range_statement
+
+Base = declarative_base()
+
+# Klucze z przerwami i skupiskami - zakresy nie mogą gubić ani dublować wierszy
+IDS = list(range(1, 200)) + list(range(1000, 1050)) + [5000, 99999]
+
+
+class Item(Base):
+    __tablename__ = "items"
+    id = Column(Integer, primary_key=True)
+    code = Column(String(20))
+    price = Column(Numeric)
+
+
+@pytest.fixture
+def database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'baza.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Item.__table__.insert(), [
+            {"id": i, "code": f"k{i:06d}", "price": f"{i}.25"} for i in IDS
+        ])
+    yield url, engine
+    engine.dispose()
+
+
+def range_ids(engine, column, ranges):
+    table = Item.__table__
+    with engine.connect() as connection:
+        return [
+            connection.execute(
+                range_statement(table, column, low, high).with_only_columns(table.c.id)
+            ).scalars().all()
+            for low, high in ranges
+        ]
+
+
+@pytest.mark.parametrize("method, key", [("minmax", "id"), ("histogram", "id"), ("histogram", "code")])
+def test_ranges_cover_table_without_gaps_or_overlap(database, method, key):
+    url, engine = database
+    ranges = key_ranges(engine, Item, 8, method=method, key=key)
+    assert ranges[0][0] is None and ranges[-1][1] is None
+    # Sąsiednie zakresy stykają się: [a, b), [b, c), ...
+    assert all(left[1] == right[0] for left, right in zip(ranges, ranges[1:]))
+    parts = range_ids(engine, Item.__table__.c[key], ranges)
+    assert sorted(i for part in parts for i in part) == IDS
+    assert 1 < len(ranges) <= 8
+
+
+def test_minmax_requires_numeric_key(database):
+    url, engine = database
+    with pytest.raises(ValueError, match="histogram"):
+        key_ranges(engine, Item, 4, key="code")
+
+
+def test_empty_table_is_one_range():
+    table = Table("empty", MetaData(), Column("id", Integer, primary_key=True))
+    engine = create_engine("sqlite://")
+    table.metadata.create_all(engine)
+    assert key_ranges(engine, table, 4) == [(None, None)]
+    assert key_ranges(engine, table, 4, method="histogram") == [(None, None)]
+
+
+def test_extract_rows_in_memory(database):
+    url, engine = database
+    result = extract(url, Item, partitions=5, workers=2)
+    assert [row[0] for row in result.rows] == IDS
+    assert result.row_count == len(IDS)
+    assert sum(partition["rows"] for partition in result.partitions) == len(IDS)
+
+
+def test_extract_merged_parquet(database, tmp_path):
+    url, engine = database
+    path = tmp_path / "items.parquet"
+    result = extract(url, Item, path, partitions=4, workers=2, method="histogram", merge=True)
+    table = pq.read_table(path)
+    assert table.column("id").to_pylist() == IDS
+    # Wspólny schemat partycji - Numeric bez precyzji jako decimal(38, s)
+    assert table.schema.field("price").type.precision == 38
+    assert [float(v) for v in table.column("price").to_pylist()] == [i + 0.25 for i in IDS]
+    assert not os.path.exists(f"{path}.parts")
+    assert all(partition["path"] is None for partition in result.partitions)
+
+
+def test_extract_csv_partitions_replace_stale_parts(database, tmp_path):
+    url, engine = database
+    directory = tmp_path / "czesci"
+    extract(url, Item, directory, partitions=6, workers=2, format="csv")
+    result = extract(url, Item, directory, partitions=2, workers=1, format="csv")
+    assert sorted(os.listdir(directory)) == ["part-00000.csv", "part-00001.csv"]
+    ids = []
+    for partition in result.partitions:
+        with open(partition["path"], newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ["id", "code", "price"]
+        ids.extend(int(row[0]) for row in rows[1:])
+    assert ids == IDS
+
+
+def test_merge_requires_path(database):
+    url, engine = database
+    with pytest.raises(ValueError, match="path"):
+        extract(url, Item, merge=True)
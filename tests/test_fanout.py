@@ -0,0 +1,98 @@
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+from sql_bench import latency_dbapi
+from sql_fanout import QueryTimeout, fan_out
+
+# Zapytanie liczące długo w samym SQLite (do przerwania przez interrupt())
+SLOW_QUERY = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+    "SELECT count(*) FROM n"
+)
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    engines = []
+
+    def make(query_latency=0.0, pool_size=10):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'baza.db'}",
+            module=latency_dbapi(query_latency=query_latency),
+            poolclass=QueuePool, pool_size=pool_size, max_overflow=0,
+            connect_args={"check_same_thread": False},
+        )
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+def test_queries_run_concurrently(make_engine):
+    engine = make_engine(query_latency=0.1)
+    statements = [("SELECT :i", {"i": i}) for i in range(10)]
+    fan_out(engine, statements[:1])
+    started = time.perf_counter()
+    results = fan_out(engine, statements, max_workers=10)
+    elapsed = time.perf_counter() - started
+    # Jedno po drugim: ok. 1 s; równolegle: ok. 0.1 s
+    assert elapsed < 0.5
+    assert [rows[0][0] for rows in results] == list(range(10))
+
+
+def test_results_keep_input_order(make_engine):
+    engine = make_engine()
+    statements = [
+        (f"WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {size}) "
+         f"SELECT {index}, count(*) FROM n", None)
+        for index, size in enumerate([200000, 10, 100000, 1, 50000])
+    ]
+    results = fan_out(engine, [sql for sql, _ in statements], max_workers=5)
+    assert [rows[0][0] for rows in results] == [0, 1, 2, 3, 4]
+
+
+def test_timeout_cancels_query_and_returns_connection(make_engine):
+    engine = make_engine()
+    started = time.perf_counter()
+    results = fan_out(engine, [SLOW_QUERY, "SELECT 1"], timeout=0.2, return_exceptions=True)
+    assert time.perf_counter() - started < 5
+    assert isinstance(results[0], QueryTimeout)
+    assert results[1][0][0] == 1
+    # Przerwane zapytanie kończy się w tle i oddaje połączenie do puli
+    deadline = time.monotonic() + 5
+    while engine.pool.checkedout() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert engine.pool.checkedout() == 0
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_cancel_before_query_reaches_driver(make_engine):
+    # Opóźnienie między before_cursor_execute a startem zapytania w sqlite3:
+    # pierwsze interrupt() trafia w pustkę i musi zostać ponowione
+    engine = make_engine(query_latency=0.5)
+    # Połączenie już w puli - anulowanie trafia w opóźnienie samego zapytania
+    fan_out(engine, ["SELECT 1"])
+    results = fan_out(engine, [SLOW_QUERY], timeout=0.1, return_exceptions=True)
+    assert isinstance(results[0], QueryTimeout)
+    deadline = time.monotonic() + 5
+    while engine.pool.checkedout() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert engine.pool.checkedout() == 0
+
+
+def test_first_error_cancels_remaining_queries(make_engine):
+    engine = make_engine()
+    with pytest.raises(Exception):
+        fan_out(engine, [SLOW_QUERY, "SELECT * FROM brak_tabeli"], timeout=10)
+    deadline = time.monotonic() + 5
+    while engine.pool.checkedout() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert engine.pool.checkedout() == 0
+
+
+def test_empty_input(make_engine):
+    assert fan_out(make_engine(), []) == []
@@ -0,0 +1,78 @@
+import array
+import datetime
+import decimal
+import pytest
+from sqlalchemy import Column, DateTime, Integer, Numeric, String, create_engine, select
+from sqlalchemy.orm import declarative_base
+import sql_fastread
+from sql_fastread import _processors, fetch_columns, fetch_tuples
+
+Base = declarative_base()
+
+
+class Event(Base):
+    __tablename__ = "events"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+    # W SQLite zapisywane jako tekst - wymagają procesorów typów
+    created_at = Column(DateTime)
+    amount = Column(Numeric(10, 2))
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Event.__table__.insert(), [
+            {"id": i, "name": f"e{i}", "created_at": datetime.datetime(2026, 1, 1, 0, 0, i % 60),
+             "amount": decimal.Decimal(f"{i}.50")}
+            for i in range(2500)
+        ])
+    yield engine
+    engine.dispose()
+
+
+def test_fast_path_is_available(engine):
+    # Nowa wersja SQLAlchemy bez tych elementów ma zepsuć test, a nie
+    # po cichu przełączyć odczyt na wolniejszą ścieżkę przez Row
+    with engine.connect() as connection:
+        result = connection.execute(select(Event))
+        processors = _processors(result)
+        result.close()
+    assert processors is not None
+    assert len(processors) == 4
+    assert processors[0] is None and processors[2] is not None
+
+
+def test_buffered_result_uses_fallback(engine):
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=100).execute(
+            select(Event)
+        )
+        assert _processors(result) is None
+        result.close()
+
+
+def test_fetch_tuples_converts_types(engine):
+    rows = fetch_tuples(engine, Event, chunk_size=1000)
+    assert len(rows) == 2500
+    row = rows[61]
+    assert (row.id, row.name) == (61, "e61")
+    assert row.created_at == datetime.datetime(2026, 1, 1, 0, 0, 1)
+    assert row.amount == decimal.Decimal("61.50")
+    assert type(row) is sql_fastread.row_class(("id", "name", "created_at", "amount"))
+
+
+def test_fallback_matches_fast_path(engine, monkeypatch):
+    fast = fetch_tuples(engine, select(Event).order_by(Event.id), chunk_size=700)
+    monkeypatch.setattr(sql_fastread, "_processors", lambda result: None)
+    slow = fetch_tuples(engine, select(Event).order_by(Event.id), chunk_size=700)
+    assert fast == slow
+
+
+def test_fetch_columns_without_numpy(engine):
+    columns = fetch_columns(engine, "SELECT id, name FROM events ORDER BY id", use_numpy=False)
+    assert isinstance(columns["id"], array.array) and columns["id"].typecode == "q"
+    assert list(columns["id"][:3]) == [0, 1, 2]
+    assert columns["name"][:2] == ["e0", "e1"]
@@ -0,0 +1,196 @@
+import sys
+import types
+import pytest
+from sql_kerberos import KerberosTicketManager, renewal_delay
+
+
+class FakeCredentials:
+    """
+    Zastępuje gssapi.Credentials - ważny jest tylko atrybut lifetime
+    """
+
+    def __init__(self, lifetime):
+        self.lifetime = lifetime
+
+
+class FakeKDC:
+    def __init__(self, cached=None, lifetime=36000):
+        self.cached = cached
+        self.lifetime = lifetime
+        self.loads = 0
+        self.acquires = 0
+
+    def load(self, principal, ccache):
+        self.loads += 1
+        return self.cached
+
+    def acquire(self, principal, password, ccache):
+        self.acquires += 1
+        self.cached = FakeCredentials(self.lifetime)
+        return self.cached
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def manager(kdc, clock=None, **options):
+    return KerberosTicketManager(
+        "user@FIRMA.COM", "haslo", ccache="MEMORY:test",
+        load_credentials=kdc.load, acquire_credentials=kdc.acquire,
+        clock=clock or FakeClock(), **options
+    )
+
+
+def test_reuses_valid_ticket_from_ccache():
+    kdc = FakeKDC(cached=FakeCredentials(3600))
+    tickets = manager(kdc)
+    try:
+        assert tickets.ensure_ticket() is kdc.cached
+        assert (tickets.reused_count, tickets.acquired_count, kdc.acquires) == (1, 0, 0)
+        assert tickets.remaining_lifetime() == 3600
+    finally:
+        tickets.stop()
+
+
+def test_acquires_ticket_when_cached_one_is_about_to_expire():
+    kdc = FakeKDC(cached=FakeCredentials(100))
+    tickets = manager(kdc, min_lifetime=300)
+    try:
+        tickets.ensure_ticket()
+        assert (tickets.reused_count, tickets.acquired_count, kdc.acquires) == (0, 1, 1)
+        assert tickets.remaining_lifetime() == kdc.lifetime
+    finally:
+        tickets.stop()
+
+
+def test_acquires_ticket_when_ccache_is_empty():
+    kdc = FakeKDC()
+    tickets = manager(kdc)
+    try:
+        tickets.ensure_ticket()
+        assert kdc.acquires == 1
+    finally:
+        tickets.stop()
+
+
+def test_valid_ticket_is_not_reloaded():
+    kdc = FakeKDC(cached=FakeCredentials(3600))
+    clock = FakeClock()
+    tickets = manager(kdc, clock)
+    try:
+        tickets.ensure_ticket()
+        clock.now += 1000
+        tickets.ensure_ticket()
+        assert kdc.loads == 1
+        # Bilet kończy się - kolejne wywołanie idzie do KDC
+        clock.now += 2500
+        kdc.cached = FakeCredentials(100)
+        tickets.ensure_ticket()
+        assert kdc.acquires == 1
+    finally:
+        tickets.stop()
+
+
+def test_ticket_without_lifetime_never_expires():
+    kdc = FakeKDC(cached=FakeCredentials(None))
+    tickets = manager(kdc)
+    tickets.ensure_ticket()
+    assert tickets.expires_at is None
+    # Brak czasu życia - brak odnawiania w tle
+    assert tickets._timer is None
+
+
+def test_stop_cancels_background_renewal():
+    tickets = manager(FakeKDC(cached=FakeCredentials(3600)))
+    tickets.ensure_ticket()
+    timer = tickets._timer
+    assert timer is not None and timer.is_alive()
+    tickets.stop()
+    timer.join(1)
+    assert tickets._timer is None
+    assert not timer.is_alive()
+
+
+def test_renewal_delay():
+    assert renewal_delay(None) is None
+    assert renewal_delay(1000, renew_fraction=0.5) == 500
+    assert renewal_delay(10) == 30
+    assert 675 <= renewal_delay(1000, jitter=0.1) <= 750
+
+
+@pytest.fixture
+def fake_gssapi(monkeypatch):
+    # get_ticket() importuje gssapi tylko po to, żeby złapać GSSError
+    module = types.ModuleType("gssapi")
+    module.exceptions = types.SimpleNamespace(GSSError=type("GSSError", (Exception,), {}))
+    # bind_ccache() ustawia ccache wątku na czas logowania
+    module.raw = types.SimpleNamespace(krb5_ccache_name=lambda name: b"")
+    monkeypatch.setitem(sys.modules, "gssapi", module)
+    monkeypatch.setitem(sys.modules, "gssapi.raw", module.raw)
+    return module
+
+
+@pytest.fixture
+def fake_kdc(monkeypatch, tmp_path):
+    import sql_kerberos
+
+    kdc = FakeKDC(cached=FakeCredentials(3600))
+    monkeypatch.setattr(sql_kerberos, "_load_credentials", kdc.load)
+    monkeypatch.setattr(sql_kerberos, "_acquire_credentials", kdc.acquire)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("KRB5_CONFIG", str(tmp_path / "krb5.conf"))
+    return kdc
+
+
+@pytest.mark.parametrize("module_name", ["sql_con_gs", "sql_con_gs2"])
+def test_renewal_survives_connect_and_stops_on_dispose(fake_gssapi, fake_kdc, pyodbc_stub,
+                                                       module_name):
+    module = __import__(module_name)
+    db = module.SQLServerWindowsAuth("serwer", "baza", "firma.com", "user", "haslo")
+    if module_name == "sql_con_gs2":
+        db.setup_kerberos()
+    try:
+        db.connect()
+        timer = db.ticket_manager._timer
+        assert timer is not None and timer.is_alive()
+        # Ponowne connect() zwalnia poprzedni silnik, ale nie zatrzymuje odnawiania
+        db.connect()
+        assert db.ticket_manager._timer.is_alive()
+    finally:
+        timer = db.ticket_manager._timer
+        db.dispose()
+    timer.join(1)
+    assert db.ticket_manager._timer is None
+    assert not timer.is_alive()
+
+
+def test_ensure_ticket_restarts_stopped_renewal():
+    kdc = FakeKDC(cached=FakeCredentials(3600))
+    tickets = manager(kdc)
+    try:
+        tickets.ensure_ticket()
+        tickets.stop()
+        tickets.ensure_ticket()
+        assert kdc.loads == 1
+        assert tickets._timer is not None and tickets._timer.is_alive()
+    finally:
+        tickets.stop()
+
+
+@pytest.mark.parametrize("module_name", ["sql_con_gs", "sql_con_gs2"])
+@pytest.mark.parametrize("teardown", ["close", "dispose"])
+def test_connection_teardown_stops_renewal(fake_gssapi, module_name, teardown):
+    module = __import__(module_name)
+    db = module.SQLServerWindowsAuth("serwer", "baza", "firma.com", "user", "haslo")
+    db.ticket_manager = manager(FakeKDC(cached=FakeCredentials(3600)))
+    db.ticket_manager.ensure_ticket()
+    timer = db.ticket_manager._timer
+    getattr(db, teardown)()
+    timer.join(1)
+    assert db.ticket_manager._timer is None
+    assert not timer.is_alive()
@@ -0,0 +1,181 @@
+import base64
+import datetime
+import decimal
+import json
+import sqlite3
+import uuid
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine
+from sqlalchemy.orm import declarative_base
+from sql_bench import BenchConnection
+from sql_paginate import decode_cursor, encode_cursor, paginate
+
+Base = declarative_base()
+
+
+class User(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True)
+    username = Column(String(50))
+    team = Column(Integer)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        # Wiele wierszy z tym samym `team` - remisy rozstrzyga id
+        connection.execute(
+            User.__table__.insert(),
+            [{"id": i, "username": f"user{i}", "team": i % 7} for i in range(1, 104)],
+        )
+    yield engine
+    engine.dispose()
+
+
+def collect(pages):
+    pages = list(pages)
+    return pages, [item for page in pages for item in page]
+
+
+def test_pages_cover_table_without_duplicates_or_gaps(engine):
+    pages, items = collect(paginate(engine, User, page_size=10))
+    assert [len(page) for page in pages] == [10] * 10 + [3]
+    assert [user.id for user in items] == list(range(1, 104))
+    assert pages[-1].next_cursor is None
+
+
+def test_multi_column_key_with_ties(engine):
+    _, items = collect(paginate(engine, User, order_by=[User.team, User.id], page_size=8))
+    keys = [(user.team, user.id) for user in items]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == 103
+
+
+def test_descending_order(engine):
+    _, items = collect(paginate(engine, User, order_by=["team", "id"], page_size=9,
+                                descending=True))
+    keys = [(user.team, user.id) for user in items]
+    assert keys == sorted(keys, reverse=True)
+    assert len(keys) == 103
+
+
+def test_resume_from_cursor(engine):
+    first = next(paginate(engine, User.__table__, page_size=25))
+    rest = [row.id for page in paginate(engine, User.__table__, page_size=25,
+                                        cursor=first.next_cursor) for row in page]
+    assert rest == list(range(26, 104))
+
+
+def test_typed_cursor_values_round_trip():
+    values = [
+        datetime.datetime(2026, 1, 2, 3, 4, 5, 678),
+        datetime.date(2026, 1, 2),
+        datetime.time(13, 45, 1, 5),
+        uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        decimal.Decimal("12.3400"),
+        b"\x00\xff",
+        "tekst",
+        42,
+        None,
+    ]
+    decoded = decode_cursor(encode_cursor(values))
+    assert decoded == values
+    assert [type(v) for v in decoded] == [type(v) for v in values]
+
+
+def tampered(payload):
+    raw = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("token", [
+    "to nie jest token",
+    tampered({"id": 1}),
+    tampered([{"dec": "nie-liczba"}]),
+    tampered([{"dt": "wczoraj"}]),
+    tampered([{"x": 1}]),
+    tampered([[1, 2]]),
+])
+def test_tampered_cursor_is_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_invalid_arguments_fail_before_iteration(engine):
+    with pytest.raises(ValueError):
+        paginate(engine, User, page_size=0)
+    # Token z inną liczbą kolumn niż klucz
+    with pytest.raises(ValueError):
+        paginate(engine, User, cursor=encode_cursor([1, 2]))
+
+
+def test_where_filter_and_plain_table(engine):
+    table = User.__table__
+    pages, rows = collect(paginate(engine, table, page_size=4, where=table.c.team == 3))
+    assert [row.id for row in rows] == [i for i in range(1, 104) if i % 7 == 3]
+    assert all(len(page) <= 4 for page in pages)
+
+
+def test_last_full_page_ends_iteration(engine):
+    # 103 wiersze przy stronie 103: jedna pełna strona, bez pustej strony na końcu
+    pages, rows = collect(paginate(engine, User, page_size=103))
+    assert [len(page) for page in pages] == [103]
+    assert pages[-1].next_cursor is not None
+    pages, rows = collect(paginate(engine, User, page_size=103, cursor=pages[-1].next_cursor))
+    assert pages == []
+
+
+def test_rows_inserted_before_cursor_do_not_shift_pages(engine):
+    pages = paginate(engine, User, page_size=10)
+    first = next(pages)
+    with engine.begin() as connection:
+        # OFFSET przesunąłby kolejne strony - keyset nie
+        connection.execute(User.__table__.insert(), [{"id": 0, "username": "nowy", "team": 0}])
+    second = next(pages)
+    assert [user.id for user in first] == list(range(1, 11))
+    assert [user.id for user in second] == list(range(11, 21))
+
+
+def test_datetime_key_through_database():
+    metadata = MetaData()
+    events = Table(
+        "events", metadata,
+        Column("created_at", DateTime, primary_key=True),
+        Column("name", String(20)),
+    )
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    start = datetime.datetime(2024, 1, 1, 8, 30, 15, 250000)
+    with engine.begin() as connection:
+        connection.execute(events.insert(), [
+            {"created_at": start + datetime.timedelta(seconds=i), "name": f"e{i}"}
+            for i in range(25)
+        ])
+    first = next(paginate(engine, events, page_size=10))
+    pages, rows = collect(paginate(engine, events, page_size=10, cursor=first.next_cursor))
+    assert [row.name for row in rows] == [f"e{i}" for i in range(10, 25)]
+    engine.dispose()
+
+
+def test_table_without_primary_key_needs_order_by():
+    table = Table("log", MetaData(), Column("message", String(20)))
+    with pytest.raises(ValueError, match="order_by"):
+        paginate(create_engine("sqlite://"), table)
+
+
+def test_connection_paginate(tmp_path):
+    connection = BenchConnection(f"sqlite:///{tmp_path / 'baza.db'}", sqlite3)
+    connection.connect()
+    try:
+        Base.metadata.create_all(connection.engine)
+        with connection.engine.begin() as conn:
+            conn.execute(User.__table__.insert(), [
+                {"id": i, "username": f"user{i}", "team": 0} for i in range(1, 31)
+            ])
+        pages, users = collect(connection.paginate(User, page_size=7, descending=True))
+        assert [user.id for user in users] == list(range(30, 0, -1))
+        assert len(pages) == 5
+    finally:
+        connection.close()
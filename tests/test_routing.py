@@ -0,0 +1,126 @@
+import random
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, select, text
+from sqlalchemy.orm import declarative_base
+from sql_routing import ReplicaRouter, replica_url
+
+Base = declarative_base()
+
+
+class User(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True)
+    username = Column(String(50))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def database(path, marker):
+    # Każda baza ma wiersz wskazujący, skąd przyszedł odczyt
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), {"id": 1, "username": marker})
+    return engine
+
+
+@pytest.fixture
+def engines(tmp_path):
+    engines = {
+        name: database(tmp_path / f"{name}.db", name)
+        for name in ("primary", "replica1", "replica2")
+    }
+    yield engines
+    for engine in engines.values():
+        engine.dispose()
+
+
+def source(session):
+    return session.execute(select(User.username).where(User.id == 1)).scalar()
+
+
+def test_reads_go_to_replica_and_writes_to_primary(engines):
+    router = ReplicaRouter(engines["primary"], [engines["replica1"], engines["replica2"]],
+                           rng=random.Random(1))
+    with router.session(read_only=True) as session:
+        assert source(session) in ("replica1", "replica2")
+        # Po flush sesja czyta z serwera głównego (widzi własne zmiany)
+        session.add(User(id=2, username="nowy"))
+        session.flush()
+        assert source(session) == "primary"
+        session.commit()
+    with engines["primary"].connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM users")).scalar() == 2
+    for name in ("replica1", "replica2"):
+        with engines[name].connect() as connection:
+            assert connection.execute(text("SELECT count(*) FROM users")).scalar() == 1
+
+
+def test_core_write_statement_goes_to_primary(engines):
+    router = ReplicaRouter(engines["primary"], [engines["replica1"]])
+    with router.session(read_only=True) as session:
+        session.execute(User.__table__.update().values(username="zmieniony"))
+        assert source(session) == "zmieniony"
+        session.commit()
+
+
+def test_write_session_uses_primary(engines):
+    router = ReplicaRouter(engines["primary"], [engines["replica1"]])
+    with router.session(read_only=False) as session:
+        assert source(session) == "primary"
+
+
+def test_failing_replica_cools_down_and_falls_back_to_primary(engines, tmp_path):
+    clock = FakeClock()
+    broken = create_engine(f"sqlite:///{tmp_path / 'brak' / 'replica.db'}")
+    router = ReplicaRouter(engines["primary"], [broken], cooldown=30.0, clock=clock)
+    report = router.check_health()
+    assert list(report.values()) == [None]
+    assert router.snapshot()[broken.replica_health.name]["healthy"] is False
+    with router.session(read_only=True) as session:
+        assert source(session) == "primary"
+    # Po okresie wyłączenia replika wraca do losowania
+    clock.now += 31
+    assert router.choose() is broken
+
+
+def test_replica_recovers_after_successful_health_check(engines):
+    clock = FakeClock()
+    replica = engines["replica1"]
+    router = ReplicaRouter(engines["primary"], [replica], clock=clock)
+    replica.replica_health.fail("test")
+    assert router.choose() is engines["primary"]
+    router.check_health()
+    assert router.choose() is replica
+
+
+def test_weighted_choice_prefers_lower_latency(engines):
+    fast, slow = engines["replica1"], engines["replica2"]
+    router = ReplicaRouter(engines["primary"], [fast, slow], rng=random.Random(7))
+    fast.replica_health.latency = 0.001
+    slow.replica_health.latency = 0.009
+    picks = [router.choose() for _ in range(2000)]
+    share = picks.count(fast) / len(picks)
+    # Wagi 1/opóźnienie: 1000 i ~111 -> ok. 90% odczytów na szybszej replice
+    assert 0.86 < share < 0.94
+
+
+def test_latency_is_ewma(engines):
+    health = ReplicaRouter(engines["primary"], [engines["replica1"]]).replicas[0].replica_health
+    health.latency = None
+    health.observe(1.0)
+    health.observe(2.0)
+    assert health.latency == pytest.approx(1.2)
+
+
+def test_replica_url_adds_read_intent():
+    url = replica_url("mssql+pyodbc:///?odbc_connect=DRIVER={X};SERVER=a", host="b")
+    conn_str = url.query["odbc_connect"]
+    assert "SERVER=b" in conn_str and "ApplicationIntent=ReadOnly" in conn_str
+    assert str(replica_url("sqlite:///a.db")) == "sqlite:///a.db"
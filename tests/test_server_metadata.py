@@ -0,0 +1,76 @@
+import pytest
+from sql_con_2 import SQLServerADAuth
+
+
+@pytest.fixture
+def connections():
+    opened = []
+
+    def make(**options):
+        db = SQLServerADAuth("serwer.database.windows.net", "baza", "user@firma.com", "haslo",
+                             **options)
+        opened.append(db)
+        return db
+
+    yield make
+    for db in opened:
+        db.dispose()
+
+
+def metadata_queries(pyodbc_stub):
+    return [sql for sql in pyodbc_stub.statements if "@@VERSION" in sql]
+
+
+def test_single_handshake_connect(pyodbc_stub, connections):
+    db = connections()
+    db.connect()
+    assert len(pyodbc_stub.connections) == 1
+    assert "Authentication=ActiveDirectoryPassword" in pyodbc_stub.connections[0].connection_string
+
+    info = db.server_info()
+    assert info["edition"] == "Developer Edition"
+    assert info["compatibility_level"] == 160
+    # Metadane pobrane przez pierwsze połączenie puli - bez nowego logowania
+    assert len(pyodbc_stub.connections) == 1
+    assert len(metadata_queries(pyodbc_stub)) == 1
+
+
+def test_lazy_connect_opens_no_connection(pyodbc_stub, connections):
+    db = connections()
+    db.connect(lazy=True)
+    assert pyodbc_stub.connections == []
+    assert db.server_info()["product_version"] == "16.0.1000.6"
+    assert len(pyodbc_stub.connections) == 1
+
+
+def test_metadata_shared_by_instances_of_one_engine(pyodbc_stub, connections):
+    first, second = connections(), connections()
+    first.connect()
+    second.connect()
+    assert first.engine is second.engine
+    assert second.server_info() == first.server_info()
+    assert len(metadata_queries(pyodbc_stub)) == 1
+
+
+def test_server_info_retries_after_failed_probe(pyodbc_stub, connections):
+    pyodbc_stub.metadata_failures = 1
+    db = connections()
+    db.connect()
+    assert db.engine.server_metadata == {}
+    assert db.server_info()["version"].startswith("Microsoft SQL Server 2022")
+    assert len(metadata_queries(pyodbc_stub)) == 2
+    # Kolejne wywołanie korzysta z wypełnionego słownika
+    db.server_info()
+    assert len(metadata_queries(pyodbc_stub)) == 2
+
+
+def test_token_providers_do_not_share_engine(pyodbc_stub, connections):
+    first = connections(token_provider=lambda: ("token-a", 4102444800))
+    second = connections(token_provider=lambda: ("token-b", 4102444800))
+    same = connections(token_provider=first.token_provider)
+    for db in (first, second, same):
+        db.connect(lazy=True)
+    assert first.engine is not second.engine
+    assert first.token_cache is not second.token_cache
+    assert same.engine is first.engine
+    assert same.token_cache is first.token_cache
@@ -0,0 +1,96 @@
+import datetime
+import decimal
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select, text
+import sql_statements
+from sql_statements import CompiledCacheStats, StatementRegistry, sql_server_type
+
+metadata = MetaData()
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String(50)),
+)
+
+
+@pytest.fixture
+def registry():
+    registry = StatementRegistry()
+    registry.declare("user_by_id", select(users.c.username).where(users.c.id == text(":id")))
+    registry.declare("by_name", "SELECT id FROM users WHERE username = :name AND 'a?' <> ''")
+    return registry
+
+
+@pytest.fixture
+def mssql(pyodbc_stub):
+    engine = create_engine("mssql+pyodbc://?odbc_connect=DRIVER={X};SERVER=a",
+                           pool_size=1, max_overflow=0)
+    yield engine
+    engine.dispose()
+
+
+def test_sqlite_executes_without_prepare(registry):
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(users.insert(), [{"id": 1, "username": "anna"}])
+    stats = CompiledCacheStats.attach(engine)
+    for _ in range(3):
+        assert registry.execute(engine, "user_by_id", {"id": 1}) == [("anna",)]
+    snapshot = stats.snapshot()
+    # Jeden obiekt zapytania - kompilacja tylko przy pierwszym wykonaniu
+    assert (snapshot["misses"], snapshot["hits"]) == (1, 2)
+
+
+def test_prepared_handle_is_reused_per_connection(registry, mssql, pyodbc_stub):
+    for user_id in (1, 2, 3):
+        rows = registry.execute(mssql, "user_by_id", {"id": user_id})
+        assert rows == [(1, user_id)]
+    # Jedno sp_prepare, trzy sp_execute z tym samym uchwytem
+    assert len(pyodbc_stub.prepared) == 1
+    declarations, sql = pyodbc_stub.prepared[0]
+    assert declarations == "@P1 bigint"
+    assert "@P1" in sql and "?" not in sql
+
+
+def test_literal_question_mark_is_not_a_parameter(registry, mssql, pyodbc_stub):
+    registry.execute(mssql, "by_name", {"name": "anna"})
+    declarations, sql = pyodbc_stub.prepared[0]
+    assert declarations == "@P1 nvarchar(4000)"
+    assert "'a?'" in sql
+
+
+def test_value_outside_type_gets_new_handle(registry, mssql, pyodbc_stub):
+    registry.execute(mssql, "by_name", {"name": "anna"})
+    registry.execute(mssql, "by_name", {"name": "x" * 5000})
+    registry.execute(mssql, "by_name", {"name": "jan"})
+    assert [d for d, _ in pyodbc_stub.prepared] == ["@P1 nvarchar(4000)", "@P1 nvarchar(max)"]
+
+
+def test_oldest_handles_are_unprepared(registry, mssql, pyodbc_stub, monkeypatch):
+    monkeypatch.setattr(sql_statements, "MAX_PREPARED", 2)
+    for index in range(4):
+        registry.declare(f"q{index}", f"SELECT {index} WHERE 1 = :x")
+        registry.execute(mssql, f"q{index}", {"x": 1})
+    assert pyodbc_stub.unprepared == [1, 2]
+    # Uchwyt najnowszego zapytania nadal w użyciu
+    registry.execute(mssql, "q3", {"x": 1})
+    assert len(pyodbc_stub.prepared) == 4
+
+
+def test_unknown_statement(registry):
+    with pytest.raises(KeyError):
+        registry["brak"]
+
+
+@pytest.mark.parametrize("value, expected", [
+    (True, "bit"),
+    (2 ** 62, "bigint"),
+    (2 ** 70, "decimal(38, 0)"),
+    (decimal.Decimal("1.250"), "decimal(38, 3)"),
+    (datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc), "datetimeoffset"),
+    (datetime.time(12, 0), "time"),
+    ("x" * 4001, "nvarchar(max)"),
+])
+def test_sql_server_type(value, expected):
+    assert sql_server_type(value) == expected
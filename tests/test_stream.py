@@ -0,0 +1,93 @@
+import gc
+import tracemalloc
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import declarative_base
+from sql_stream import stream
+
+Base = declarative_base()
+ROWS = 100000
+
+
+class User(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True)
+    username = Column(String(50))
+    email = Column(String(100))
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('stream') / 'baza.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            User.__table__.insert(),
+            [{"id": i, "username": f"user{i}", "email": f"user{i}@firma.com"}
+             for i in range(ROWS)],
+        )
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("query", [
+    User.__table__.select(),
+    select(User.username),
+    select(User),
+    "SELECT id, username FROM users",
+])
+def test_streams_rows_on_both_paths(engine, query):
+    count = 0
+    for row in stream(engine, query, chunk_size=5000):
+        assert isinstance(row, Row)
+        count += 1
+    assert count == ROWS
+    assert engine.pool.checkedout() == 0
+
+
+def test_orm_entities_are_in_rows(engine):
+    row = next(iter(stream(engine, select(User).order_by(User.id))))
+    assert isinstance(row[0], User) and row.User.id == 0
+
+
+def test_batches(engine):
+    sizes = [len(batch) for batch in stream(engine, select(User.id), chunk_size=30000,
+                                            batches=True)]
+    assert sizes == [30000, 30000, 30000, 10000]
+
+
+@pytest.mark.parametrize("query", [User.__table__.select(), select(User)])
+def test_connection_returned_after_early_stop(engine, query):
+    rows = stream(engine, query, chunk_size=100)
+    next(rows)
+    assert engine.pool.checkedout() == 1
+    rows.close()
+    assert engine.pool.checkedout() == 0
+
+    for _ in stream(engine, query, chunk_size=100):
+        break
+    gc.collect()
+    assert engine.pool.checkedout() == 0
+
+
+def peak_memory(read):
+    tracemalloc.start()
+    try:
+        read()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("query", [User.__table__.select(), select(User)])
+def test_peak_memory_does_not_grow_with_table(engine, query):
+    def streamed():
+        for _ in stream(engine, query, chunk_size=1000):
+            pass
+
+    def loaded():
+        with engine.connect() as connection:
+            connection.execute(query).all()
+
+    assert peak_memory(streamed) < peak_memory(loaded) / 4
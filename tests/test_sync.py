@@ -0,0 +1,119 @@
+import datetime
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine
+from sqlalchemy import delete, insert, update
+from sql_sync import DeltaSync, WatermarkStore
+
+metadata = MetaData()
+items = Table(
+    "items", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(50)),
+    Column("updated_at", DateTime),
+)
+T0 = datetime.datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'zrodlo.db'}")
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        # Wiele wierszy z tym samym czasem - remisy na granicy paczek
+        connection.execute(insert(items), [
+            {"id": i, "name": f"n{i}", "updated_at": T0 + datetime.timedelta(seconds=i // 4)}
+            for i in range(1, 31)
+        ])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = WatermarkStore(tmp_path / "znaczniki.db")
+    yield store
+    store.close()
+
+
+def sync(engine, store, **options):
+    options.setdefault("batch_size", 7)
+    return DeltaSync(engine, items, store, **options)
+
+
+def ids(delta):
+    return sorted(row.id for row in delta.changed)
+
+
+def test_full_then_incremental(engine, store):
+    syncer = sync(engine, store)
+    delta = syncer.poll()
+    assert delta.full and ids(delta) == list(range(1, 31))
+    # Wiersze mają kształt tabeli
+    assert delta.changed[0]._fields == ("id", "name", "updated_at")
+    syncer.commit(delta)
+
+    assert syncer.poll().changed == []
+    later = T0 + datetime.timedelta(days=1)
+    with engine.begin() as connection:
+        connection.execute(update(items).where(items.c.id.in_([3, 17])).values(updated_at=later))
+        connection.execute(insert(items), {"id": 31, "name": "nowy", "updated_at": later})
+    delta = syncer.poll()
+    assert not delta.full and ids(delta) == [3, 17, 31]
+
+
+def test_uncommitted_delta_is_repeated(engine, store):
+    syncer = sync(engine, store)
+    syncer.poll()
+    assert syncer.poll().full
+    syncer.reset()
+    assert syncer.poll().full
+
+
+def test_watermark_survives_new_store_instance(engine, store, tmp_path):
+    sync(engine, store).commit(sync(engine, store).poll())
+    reopened = WatermarkStore(tmp_path / "znaczniki.db")
+    try:
+        assert sync(engine, reopened).poll().changed == []
+    finally:
+        reopened.close()
+
+
+def test_delete_detection(engine, store):
+    syncer = sync(engine, store, detect_deletes=True)
+    syncer.commit(syncer.poll())
+    with engine.begin() as connection:
+        connection.execute(delete(items).where(items.c.id.in_([2, 29])))
+    delta = syncer.poll()
+    assert sorted(delta.deleted) == [[2], [29]]
+    syncer.commit(delta)
+    assert syncer.poll().deleted == []
+
+
+def test_batches_commit_progressively(engine, store):
+    syncer = sync(engine, store)
+    batches = syncer.batches()
+    first = next(batches)
+    assert len(first.changed) == 7 and first.full
+    syncer.commit(first)
+    batches.close()
+    # Przerwana synchronizacja wznawia się za ostatnią zatwierdzoną paczką
+    rest = list(syncer.batches())
+    assert [len(delta.changed) for delta in rest] == [7, 7, 7, 2]
+    assert sorted(row.id for delta in rest for row in delta.changed) == list(range(8, 31))
+
+
+def test_null_updated_at_rows_in_full_sync(engine, store):
+    with engine.begin() as connection:
+        connection.execute(insert(items), [
+            {"id": i, "name": "bez daty", "updated_at": None} for i in range(100, 110)
+        ])
+    syncer = sync(engine, store, batch_size=4)
+    delta = syncer.poll()
+    assert ids(delta) == list(range(1, 31)) + list(range(100, 110))
+    syncer.commit(delta)
+    assert syncer.poll().changed == []
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        DeltaSync(None, items, ":memory:", strategy="trigger")
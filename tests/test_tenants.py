@@ -0,0 +1,123 @@
+import threading
+import time
+import pytest
+from sqlalchemy import text
+from sql_tenants import TenantEngineManager, TenantLimitError
+
+
+@pytest.fixture
+def make_manager(tmp_path):
+    managers = []
+
+    def make(**options):
+        options.setdefault("pool_size", 1)
+        options.setdefault("max_overflow", 0)
+        manager = TenantEngineManager(
+            lambda server, database: f"sqlite:///{tmp_path / f'{server}_{database}.db'}",
+            **options
+        )
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.dispose()
+
+
+def query(manager, database):
+    with manager.connect("srv", database) as connection:
+        return connection.execute(text("SELECT 1")).scalar()
+
+
+def tenants(manager):
+    return [database for _, database in manager._tenants]
+
+
+def test_least_recently_used_idle_tenant_is_evicted(make_manager):
+    manager = make_manager(max_connections=2)
+    query(manager, "a")
+    query(manager, "b")
+    # "a" używany ponownie - najdawniej używany jest teraz "b"
+    query(manager, "a")
+    query(manager, "c")
+    assert tenants(manager) == ["a", "c"]
+    assert manager.evictions == 1
+    assert manager.open_connections() <= 2
+
+
+def test_idle_timeout_evicts_unused_tenants(make_manager):
+    manager = make_manager(idle_timeout=0.05)
+    query(manager, "a")
+    time.sleep(0.1)
+    query(manager, "b")
+    assert tenants(manager) == ["b"]
+
+
+def test_limit_raises_when_all_tenants_are_busy(make_manager):
+    manager = make_manager(max_connections=2, wait_timeout=0.2)
+    held = [manager.connect("srv", "a"), manager.connect("srv", "b")]
+    try:
+        started = time.monotonic()
+        with pytest.raises(TenantLimitError):
+            manager.connect("srv", "c")
+        assert time.monotonic() - started >= 0.2
+        assert manager.open_connections() == 2
+    finally:
+        for connection in held:
+            connection.close()
+
+
+def test_connect_waits_for_released_connection(make_manager):
+    manager = make_manager(max_connections=1, wait_timeout=5)
+    held = manager.connect("srv", "a")
+    timer = threading.Timer(0.1, held.close)
+    timer.start()
+    try:
+        # Po zwolnieniu połączenia "a" jego silnik może zostać zamknięty
+        assert query(manager, "b") == 1
+    finally:
+        timer.join()
+    assert tenants(manager) == ["b"]
+
+
+def test_idle_connection_is_promised_to_one_caller(make_manager):
+    manager = make_manager(max_connections=1)
+    query(manager, "a")
+    with manager._lock:
+        tenant = manager._tenant("srv", "a")
+        # Pierwszy connect() dostaje wolne połączenie puli, drugi musiałby
+        # otworzyć nowe ponad limit
+        assert manager._reserve(tenant) == 0
+        assert tenant.idle_claims == 1
+        assert manager._reserve(tenant) is None
+
+
+def test_busy_tenant_is_not_evicted(make_manager):
+    manager = make_manager(max_connections=2, idle_timeout=0)
+    held = manager.connect("srv", "a")
+    try:
+        query(manager, "b")
+        # "a" jest najdawniej używany i bezczynny dłużej niż idle_timeout,
+        # ale ma pobrane połączenie
+        query(manager, "c")
+        assert "a" in tenants(manager)
+        assert held.execute(text("SELECT 1")).scalar() == 1
+    finally:
+        held.close()
+
+
+def test_dispose_keeps_checked_out_connection_usable(make_manager):
+    manager = make_manager()
+    held = manager.connect("srv", "a")
+    manager.dispose()
+    assert tenants(manager) == []
+    assert held.execute(text("SELECT 1")).scalar() == 1
+    held.close()
+
+
+def test_stats(make_manager):
+    manager = make_manager()
+    query(manager, "a")
+    stats = manager.stats()
+    assert stats["engines"] == 1
+    assert stats["tenants"]["srv/a"]["checkouts"] == 1
@@ -0,0 +1,87 @@
+import threading
+from sql_con_2 import SQLServerADAuth
+from sql_token import SQL_COPT_SS_ACCESS_TOKEN, AccessToken, TokenCache, encode_access_token
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingProvider:
+    def __init__(self, clock=None, lifetime=3600):
+        self.clock = clock or FakeClock()
+        self.lifetime = lifetime
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return AccessToken(f"token-{self.calls}", self.clock() + self.lifetime)
+
+
+def test_encode_access_token():
+    encoded = encode_access_token("abc")
+    assert encoded == b"\x06\x00\x00\x00a\x00b\x00c\x00"
+
+
+def test_cache_refreshes_ahead_of_expiry():
+    clock = FakeClock()
+    provider = CountingProvider(clock)
+    cache = TokenCache(provider, refresh_margin=300, clock=clock)
+    assert cache.get().token == "token-1"
+    clock.now += 3000
+    assert cache.get().token == "token-1"
+    # Mniej niż refresh_margin do wygaśnięcia - nowy token
+    clock.now += 400
+    assert cache.get().token == "token-2"
+    assert cache.acquired_count == 2
+
+
+def test_cache_accepts_tuple_and_invalidate():
+    cache = TokenCache(lambda: ("token", 4102444800))
+    assert cache.get().token == "token"
+    cache.invalidate()
+    cache.get()
+    assert cache.acquired_count == 2
+
+
+def test_cache_fetches_once_for_concurrent_callers():
+    provider = CountingProvider()
+    cache = TokenCache(provider, clock=provider.clock)
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        cache.get()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert provider.calls == 1
+
+
+def test_token_passed_to_every_pooled_connection(pyodbc_stub):
+    provider = CountingProvider(lifetime=4102444800)
+    db = SQLServerADAuth("serwer.database.windows.net", "baza", "user@firma.com",
+                         token_provider=provider)
+    try:
+        db.connect()
+        # Dwa połączenia fizyczne naraz - token pobrany raz
+        with db.engine.connect(), db.engine.connect():
+            pass
+    finally:
+        db.dispose()
+
+    assert len(pyodbc_stub.connections) == 2
+    assert provider.calls == 1
+    for connection in pyodbc_stub.connections:
+        assert "UID=" not in connection.connection_string
+        assert "PWD=" not in connection.connection_string
+        assert "Authentication=" not in connection.connection_string
+        attrs = connection.kwargs["attrs_before"]
+        assert attrs[SQL_COPT_SS_ACCESS_TOKEN] == encode_access_token("token-1")
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+from sql_upsert import upsert
+
+metadata = MetaData()
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("username", String(50)),
+)
+
+
+@pytest.fixture
+def engine():
+    # Jedno połączenie w puli - kolejne upserty trafiają na to samo połączenie
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def names(engine):
+    with engine.connect() as connection:
+        return dict(connection.execute(select(users.c.id, users.c.username)).all())
+
+
+def test_insert_and_update_counts(engine):
+    result = upsert(engine, users, [(1, "a"), (2, "b")])
+    assert (result.rows, result.inserted, result.updated) == (2, 2, 0)
+    result = upsert(engine, users, [{"id": 2, "username": "B"}, {"id": 3, "username": "c"}],
+                    batch_size=1)
+    assert (result.rows, result.inserted, result.updated) == (2, 1, 1)
+    assert names(engine) == {1: "a", 2: "B", 3: "c"}
+
+
+def test_failed_upsert_does_not_leave_staging_table(engine):
+    # Zduplikowany klucz w danych wejściowych - błąd w tabeli pośredniej
+    with pytest.raises(IntegrityError):
+        upsert(engine, users, [(1, "a"), (1, "b")])
+    assert names(engine) == {}
+    result = upsert(engine, users, [(1, "a")])
+    assert (result.inserted, result.updated) == (1, 0)
+
+
+def test_missing_key_column_is_rejected(engine):
+    with pytest.raises(ValueError):
+        upsert(engine, users, [("a",)], columns=["username"])
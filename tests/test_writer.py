@@ -0,0 +1,153 @@
+import sqlite3
+import threading
+import time
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, event, func, select
+from sqlalchemy.orm import declarative_base
+from sql_bench import BenchConnection
+from sql_writer import BufferFullError, BufferedWriter, WriterClosedError
+
+Base = declarative_base()
+
+
+class Event(Base):
+    __tablename__ = "events"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baza.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def count(engine):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(Event.__table__)).scalar()
+
+
+def record_inserts(engine):
+    sizes = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            sizes.append(len(parameters) if executemany else 1)
+
+    return sizes
+
+
+def test_batches_by_size_and_flush(engine):
+    sizes = record_inserts(engine)
+    flushed = []
+    writer = BufferedWriter(engine, Event, batch_size=100, flush_interval=60,
+                            on_flush=flushed.append)
+    try:
+        writer.add_many({"id": i, "name": f"e{i}"} for i in range(250))
+        # Pełne paczki zapisuje wątek w tle, reszta czeka na flush()
+        assert writer.flush(timeout=5)
+        assert count(engine) == 250
+        assert sizes == [100, 100, 50]
+        assert sum(flushed) == 250
+        assert writer.stats()["buffered"] == 0
+    finally:
+        writer.close()
+
+
+def test_flush_interval_writes_partial_batch(engine):
+    writer = BufferedWriter(engine, Event, batch_size=1000, flush_interval=0.1)
+    try:
+        writer.add({"id": 1, "name": "e1"})
+        deadline = time.monotonic() + 5
+        while count(engine) == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert count(engine) == 1
+        assert writer.stats()["written"] == 1
+    finally:
+        writer.close()
+
+
+def test_backpressure_when_writes_stall(engine):
+    release = threading.Event()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def stall(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT"):
+            release.wait(5)
+
+    writer = BufferedWriter(engine, Event, batch_size=2, flush_interval=60, max_buffer=2,
+                            put_timeout=0)
+    try:
+        # Pierwsza paczka utknęła w zapisie, druga zapełnia bufor
+        writer.add_many([{"id": 1}, {"id": 2}])
+        deadline = time.monotonic() + 5
+        while writer.stats()["buffered"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        writer.add_many([{"id": 3}, {"id": 4}])
+        with pytest.raises(BufferFullError):
+            writer.add({"id": 5})
+        assert writer.stats()["backpressure_waits"] >= 1
+
+        # Po zwolnieniu zapisu add() z limitem czasu doczekuje się miejsca
+        writer.put_timeout = 5
+        release.set()
+        writer.add({"id": 5})
+        assert writer.flush(timeout=5)
+        assert count(engine) == 5
+    finally:
+        release.set()
+        writer.close()
+
+
+def test_failed_batch_goes_to_on_error(engine):
+    errors = []
+    writer = BufferedWriter(engine, Event, batch_size=10, flush_interval=60,
+                            on_error=lambda error, rows: errors.append((error, rows)))
+    try:
+        writer.add_many([{"id": 1, "name": "a"}, {"id": 1, "name": "duplikat"}])
+        assert writer.flush(timeout=5)
+        assert writer.stats()["failed"] == 2
+        assert len(errors) == 1
+        assert [row["name"] for row in errors[0][1]] == ["a", "duplikat"]
+        # Błąd jednej paczki nie zatrzymuje bufora
+        writer.add({"id": 2, "name": "b"})
+        assert writer.flush(timeout=5)
+        assert count(engine) == 1
+    finally:
+        writer.close()
+
+
+def test_close_writes_remaining_rows_and_rejects_new_ones(engine):
+    writer = BufferedWriter(engine, Event, batch_size=1000, flush_interval=60)
+    writer.add_many([(1, "e1"), (2, "e2")])
+    writer.add(Event(id=3, name="e3"))
+    assert writer.close(timeout=5)
+    assert count(engine) == 3
+    with pytest.raises(WriterClosedError):
+        writer.add({"id": 4})
+
+
+def test_connection_closes_writers(tmp_path):
+    connection = BenchConnection(f"sqlite:///{tmp_path / 'baza.db'}", sqlite3)
+    engine = connection.connect()
+    Base.metadata.create_all(engine)
+    writer = connection.buffered_writer(Event, batch_size=1000, flush_interval=60)
+    writer.add({"id": 1, "name": "e1"})
+    probe = create_engine(f"sqlite:///{tmp_path / 'baza.db'}")
+    try:
+        connection.close()
+        assert writer._closed
+        assert count(probe) == 1
+    finally:
+        probe.dispose()
+
+
+def test_invalid_sizes():
+    engine = create_engine("sqlite://")
+    with pytest.raises(ValueError):
+        BufferedWriter(engine, Event, batch_size=0)
+    with pytest.raises(ValueError):
+        BufferedWriter(engine, Event, batch_size=10, max_buffer=5)